@@ -2,17 +2,26 @@
 """
 G-Press Demo Video Generator v2
 Video demo professionale con screenshot grandi, testo leggibile e musica
+
+Di default rende a segmenti con la cache in ~/.cache/gpress-demo-video:
+un nuovo render rifà solo le scene cambiate. --no-cache per un render
+unico senza cache di segmenti e screenshot; tutte le opzioni con --help.
 """
 
-from moviepy import *
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-import numpy as np
 import os
 
+from demo_video.audio import music_track
+from demo_video.cli import run
+
 # Configurazione
 OUTPUT_FILE = "/home/ubuntu/g-press/G-PRESS_DEMO_VIDEO_v2.mp4"
 MUSIC_FILE = "/home/ubuntu/g-press/background_music.mp3"
+# Dati dell'app per i contatori: letti a ogni render
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "data")
+JOURNALISTS_FILE = os.path.join(DATA_DIR, "journalists.json")
+STATS_FILE = os.path.join(DATA_DIR, "video_stats.json")
 VIDEO_SIZE = (1920, 1080)
+VERTICAL_SIZE = (1080, 1920)  # taglio per i social (--outputs vertical)
 FPS = 30
 
 # Colori
@@ -31,7 +40,7 @@ SLIDES = [
     {
         "image": "/home/ubuntu/gpress-pitch-v2/assets/screen_home.jpg",
         "title": "Dashboard Principale",
-        "subtitle": "9.177 Giornalisti Italiani",
+        "subtitle": "{by_country.IT} Giornalisti Italiani",  # solo country == "IT" in JOURNALISTS_FILE
         "bullets": ["Autopilota Intelligente AI", "Filtri per categoria e paese", "Invio con un solo tap"]
     },
     {
@@ -60,248 +69,133 @@ SLIDES = [
     }
 ]
 
-def get_font(size, bold=True):
-    """Ottiene un font con fallback"""
-    font_paths = [
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf" if bold else "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-        "/usr/share/fonts/truetype/freefont/FreeSansBold.ttf"
-    ]
-    for path in font_paths:
-        if os.path.exists(path):
-            return ImageFont.truetype(path, size)
-    return ImageFont.load_default()
+def create_solid_background(color):
+    """Sfondo solido (tinta unita condivisa, senza array per scena)"""
+    return {"type": "solid", "color": color}
 
-def create_solid_background(size, color):
-    """Crea sfondo solido"""
-    img = Image.new('RGB', size, color)
-    return np.array(img)
+def create_text_clip(text, font_size, color, duration, position, bold=True, start=0, effects=()):
+    """Layer di testo"""
+    return {"type": "text", "text": text, "size": font_size, "color": color, "bold": bold,
+            "pad": [20, 10], "duration": duration, "position": position, "start": start,
+            "effects": list(effects)}
 
-def create_text_clip(text, font_size, color, duration, position, bold=True, start=0):
-    """Crea un clip di testo"""
-    font = get_font(font_size, bold)
-    
-    # Calcola dimensioni
-    dummy = Image.new('RGBA', (1, 1))
-    draw = ImageDraw.Draw(dummy)
-    bbox = draw.textbbox((0, 0), text, font=font)
-    w, h = bbox[2] - bbox[0] + 40, bbox[3] - bbox[1] + 20
-    
-    # Crea immagine testo
-    img = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    draw.text((20, 10), text, font=font, fill=color + (255,))
-    
-    clip = (ImageClip(np.array(img))
-           .with_duration(duration)
-           .with_start(start)
-           .with_position(position))
-    
-    return clip
+def create_bullet_point(text, font_size, color, duration, position, start=0, effects=()):
+    """Bullet point con pallino verde"""
+    return {"type": "bullet", "text": text, "size": font_size, "color": color, "dot_color": GREEN,
+            "duration": duration, "position": position, "start": start, "effects": list(effects)}
 
-def create_bullet_point(text, font_size, color, y_offset):
-    """Crea un bullet point con pallino verde"""
-    font = get_font(font_size, bold=False)
-    
-    # Calcola dimensioni
-    dummy = Image.new('RGBA', (1, 1))
-    draw = ImageDraw.Draw(dummy)
-    bbox = draw.textbbox((0, 0), text, font=font)
-    w, h = bbox[2] - bbox[0] + 80, bbox[3] - bbox[1] + 20
-    
-    # Crea immagine
-    img = Image.new('RGBA', (w, h), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
-    # Pallino verde
-    draw.ellipse([20, h//2 - 6, 32, h//2 + 6], fill=GREEN + (255,))
-    
-    # Testo
-    draw.text((50, 5), text, font=font, fill=color + (255,))
-    
-    return np.array(img)
+def create_counter_clip(text, font_size, color, duration, position, data=JOURNALISTS_FILE,
+                        bold=True, start=0, effects=()):
+    """Testo con numeri dai dati dell'app ("{count} ...") che contano da zero"""
+    return {"type": "counter", "path": data, "text": text, "size": font_size, "color": color,
+            "bold": bold, "pad": [20, 10], "duration": duration, "position": position, "start": start,
+            "effects": list(effects) + [count_up(1.5)]}
 
-def add_phone_frame(screenshot_path, target_height=800):
-    """Carica screenshot e aggiunge un frame telefono simulato"""
-    if not os.path.exists(screenshot_path):
-        # Placeholder se immagine non esiste
-        img = Image.new('RGB', (400, 800), (50, 50, 50))
-        draw = ImageDraw.Draw(img)
-        draw.text((150, 400), "?", fill=(100, 100, 100))
-        return np.array(img)
-    
-    # Carica immagine
-    img = Image.open(screenshot_path).convert('RGB')
-    
-    # Ridimensiona mantenendo aspect ratio
-    aspect = img.width / img.height
-    new_height = target_height
-    new_width = int(new_height * aspect)
-    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-    
-    # Aggiungi bordo arrotondato (simulato con padding)
-    padding = 8
-    frame_color = (40, 40, 40)
-    framed = Image.new('RGB', (new_width + padding*2, new_height + padding*2), frame_color)
-    framed.paste(img, (padding, padding))
-    
-    return np.array(framed)
+def add_phone_frame(screenshot_path, target_height=800, **layer):
+    """Screenshot con un frame telefono simulato (placeholder se l'immagine non esiste)"""
+    return {"type": "image", "path": screenshot_path, "height": target_height,
+            "frame": {"padding": 8, "color": [40, 40, 40]}, "missing": "placeholder", **layer}
+
+def fade_in(duration):
+    return {"type": "CrossFadeIn", "duration": duration}
+
+def fade_out(duration):
+    return {"type": "CrossFadeOut", "duration": duration}
+
+def count_up(duration):
+    return {"type": "CountUp", "duration": duration}
+
+def create_subtitle(text, *args, **kwargs):
+    """Sottotitolo: contatore se contiene campi dei dati ("{count}"), altrimenti testo"""
+    return (create_counter_clip if "{" in text else create_text_clip)(text, *args, **kwargs)
 
 def create_slide_clip(slide_data, duration=6):
-    """Crea una slide con layout professionale"""
-    
-    # Sfondo nero
-    bg = create_solid_background(VIDEO_SIZE, BG_DARK)
-    bg_clip = ImageClip(bg).with_duration(duration)
-    
-    clips = [bg_clip]
-    
-    # Screenshot grande a sinistra (centrato verticalmente)
-    phone_img = add_phone_frame(slide_data["image"], target_height=850)
-    phone_h, phone_w = phone_img.shape[:2]
-    phone_x = 150
-    phone_y = (VIDEO_SIZE[1] - phone_h) // 2
-    
-    phone_clip = (ImageClip(phone_img)
-                 .with_duration(duration)
-                 .with_position((phone_x, phone_y))
-                 .with_effects([vfx.CrossFadeIn(0.8)]))
-    clips.append(phone_clip)
-    
+    """Slide con layout professionale"""
     # Testo a destra dello screenshot
-    text_x = phone_x + phone_w + 100
-    
-    # Titolo grande
-    title_clip = create_text_clip(
-        slide_data["title"], 
-        TITLE_SIZE, 
-        WHITE, 
-        duration - 0.3,
-        (text_x, 200),
-        bold=True,
-        start=0.3
-    ).with_effects([vfx.CrossFadeIn(0.5)])
-    clips.append(title_clip)
-    
-    # Linea verde accent
-    line = Image.new('RGB', (300, 4), GREEN)
-    line_clip = (ImageClip(np.array(line))
-                .with_duration(duration - 0.5)
-                .with_start(0.5)
-                .with_position((text_x, 300))
-                .with_effects([vfx.CrossFadeIn(0.3)]))
-    clips.append(line_clip)
-    
-    # Sottotitolo
-    subtitle_clip = create_text_clip(
-        slide_data["subtitle"],
-        SUBTITLE_SIZE,
-        GREEN,
-        duration - 0.6,
-        (text_x, 330),
-        bold=True,
-        start=0.6
-    ).with_effects([vfx.CrossFadeIn(0.5)])
-    clips.append(subtitle_clip)
+    text_x = {"after": "phone", "gap": 100}
+    
+    layers = [
+        # Sfondo nero
+        create_solid_background(BG_DARK),
+        # Screenshot grande a sinistra (centrato verticalmente)
+        add_phone_frame(slide_data["image"], target_height=850, id="phone",
+                        position=[150, "center"], effects=[fade_in(0.8)]),
+        # Titolo grande
+        create_text_clip(slide_data["title"], TITLE_SIZE, WHITE, duration - 0.3, [text_x, 200],
+                         bold=True, start=0.3, effects=[fade_in(0.5)]),
+        # Linea verde accent
+        {"type": "rect", "rect": [300, 4], "color": GREEN, "duration": duration - 0.5,
+         "position": [text_x, 300], "start": 0.5, "effects": [fade_in(0.3)]},
+        # Sottotitolo
+        create_subtitle(slide_data["subtitle"], SUBTITLE_SIZE, GREEN, duration - 0.6, [text_x, 330],
+                        bold=True, start=0.6, effects=[fade_in(0.5)]),
+    ]
     
     # Bullet points
     for i, bullet in enumerate(slide_data["bullets"]):
-        bullet_img = create_bullet_point(bullet, DESC_SIZE, GRAY, 0)
-        bullet_clip = (ImageClip(bullet_img)
-                      .with_duration(duration - 1.0 - i*0.3)
-                      .with_start(1.0 + i*0.3)
-                      .with_position((text_x, 420 + i*60))
-                      .with_effects([vfx.CrossFadeIn(0.4)]))
-        clips.append(bullet_clip)
+        layers.append(create_bullet_point(bullet, DESC_SIZE, GRAY, duration - 1.0 - i*0.3,
+                                          [text_x, 420 + i*60], start=1.0 + i*0.3,
+                                          effects=[fade_in(0.4)]))
     
-    return CompositeVideoClip(clips, size=VIDEO_SIZE)
+    return {"name": slide_data["title"], "duration": duration, "layers": layers}
+
+def create_vertical_slide_clip(slide_data, duration=6):
+    """Slide per il formato verticale: screenshot sopra, testo sotto"""
+    layers = [
+        create_solid_background(BG_DARK),
+        add_phone_frame(slide_data["image"], target_height=1050, id="phone",
+                        position=["center", 140], effects=[fade_in(0.8)]),
+        create_text_clip(slide_data["title"], TITLE_SIZE, WHITE, duration - 0.3, ["center", 1260],
+                         bold=True, start=0.3, effects=[fade_in(0.5)]),
+        {"type": "rect", "rect": [300, 4], "color": GREEN, "duration": duration - 0.5,
+         "position": ["center", 1360], "start": 0.5, "effects": [fade_in(0.3)]},
+        create_subtitle(slide_data["subtitle"], SUBTITLE_SIZE, GREEN, duration - 0.6, ["center", 1390],
+                        bold=True, start=0.6, effects=[fade_in(0.5)]),
+    ]
+    for i, bullet in enumerate(slide_data["bullets"]):
+        layers.append(create_bullet_point(bullet, DESC_SIZE, GRAY, duration - 1.0 - i*0.3,
+                                          [140, 1480 + i*60], start=1.0 + i*0.3,
+                                          effects=[fade_in(0.4)]))
+    return {"name": slide_data["title"], "duration": duration, "layers": layers}
+
+def _shift(scene, dy):
+    """Sposta in basso di dy i layer posizionati (scene centrate nel verticale)"""
+    for layer in scene["layers"]:
+        if "position" in layer and not isinstance(layer["position"], str):
+            x, y = layer["position"]
+            layer["position"] = [x, y + dy]
+    return scene
 
 def create_intro_clip(duration=5):
     """Intro con logo e titolo"""
-    bg = create_solid_background(VIDEO_SIZE, BG_DARK)
-    bg_clip = ImageClip(bg).with_duration(duration)
-    
-    clips = [bg_clip]
-    
-    # Logo G-Press (carica se esiste)
-    logo_path = "/home/ubuntu/gpress-pitch-v2/assets/logo.png"
-    if os.path.exists(logo_path):
-        logo = Image.open(logo_path).convert('RGBA')
-        logo = logo.resize((300, 300), Image.Resampling.LANCZOS)
-        logo_clip = (ImageClip(np.array(logo))
-                    .with_duration(duration)
-                    .with_position(("center", 250))
-                    .with_effects([vfx.CrossFadeIn(1)]))
-        clips.append(logo_clip)
-    
-    # Titolo
-    title_clip = create_text_clip(
-        "G-Press",
-        100,
-        GREEN,
-        duration,
-        ("center", 580),
-        bold=True,
-        start=0.5
-    ).with_effects([vfx.CrossFadeIn(0.8)])
-    clips.append(title_clip)
-    
-    # Sottotitolo
-    sub_clip = create_text_clip(
-        "Sistema Proprietario PR • GROWVERSE",
-        32,
-        GRAY,
-        duration - 1,
-        ("center", 700),
-        bold=False,
-        start=1
-    ).with_effects([vfx.CrossFadeIn(0.5)])
-    clips.append(sub_clip)
-    
-    return CompositeVideoClip(clips, size=VIDEO_SIZE)
+    layers = [
+        create_solid_background(BG_DARK),
+        # Logo G-Press (se esiste)
+        {"type": "image", "path": "/home/ubuntu/gpress-pitch-v2/assets/logo.png", "mode": "RGBA",
+         "fit": [300, 300], "missing": "skip", "position": ["center", 250], "effects": [fade_in(1)]},
+        # Titolo
+        create_text_clip("G-Press", 100, GREEN, duration, ["center", 580],
+                         bold=True, start=0.5, effects=[fade_in(0.8)]),
+        # Sottotitolo
+        create_text_clip("Sistema Proprietario PR • GROWVERSE", 32, GRAY, duration - 1, ["center", 700],
+                         bold=False, start=1, effects=[fade_in(0.5)]),
+    ]
+    return {"name": "intro", "duration": duration, "layers": layers}
 
-def create_savings_clip(duration=6):
+def create_savings_clip(duration=6, amount_size=120):
     """Slide risparmio economico"""
-    bg = create_solid_background(VIDEO_SIZE, BG_DARK)
-    bg_clip = ImageClip(bg).with_duration(duration)
-    
-    clips = [bg_clip]
-    
-    # Titolo
-    title_clip = create_text_clip(
-        "Risparmio Annuale",
-        80,
-        WHITE,
-        duration,
-        ("center", 150),
-        bold=True,
-        start=0.3
-    ).with_effects([vfx.CrossFadeIn(0.5)])
-    clips.append(title_clip)
-    
-    # Numero grande
-    amount_clip = create_text_clip(
-        "€21.840 - €30.240",
-        120,
-        GREEN,
-        duration - 0.5,
-        ("center", 350),
-        bold=True,
-        start=0.8
-    ).with_effects([vfx.CrossFadeIn(0.8)])
-    clips.append(amount_clip)
-    
-    # Sottotitolo
-    sub_clip = create_text_clip(
-        "vs Agenzia DPR Tradizionale",
-        36,
-        GRAY,
-        duration - 1,
-        ("center", 520),
-        bold=False,
-        start=1.2
-    ).with_effects([vfx.CrossFadeIn(0.5)])
-    clips.append(sub_clip)
+    layers = [
+        create_solid_background(BG_DARK),
+        # Titolo
+        create_text_clip("Risparmio Annuale", 80, WHITE, duration, ["center", 150],
+                         bold=True, start=0.3, effects=[fade_in(0.5)]),
+        # Numero grande, dalle statistiche esportate
+        create_counter_clip("€{savings_year.min} - €{savings_year.max}", amount_size, GREEN, duration - 0.5,
+                            ["center", 350], data=STATS_FILE, start=0.8, effects=[fade_in(0.8)]),
+        # Sottotitolo
+        create_text_clip("vs Agenzia DPR Tradizionale", 36, GRAY, duration - 1, ["center", 520],
+                         bold=False, start=1.2, effects=[fade_in(0.5)]),
+    ]
     
     # Dettagli
     details = [
@@ -311,127 +205,62 @@ def create_savings_clip(duration=6):
     ]
     
     for i, detail in enumerate(details):
-        detail_clip = create_text_clip(
-            detail,
-            24,
-            GRAY,
-            duration - 1.5 - i*0.2,
-            ("center", 620 + i*45),
-            bold=False,
-            start=1.5 + i*0.2
-        ).with_effects([vfx.CrossFadeIn(0.4)])
-        clips.append(detail_clip)
+        layers.append(create_text_clip(detail, 24, GRAY, duration - 1.5 - i*0.2, ["center", 620 + i*45],
+                                       bold=False, start=1.5 + i*0.2, effects=[fade_in(0.4)]))
     
-    return CompositeVideoClip(clips, size=VIDEO_SIZE)
+    return {"name": "risparmio", "duration": duration, "layers": layers}
 
 def create_outro_clip(duration=5):
     """Outro con call to action"""
-    bg = create_solid_background(VIDEO_SIZE, BG_DARK)
-    bg_clip = ImageClip(bg).with_duration(duration)
-    
-    clips = [bg_clip]
-    
-    # Titolo
-    title_clip = create_text_clip(
-        "Asset Strategico",
-        80,
-        WHITE,
-        duration,
-        ("center", 300),
-        bold=True,
-        start=0.3
-    ).with_effects([vfx.CrossFadeIn(0.5)])
-    clips.append(title_clip)
-    
-    # GROWVERSE
-    gv_clip = create_text_clip(
-        "GROWVERSE",
-        100,
-        GREEN,
-        duration - 0.5,
-        ("center", 420),
-        bold=True,
-        start=0.8
-    ).with_effects([vfx.CrossFadeIn(0.8)])
-    clips.append(gv_clip)
-    
-    # Copyright
-    copy_clip = create_text_clip(
-        "© 2024 GROWVERSE, LLC • Tecnologia Proprietaria",
-        20,
-        (100, 100, 100),
-        duration - 1,
-        ("center", 950),
-        bold=False,
-        start=1.5
-    ).with_effects([vfx.CrossFadeIn(0.3)])
-    clips.append(copy_clip)
-    
-    return CompositeVideoClip(clips, size=VIDEO_SIZE)
+    layers = [
+        create_solid_background(BG_DARK),
+        # Titolo
+        create_text_clip("Asset Strategico", 80, WHITE, duration, ["center", 300],
+                         bold=True, start=0.3, effects=[fade_in(0.5)]),
+        # GROWVERSE
+        create_text_clip("GROWVERSE", 100, GREEN, duration - 0.5, ["center", 420],
+                         bold=True, start=0.8, effects=[fade_in(0.8)]),
+        # Copyright
+        create_text_clip("© 2024 GROWVERSE, LLC • Tecnologia Proprietaria", 20, (100, 100, 100),
+                         duration - 1, ["center", 950], bold=False, start=1.5, effects=[fade_in(0.3)]),
+    ]
+    return {"name": "outro", "duration": duration, "layers": layers}
 
-def main():
-    print("🎬 Creazione video demo G-Press v2...")
-    
-    all_clips = []
-    
-    # Intro
-    print("  → Intro...")
-    intro = create_intro_clip(5)
-    all_clips.append(intro)
-    
-    # Slide con screenshot
-    for i, slide in enumerate(SLIDES):
-        print(f"  → Slide {i+1}/{len(SLIDES)}: {slide['title']}...")
-        clip = create_slide_clip(slide, 6)
-        all_clips.append(clip)
-    
-    # Risparmio
-    print("  → Slide risparmio...")
-    savings = create_savings_clip(6)
-    all_clips.append(savings)
-    
-    # Outro
-    print("  → Outro...")
-    outro = create_outro_clip(5)
-    all_clips.append(outro)
-    
-    # Concatena con crossfade
-    print("  → Concatenazione...")
-    
-    # Aggiungi crossfade tra clip
-    for i, clip in enumerate(all_clips):
+def create_timeline_spec(layout="landscape"):
+    """Timeline dichiarativa del video (vedi demo_video.spec); layout "vertical" per i social"""
+    if layout == "vertical":
+        # Stesse scene; le slide hanno un layout proprio, le altre sono centrate
+        dy = (VERTICAL_SIZE[1] - VIDEO_SIZE[1]) // 2
+        scenes = [_shift(create_intro_clip(5), dy)]
+        scenes += [create_vertical_slide_clip(slide, 6) for slide in SLIDES]
+        scenes += [_shift(create_savings_clip(6, amount_size=96), dy), _shift(create_outro_clip(5), dy)]
+        size = VERTICAL_SIZE
+    else:
+        scenes = [create_intro_clip(5)]
+        scenes += [create_slide_clip(slide, 6) for slide in SLIDES]
+        scenes += [create_savings_clip(6), create_outro_clip(5)]
+        size = VIDEO_SIZE
+    
+    # Crossfade tra le scene
+    for i, scene in enumerate(scenes):
+        scene["effects"] = []
         if i > 0:
-            all_clips[i] = clip.with_effects([vfx.CrossFadeIn(0.5)])
-        if i < len(all_clips) - 1:
-            all_clips[i] = all_clips[i].with_effects([vfx.CrossFadeOut(0.5)])
-    
-    final_video = concatenate_videoclips(all_clips, method="compose")
-    
-    # Aggiungi musica
-    print("  → Aggiunta musica...")
-    if os.path.exists(MUSIC_FILE):
-        audio = AudioFileClip(MUSIC_FILE)
-        # Taglia audio alla durata del video
-        audio = audio.subclipped(0, final_video.duration)
-        # Abbassa volume
-        audio = audio.with_effects([afx.MultiplyVolume(0.3)])
-        # Fade out finale
-        audio = audio.with_effects([afx.AudioFadeOut(2)])
-        final_video = final_video.with_audio(audio)
+            scene["effects"].append(fade_in(0.5))
+        if i < len(scenes) - 1:
+            scene["effects"].append(fade_out(0.5))
     
-    # Esporta
-    print(f"  → Esportazione in {OUTPUT_FILE}...")
-    final_video.write_videofile(
-        OUTPUT_FILE,
-        fps=FPS,
-        codec='libx264',
-        audio_codec='aac',
-        preset='medium',
-        threads=4
-    )
-    
-    print(f"✅ Video creato: {OUTPUT_FILE}")
-    print(f"   Durata: {final_video.duration:.1f} secondi")
+    return {"size": list(size), "fps": FPS, "scenes": scenes}
+
+def create_music(duration, cache_dir=None):
+    """Traccia AAC della musica di sottofondo alla durata del video (None se manca il file)"""
+    if not os.path.exists(MUSIC_FILE):
+        return None
+    # Volume al 30% e fade out finale; decodifica e AAC restano in cache
+    return music_track(MUSIC_FILE, duration, volume=0.3, fade_out=2, cache_root=cache_dir)
+
+def main(argv=None):
+    run("G-Press v2", create_timeline_spec, OUTPUT_FILE, VIDEO_SIZE, FPS, music=create_music,
+        vertical=(lambda: create_timeline_spec("vertical"), VERTICAL_SIZE), argv=argv)
 
 if __name__ == "__main__":
     main()
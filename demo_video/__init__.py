@@ -0,0 +1,4 @@
+"""
+Motore di rendering condiviso dai generatori di video demo G-Press
+(create_demo_video.py e create_demo_video_v2.py)
+"""
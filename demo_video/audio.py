@@ -0,0 +1,92 @@
+"""
+Colonna sonora: PCM decodificato in cache e traccia AAC codificata una volta
+
+- la musica viene decodificata da ffmpeg in PCM 16 bit stereo e salvata come
+  .npy indicizzato dall'hash del file; le volte successive si apre in mmap
+- volume e dissolvenza finale sono operazioni vettoriali sui campioni
+- la traccia AAC è in cache per (musica, durata, volume, dissolvenza) e viene
+  unita al video con stream copy (vedi FFmpegWriter e concat_segments)
+
+Un render che cambia solo il video non decodifica né codifica audio.
+"""
+
+import hashlib
+import os
+import subprocess
+
+import numpy as np
+
+from demo_video.cache import default_cache_dir
+from demo_video.encoder import ffmpeg_binary
+
+AUDIO_RATE = 44100
+
+# Da incrementare quando cambia il modo in cui viene prodotta la traccia
+AUDIO_VERSION = 1
+
+
+def _audio_dir(cache_root):
+    return os.path.join(cache_root or default_cache_dir(), "audio")
+
+
+def source_hash(path):
+    """Hash del contenuto del file sorgente"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def decode_pcm(path, cache_root=None, rate=AUDIO_RATE):
+    """Campioni int16 (n, 2) del file, in mmap dalla cache"""
+    cached = os.path.join(_audio_dir(cache_root), "pcm", f"{source_hash(path)}-{rate}.npy")
+    if not os.path.exists(cached):
+        cmd = [ffmpeg_binary(), "-loglevel", "error", "-i", path,
+               "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "2", "-ar", str(rate), "-"]
+        raw = subprocess.run(cmd, check=True, stdout=subprocess.PIPE).stdout
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp.npy"
+        np.save(tmp, np.frombuffer(raw, dtype="<i2").reshape(-1, 2))
+        os.replace(tmp, cached)
+    return np.load(cached, mmap_mode="r")
+
+
+def music_bed(pcm, duration, volume=1.0, fade_out=0.0, rate=AUDIO_RATE):
+    """
+    Primi `duration` secondi di `pcm` con volume e dissolvenza lineare finale
+    (come subclipped + MultiplyVolume + AudioFadeOut). Se la musica è più
+    corta il resto è silenzio.
+    """
+    n = int(round(duration * rate))
+    samples = np.zeros((n, 2), dtype=np.float32)
+    head = min(n, len(pcm))
+    samples[:head] = pcm[:head]
+    samples *= volume
+    if fade_out > 0:
+        t = np.arange(n, dtype=np.float32) / rate
+        samples *= np.minimum((duration - t) / fade_out, 1.0)[:, None]
+    return np.clip(np.rint(samples), -32768, 32767).astype("<i2")
+
+
+def encode_aac(samples, path, rate=AUDIO_RATE):
+    """Codifica campioni int16 stereo in un file AAC (.m4a)"""
+    tmp = f"{path}.{os.getpid()}.tmp.m4a"
+    cmd = [ffmpeg_binary(), "-y", "-loglevel", "error",
+           "-f", "s16le", "-ac", "2", "-ar", str(rate), "-i", "-",
+           "-c:a", "aac", tmp]
+    subprocess.run(cmd, check=True, input=samples.tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def music_track(path, duration, volume=1.0, fade_out=0.0, cache_root=None):
+    """Percorso della traccia AAC per questa musica e durata, codificata una volta"""
+    key = hashlib.blake2b(repr((AUDIO_VERSION, source_hash(path), round(duration, 3),
+                                volume, fade_out)).encode(), digest_size=16).hexdigest()
+    track = os.path.join(_audio_dir(cache_root), f"{key}.m4a")
+    if not os.path.exists(track):
+        pcm = decode_pcm(path, cache_root)
+        os.makedirs(os.path.dirname(track), exist_ok=True)
+        encode_aac(music_bed(pcm, duration, volume, fade_out), track)
+    return track
@@ -0,0 +1,290 @@
+"""
+Autotuning dell'encoder sulla macchina locale
+
+    python -m demo_video.autotune --generator v2 --max-seconds 90
+    python -m demo_video.autotune --generator v1 --max-mb 20 --codecs libx264
+
+Le impostazioni giuste cambiano molto fra un portatile e il server di render
+a 32 core, e fra un video di slide e uno con lo zoom. L'autotuning compone
+una volta un campione della timeline vera:
+
+- hold:   un tratto statico (frame ripetuti)
+- fade:   una dissolvenza fra due scene
+- motion: un tratto animato dentro una scena (lo zoom lento di v1, se c'è)
+
+e lo codifica con ogni combinazione della griglia di codec, preset, CRF,
+tune e thread, misurando tempo e byte. Tempo e dimensione del video intero
+sono stimati pesando ogni parte con la sua quota di frame nella timeline.
+Composizione e codifica girano in parallelo solo se l'encoder lascia libero
+almeno un core: altrimenti i tempi si sommano.
+
+Fra le combinazioni nel budget (--max-seconds e/o --max-mb) vince quella con
+la qualità migliore (CRF più basso), poi la più piccola se c'è un budget di
+tempo o la più veloce se c'è solo quello di spazio. I CRF sono nella scala
+di x264: per x265 si aggiunge X265_CRF_OFFSET, a qualità simile.
+
+Il profilo è salvato nella cache di questa macchina e i render successivi lo
+usano (vedi EncoderSettings.from_args); le opzioni esplicite come --preset
+hanno la precedenza e --no-encoder-profile lo ignora.
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from demo_video.canvas import Canvas
+from demo_video.encoder import (EncoderSettings, FFmpegWriter, PROFILE_KEYS, ffmpeg_binary, machine_id,
+                                profile_path)
+from demo_video.spec import compile_timeline, load_spec
+
+GENERATORS = {"v1": "create_demo_video", "v2": "create_demo_video_v2"}
+PARTS = ("hold", "fade", "motion")
+
+# Durata massima di ogni parte del campione
+SAMPLE_SECONDS = 2.0
+
+# Griglia predefinita; i thread dipendono dai core (vedi thread_grid)
+CODECS = ("libx264", "libx265")
+PRESETS = ("ultrafast", "veryfast", "medium", "slow")
+CRFS = (EncoderSettings.crf,)
+TUNES = {"libx264": (None, "stillimage"), "libx265": (None,)}
+
+# x265 a CRF 28 ha una qualità simile a x264 a CRF 23
+X265_CRF_OFFSET = 5
+
+
+class SampleRecorder:
+    """Writer finto per Timeline.write: conserva i frame composti, le ripetizioni come None"""
+
+    def __init__(self, size):
+        w, h = size
+        self._buffer = np.empty((h, w, 3), dtype=np.uint8)
+        self.frames = []
+
+    def next_buffer(self):
+        return self._buffer
+
+    def submit(self, buf):
+        self.frames.append(buf.copy())
+
+    def repeat(self):
+        self.frames.append(None)
+
+
+def classify_frames(timeline):
+    """Tipo di ogni frame della timeline: hold, fade (dissolvenza di scena) o motion"""
+    kinds = []
+    for k in range(timeline.n_frames):
+        index, local_t = timeline.locate(k / timeline.fps)
+        scene = timeline.scenes[index]
+        if any(a <= local_t < b for a, b in (fx.animated_span(scene.duration) for fx in scene.effects)):
+            kinds.append("fade")
+        elif timeline.hold_key(index, local_t) is not None:
+            kinds.append("hold")
+        else:
+            kinds.append("motion")
+    return kinds
+
+
+def sample_ranges(kinds, n_frames):
+    """Per ogni tipo, i primi n_frames del tratto più lungo: {tipo: (primo, ultimo)}"""
+    runs = {}
+    for kind, group in itertools.groupby(enumerate(kinds), key=lambda item: item[1]):
+        group = list(group)
+        first, last = group[0][0], group[-1][0] + 1
+        best = runs.get(kind)
+        if best is None or last - first > best[1] - best[0]:
+            runs[kind] = (first, last)
+    return {kind: (a, min(b, a + n_frames)) for kind, (a, b) in runs.items()}
+
+
+def record_sample(timeline, seconds=SAMPLE_SECONDS):
+    """
+    Compone le parti del campione. Restituisce {tipo: parte} con i frame, il
+    tempo di composizione e il peso (frame della timeline per frame campionato).
+    """
+    kinds = classify_frames(timeline)
+    counts = {kind: kinds.count(kind) for kind in PARTS}
+    parts = {}
+    for kind, (first, last) in sample_ranges(kinds, max(int(seconds * timeline.fps), 1)).items():
+        recorder = SampleRecorder(timeline.size)
+        t0 = time.perf_counter()
+        timeline.write(recorder, first, last)
+        parts[kind] = {"frames": recorder.frames, "compose": time.perf_counter() - t0,
+                       "weight": counts[kind] / (last - first), "range": (first, last)}
+    return parts
+
+
+def encode_sample(frames, size, fps, settings, path):
+    """Tempo e byte della codifica di frames (None = ripeti il precedente)"""
+    t0 = time.perf_counter()
+    with FFmpegWriter(path, size, fps, settings) as writer:
+        for frame in frames:
+            if frame is None:
+                writer.repeat()
+            else:
+                buf = writer.next_buffer()
+                buf[...] = frame
+                writer.submit(buf)
+    return time.perf_counter() - t0, os.path.getsize(path)
+
+
+def available_codecs(codecs):
+    """Codec della lista che il ffmpeg in uso sa codificare"""
+    out = subprocess.run([ffmpeg_binary(), "-hide_banner", "-encoders"], capture_output=True, text=True).stdout
+    names = {line.split()[1] for line in out.splitlines() if len(line.split()) > 1}
+    return [codec for codec in codecs if codec in names]
+
+
+def thread_grid(cpus=None):
+    cpus = cpus or os.cpu_count() or 1
+    return sorted({max(cpus // 4, 1), max(cpus // 2, 1), cpus})
+
+
+def candidates(codecs, presets, crfs, tunes, threads):
+    """Combinazioni della griglia; tunes=None usa TUNES per codec"""
+    for codec in codecs:
+        offset = X265_CRF_OFFSET if codec == "libx265" else 0
+        for preset, crf, tune, n in itertools.product(presets, crfs, tunes or TUNES.get(codec, (None,)), threads):
+            yield EncoderSettings(codec=codec, preset=preset, crf=crf + offset, tune=tune, threads=n)
+
+
+def measure(settings, parts, size, fps, workdir):
+    """Stima di tempo e dimensione del video intero con `settings`"""
+    seconds = size_bytes = 0.0
+    path = os.path.join(workdir, "sample.mp4")
+    cpus = os.cpu_count() or 1
+    parallel = settings.threads is not None and settings.threads < cpus
+    for part in parts.values():
+        encode, nbytes = encode_sample(part["frames"], size, fps, settings, path)
+        total = max(encode, part["compose"]) if parallel else encode + part["compose"]
+        seconds += total * part["weight"]
+        size_bytes += nbytes * part["weight"]
+    return {"seconds": round(seconds, 2), "mb": round(size_bytes / 2**20, 2)}
+
+
+def quality(settings):
+    """CRF nella scala di x264 (più basso = qualità migliore)"""
+    return settings["crf"] - (X265_CRF_OFFSET if settings["codec"] == "libx265" else 0)
+
+
+def choose(results, max_seconds=None, max_mb=None):
+    """Miglior risultato nel budget, None se nessuno ci sta"""
+    fitting = [r for r in results if "error" not in r
+               and (max_seconds is None or r["seconds"] <= max_seconds)
+               and (max_mb is None or r["mb"] <= max_mb)]
+    if not fitting:
+        return None
+    if max_seconds is not None:
+        return min(fitting, key=lambda r: (quality(r["settings"]), r["mb"], r["seconds"]))
+    return min(fitting, key=lambda r: (quality(r["settings"]), r["seconds"], r["mb"]))
+
+
+def describe(settings):
+    return (f"{settings['codec']} {settings['preset']} crf {settings['crf']} "
+            f"tune {settings['tune'] or '-'} {settings['threads']} thread")
+
+
+def autotune(timeline, grid, max_seconds=None, max_mb=None, verbose=True):
+    """Misura la griglia sul campione della timeline; restituisce il profilo (senza salvarlo)"""
+    t0 = time.perf_counter()
+    parts = record_sample(timeline)
+    if verbose:
+        print("  → Campione: " + ", ".join(f"{kind} {p['range'][1] - p['range'][0]} frame"
+                                           for kind, p in parts.items())
+              + f" (composto in {time.perf_counter() - t0:.1f}s)")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="gpress-autotune-") as workdir:
+        for settings in grid:
+            values = {key: getattr(settings, key) for key in PROFILE_KEYS}
+            try:
+                result = dict(settings=values, **measure(settings, parts, timeline.size, timeline.fps, workdir))
+            except IOError as exc:
+                # Es. tune non supportato dal codec
+                lines = str(exc).strip().splitlines()
+                result = {"settings": values, "error": lines[min(1, len(lines) - 1)]}
+            results.append(result)
+            if verbose:
+                if "error" in result:
+                    print(f"    ✗ {describe(values)}: {result['error']}")
+                else:
+                    print(f"    ✓ {describe(values)}: {result['seconds']:.1f}s, {result['mb']:.1f} MB")
+    best = choose(results, max_seconds, max_mb)
+    return {"machine": machine_id(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "timeline": {"size": list(timeline.size), "fps": timeline.fps, "frames": timeline.n_frames},
+            "budget": {"seconds": max_seconds, "mb": max_mb},
+            "settings": best["settings"] if best else None,
+            "estimate": {key: best[key] for key in ("seconds", "mb")} if best else None,
+            "results": results}
+
+
+def save_profile(profile, path=None):
+    path = path or profile_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(profile, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+    return path
+
+
+def parse_tune(value):
+    return None if value in ("none", "-") else value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sceglie le impostazioni dell'encoder per questa macchina")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--generator", choices=sorted(GENERATORS), default="v2")
+    source.add_argument("--timeline", default=None, metavar="FILE", help="timeline JSON/YAML")
+    parser.add_argument("--max-seconds", type=float, default=None, help="budget di tempo del render intero")
+    parser.add_argument("--max-mb", type=float, default=None, help="budget di dimensione del video")
+    parser.add_argument("--codecs", nargs="+", default=list(CODECS))
+    parser.add_argument("--presets", nargs="+", default=list(PRESETS))
+    parser.add_argument("--crfs", type=int, nargs="+", default=list(CRFS), help="nella scala di x264")
+    parser.add_argument("--tunes", type=parse_tune, nargs="+", default=None,
+                        help="es. none stillimage (default: per codec)")
+    parser.add_argument("--threads", type=int, nargs="+", default=None,
+                        help=f"default {' '.join(map(str, thread_grid()))} su questa macchina")
+    parser.add_argument("-o", "--output", default=None, help=f"file del profilo (default {profile_path()})")
+    parser.add_argument("--dry-run", action="store_true", help="misura e stampa senza salvare il profilo")
+    args = parser.parse_args(argv)
+    if args.max_seconds is None and args.max_mb is None:
+        parser.error("serve almeno un budget: --max-seconds o --max-mb")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.timeline:
+        spec = load_spec(args.timeline)
+    else:
+        spec = importlib.import_module(GENERATORS[args.generator]).create_timeline_spec()
+    timeline = compile_timeline(spec, Canvas(tuple(spec.get("size", (1920, 1080))), spec.get("fps", 30)), lazy=True)
+    codecs = available_codecs(args.codecs)
+    if not codecs:
+        raise SystemExit(f"Nessun codec disponibile fra {', '.join(args.codecs)}")
+    grid = list(candidates(codecs, args.presets, args.crfs, args.tunes, args.threads or thread_grid()))
+    print(f"🎛️  Autotuning encoder: {len(grid)} combinazioni su {os.cpu_count()} core, "
+          f"{timeline.size[0]}x{timeline.size[1]} a {timeline.fps} fps")
+
+    profile = autotune(timeline, grid, args.max_seconds, args.max_mb)
+    if profile["settings"] is None:
+        print("❌ Nessuna combinazione sta nel budget")
+        raise SystemExit(1)
+    print(f"✅ Profilo: {describe(profile['settings'])}")
+    print(f"   Stima: {profile['estimate']['seconds']:.0f}s di render, {profile['estimate']['mb']:.1f} MB")
+    if not args.dry_run:
+        print(f"   Salvato in {save_profile(profile, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
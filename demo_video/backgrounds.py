@@ -0,0 +1,66 @@
+"""
+Sfondi a tutto schermo condivisi
+
+Ogni lastra (plate) viene costruita una sola volta per (dimensione, colori) e
+condivisa in sola lettura da tutte le scene che la usano. Le lastre a tinta
+unita non allocano nessun array finché qualcuno non lo chiede: il
+compositore le tratta come colore di fondo invece di fonderle come layer.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+class Plate:
+    """Sfondo a tutto schermo, in sola lettura"""
+
+    def __init__(self, size, key, build, color=None):
+        self.size = tuple(size)
+        self.key = key
+        self.color = color  # tinta unita, None per le sfumature
+        self._build = build
+        self._array = None
+
+    @property
+    def shape(self):
+        return (self.size[1], self.size[0], 3)
+
+    @property
+    def dtype(self):
+        return np.dtype(np.uint8)
+
+    @property
+    def array(self):
+        if self._array is None:
+            array = self._build()
+            array.setflags(write=False)
+            self._array = array
+        return self._array
+
+    def __repr__(self):
+        return f"Plate{self.key}"
+
+
+@lru_cache(maxsize=None)
+def solid_plate(size, color):
+    """Lastra a tinta unita"""
+    w, h = size
+    return Plate(size, ("solid", tuple(size), tuple(color)),
+                 lambda: np.full((h, w, 3), color, dtype=np.uint8), color=tuple(color))
+
+
+@lru_cache(maxsize=None)
+def gradient_plate(size, color1, color2):
+    """Sfumatura verticale da color1 (in alto) a color2 (in basso)"""
+    w, h = size
+
+    def build():
+        c1 = np.array(color1, dtype=np.float64)
+        c2 = np.array(color2, dtype=np.float64)
+        y = np.arange(h, dtype=np.float64)[:, None]
+        # Come int(c1 + (c2 - c1) * y / h) riga per riga: troncamento verso zero
+        rows = (c1 + (c2 - c1) * y / h).astype(np.uint8)
+        return np.ascontiguousarray(np.broadcast_to(rows[:, None, :], (h, w, 3)))
+
+    return Plate(size, ("gradient", tuple(size), tuple(color1), tuple(color2)), build)
@@ -0,0 +1,239 @@
+"""
+Render in serie di varianti del video (lingua, testata, giornalista)
+
+Un file di varianti (JSON o YAML) descrive cosa cambia rispetto alla
+timeline di base:
+
+    {"locales": {"en": {"Dashboard Principale": "Main Dashboard", ...}},
+     "intro": "Per {name} · {outlet}",
+     "variants": [{"id": "it"}, {"id": "en", "locale": "en"}]}
+
+Al posto di "variants" si può generare una variante per testata o per
+giornalista da assets/data/journalists.json:
+
+     "journalists": {"path": "assets/data/journalists.json", "by": "outlet",
+                     "country": "IT", "limit": 200}
+
+Per ogni variante i testi vengono tradotti con la tabella della sua lingua
+("locale", per i giornalisti "it" se il paese è IT, altrimenti "en"), i
+segnaposto {campo} vengono riempiti con i campi della variante e "intro"
+aggiunge una riga di dedica alla scena "intro".
+
+Il processo principale compila una volta la timeline di base, così sfondi,
+screenshot incorniciati e testi comuni sono già in cache quando i worker
+vengono creati con fork e li condividono. Con la cache dei segmenti ogni
+variante ricodifica solo le scene che cambiano davvero; l'audio viene
+codificato una volta per durata.
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+
+from demo_video.render import render_video
+from demo_video.segments import render_segments
+from demo_video.spec import compile_timeline, load_spec
+
+# Riga di dedica aggiunta alla scena "intro" (misure a 1920x1080)
+INTRO_LAYER = {"type": "text", "size": 36, "color": [180, 180, 180], "bold": False,
+               "pad": [20, 10], "position": ["center", 800], "start": 1.5,
+               "effects": [{"type": "CrossFadeIn", "duration": 0.5}]}
+
+# Stato ereditato dai worker (vedi _init_worker)
+_job = None
+
+
+def slug(text):
+    text = re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-")
+    return text or "variante"
+
+
+def journalist_variants(path, by="outlet", country=None, limit=None):
+    """Una variante per testata o per giornalista"""
+    with open(path, encoding="utf-8") as f:
+        journalists = json.load(f)
+    variants = []
+    seen = set()
+    for person in journalists:
+        if country and person.get("country") != country:
+            continue
+        fields = {k: v if v is not None else "" for k, v in person.items()}
+        fields["locale"] = "it" if person.get("country") == "IT" else "en"
+        if by == "outlet":
+            if not fields["outlet"] or fields["outlet"] in seen:
+                continue
+            seen.add(fields["outlet"])
+            fields["id"] = slug(fields["outlet"])
+        else:
+            fields["id"] = f'{person["id"]}-{slug(fields["name"])}'
+        variants.append(fields)
+        if limit and len(variants) >= limit:
+            break
+    return variants
+
+
+def load_variants(path):
+    """Varianti, tabelle delle lingue e riga di dedica da un file"""
+    data = load_spec(path)
+    if isinstance(data, list):
+        data = {"variants": data}
+    variants = list(data.get("variants", ()))
+    source = data.get("journalists")
+    if source:
+        source = dict(source)
+        variants += journalist_variants(source.pop("path"), **source)
+    ids = set()
+    for variant in variants:
+        # Id univoci: diventano nomi di file
+        base = variant["id"] = slug(variant.get("id", "variante"))
+        n = 1
+        while variant["id"] in ids:
+            n += 1
+            variant["id"] = f"{base}-{n}"
+        ids.add(variant["id"])
+    return variants, data.get("locales", {}), data.get("intro")
+
+
+class _Fields(dict):
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+def _localize(text, strings, fields):
+    text = strings.get(text, text)
+    return text.format_map(fields) if "{" in text else text
+
+
+def apply_variant(spec, variant, locales=None, intro=None):
+    """Copia della timeline con testi tradotti e personalizzati"""
+    spec = json.loads(json.dumps(spec, default=list))
+    strings = (locales or {}).get(variant.get("locale"), {})
+    fields = _Fields(variant)
+    for scene in spec["scenes"]:
+        if intro and scene["name"] == "intro":
+            scene["layers"].append(dict(INTRO_LAYER, text=intro))
+        for layer in scene["layers"]:
+            if layer["type"] == "counter":
+                # I campi di un contatore sono dati dell'app, non della variante
+                layer["text"] = strings.get(layer["text"], layer["text"])
+            elif "text" in layer:
+                layer["text"] = _localize(layer["text"], strings, fields)
+    return spec
+
+
+def variant_output(output, variant, outdir=None):
+    root, ext = os.path.splitext(os.path.basename(output))
+    return os.path.join(outdir or os.path.dirname(output), f"{root}_{variant['id']}{ext or '.mp4'}")
+
+
+def _init_worker(job):
+    global _job
+    _job = job
+
+
+def _render_variant(variant):
+    job = _job
+    t0 = time.time()
+    spec = apply_variant(job["spec"], variant, job["locales"], job["intro"])
+    timeline = compile_timeline(spec, job["canvas"])
+    audio = job["audio"].get(round(timeline.duration, 3))
+    output = variant["output"]
+    if job["cache"] is not None:
+        render_segments(timeline, output, 1, audio=audio, cache=job["cache"],
+                        settings=job["settings"], verbose=False)
+    else:
+        render_video(timeline, output, job["settings"], audio=audio)
+    return output, time.time() - t0
+
+
+def render_batch(spec, variants, output, canvas, settings, workers=1, cache=None,
+                 music=None, locales=None, intro=None, outdir=None):
+    """
+    Rende tutte le varianti con `workers` processi.
+
+    `music(duration)` restituisce il percorso della colonna sonora già
+    codificata (vedi demo_video.audio.music_track) o None.
+    Restituisce la lista delle varianti fallite.
+    """
+    if not variants:
+        print("    ✗ Nessuna variante da rendere")
+        return []
+    workers = max(1, workers)
+    if workers > 1:
+        settings = replace(settings, threads=max(1, (os.cpu_count() or 1) // workers))
+    for variant in variants:
+        variant.setdefault("output", variant_output(output, variant, outdir))
+        os.makedirs(os.path.dirname(os.path.abspath(variant["output"])), exist_ok=True)
+
+    # Timeline di base: riempie le cache di sfondi, screenshot e testi comuni
+    base = compile_timeline(spec, canvas)
+
+    audio = {}
+    if music is not None:
+        # Un solo AAC per durata: di solito tutte le varianti durano uguali
+        durations = set()
+        for variant in variants:
+            try:
+                plan = compile_timeline(apply_variant(spec, variant, locales, intro), canvas, lazy=True)
+            except Exception:
+                continue  # la variante fallirà nel render, che la segnala
+            durations.add(round(plan.duration, 3))
+        for duration in sorted(durations):
+            track = music(duration)
+            if track is not None:
+                audio[duration] = track
+    job = {"spec": spec, "canvas": canvas, "settings": settings, "cache": cache,
+           "locales": locales, "intro": intro, "audio": audio}
+
+    failed = []
+    t0 = time.time()
+
+    def report(n, variant, result):
+        path, seconds = result
+        rate = n / (time.time() - t0) * 3600
+        print(f"    ✓ [{n}/{len(variants)}] {variant['id']} → {path} ({seconds:.1f} s, {rate:.0f}/ora)")
+
+    pending = list(enumerate(variants, 1))
+    if cache is not None and workers > 1 and len(variants) > 1:
+        # La prima variante in questo processo riempie la cache con i
+        # segmenti comuni, che i worker poi trovano già pronti
+        _init_worker(job)
+        n, variant = pending.pop(0)
+        try:
+            report(n, variant, _render_variant(variant))
+        except Exception as exc:
+            failed.append(variant)
+            print(f"    ✗ [{n}/{len(variants)}] {variant['id']}: {exc}")
+
+    if workers > 1 and len(pending) > 1:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with ProcessPoolExecutor(workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(job,)) as pool:
+            futures = [pool.submit(_render_variant, variant) for _, variant in pending]
+            for (n, variant), future in zip(pending, futures):
+                try:
+                    report(n, variant, future.result())
+                except Exception as exc:
+                    failed.append(variant)
+                    print(f"    ✗ [{n}/{len(variants)}] {variant['id']}: {exc}")
+    else:
+        _init_worker(job)
+        for n, variant in pending:
+            try:
+                report(n, variant, _render_variant(variant))
+            except Exception as exc:
+                failed.append(variant)
+                print(f"    ✗ [{n}/{len(variants)}] {variant['id']}: {exc}")
+    return failed
+
+
+def add_batch_arguments(parser):
+    parser.add_argument("--variants", default=None, metavar="FILE",
+                        help="rende in serie le varianti descritte nel file JSON/YAML")
+    parser.add_argument("--batch-dir", default=None, metavar="DIR",
+                        help="directory dei video delle varianti (default: quella del video)")
@@ -0,0 +1,305 @@
+"""
+Benchmark offline della pipeline dei video demo
+
+    python -m demo_video.bench --slides 2 5 --scales 0.5 1 --fps 30 -o bench.json
+    python -m demo_video.bench --compare vecchio.json nuovo.json
+
+Non serve la rete né gli asset veri: gli screenshot sono JPEG generati e la
+musica è un WAV sintetico. Per ogni combinazione di numero di slide,
+risoluzione e fps vengono misurati tempo, frame al secondo e picco di RSS
+di ogni fase:
+
+- assets:      caricamento e ridimensionamento degli screenshot
+- text:        rasterizzazione dei testi (cache vuote)
+- compose:     composizione dei frame fuori dalle transizioni
+- transitions: composizione dei frame dentro le dissolvenze fra scene
+- audio:       decodifica, volume, dissolvenza e codifica AAC della musica
+               (cache audio vuota)
+- encode:      render completo dello stream video (composizione + ffmpeg)
+
+Il JSON contiene anche commit, versioni e macchina, così due file presi su
+commit diversi si possono confrontare con --compare.
+"""
+
+import argparse
+import contextlib
+import importlib
+import itertools
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from demo_video import text
+from demo_video.canvas import Canvas
+from demo_video.encoder import EncoderSettings, FFmpegWriter
+from demo_video.memory import ASSETS, FRAMES
+from demo_video.spec import LAYER_TYPES, compile_timeline
+
+STAGES = ("assets", "text", "compose", "transitions", "audio", "encode")
+
+GENERATORS = {"v1": "create_demo_video", "v2": "create_demo_video_v2"}
+
+
+@contextlib.contextmanager
+def patched(module, **values):
+    """Sostituisce le globali del generatore per la durata del blocco e le ripristina"""
+    missing = object()
+    saved = {name: getattr(module, name, missing) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield module
+    finally:
+        for name, value in saved.items():
+            if value is missing:
+                delattr(module, name)
+            else:
+                setattr(module, name, value)
+
+
+class PeakRSS:
+    """Campiona l'RSS del processo in un thread finché il blocco è attivo"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def current(self):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page
+        except OSError:
+            # Senza /proc resta solo il picco dall'avvio del processo
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def measure(fn, frames=None):
+    """Tempo, picco di RSS e (se ci sono frame) frame al secondo di fn()"""
+    with PeakRSS() as rss:
+        t0 = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - t0
+    result = {"seconds": round(seconds, 4), "peak_rss_mb": round(rss.peak / 2**20, 1)}
+    if frames is not None:
+        result["frames"] = frames
+        result["fps"] = round(frames / seconds, 2) if seconds > 0 else None
+    return result
+
+
+def make_screenshot(path, n, size=(1170, 2532)):
+    """Screenshot finto di un telefono: bande, riquadri, testo e un po' di rumore"""
+    w, h = size
+    rng = np.random.default_rng(n)
+    y = np.linspace(0, 1, h)[:, None, None]
+    top, bottom = rng.integers(0, 255, 3), rng.integers(0, 255, 3)
+    pixels = top + (bottom - top) * y + rng.normal(0, 6, (h, w, 3))
+    img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(img)
+    for k in range(12):
+        y0 = 200 + k * 190
+        draw.rounded_rectangle([60, y0, w - 60, y0 + 150], 24, fill=tuple(int(c) for c in rng.integers(0, 255, 3)))
+        draw.text((100, y0 + 60), f"Schermata {n} - riga {k}", fill=(255, 255, 255))
+    img.save(path, quality=90)
+    return path
+
+
+def make_music(path, seconds, rate=44100):
+    """WAV stereo sintetico (accordo con inviluppo)"""
+    t = np.arange(int(seconds * rate)) / rate
+    tone = sum(np.sin(2 * np.pi * f * t) for f in (220.0, 277.2, 329.6)) / 3
+    tone *= 0.5 + 0.5 * np.sin(2 * np.pi * 0.25 * t)
+    pcm = (np.stack([tone, tone], axis=1) * 20000).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(pcm.tobytes())
+    return path
+
+
+def _layers(spec, types):
+    return [layer for scene in spec["scenes"] for layer in scene["layers"] if layer["type"] in types]
+
+
+def _clear_text_caches():
+    ASSETS.clear()
+    FRAMES.clear()
+    text.atlas_for.cache_clear()
+    text.load_font.cache_clear()
+
+
+def _frames(timeline):
+    """Frame della timeline divisi fra dentro e fuori le dissolvenze di scena"""
+    inside, outside = [], []
+    for k in range(timeline.n_frames):
+        index, local_t = timeline.locate(k / timeline.fps)
+        scene = timeline.scenes[index]
+        fading = any(a <= local_t < b for a, b in
+                     (fx.animated_span(scene.duration) for fx in scene.effects))
+        (inside if fading else outside).append(k)
+    return outside, inside
+
+
+def run_case(generator, slides, scale, fps, workdir, settings):
+    """Misura tutte le fasi per una combinazione di parametri"""
+    gen = importlib.import_module(GENERATORS[generator])
+    screenshots = [make_screenshot(os.path.join(workdir, f"screen_{n}.jpg"), n)
+                   for n in range(min(slides, 5))]
+    bench_slides = [dict(slide, image=screenshots[n % len(screenshots)])
+                    for n, slide in zip(range(slides), itertools.cycle(gen.SLIDES))]
+    with patched(gen, SLIDES=bench_slides):
+        spec = gen.create_timeline_spec()
+    canvas = Canvas(tuple(spec["size"]), fps, scale)
+
+    stages = {}
+    images = _layers(spec, {"image"})
+    stages["assets"] = measure(lambda: [LAYER_TYPES["image"](layer, canvas) for layer in images])
+    stages["assets"]["images"] = len(images)
+
+    _clear_text_caches()
+    texts = _layers(spec, {"text", "bullet"})
+    stages["text"] = measure(lambda: [LAYER_TYPES[layer["type"]](layer, canvas) for layer in texts])
+    stages["text"]["strings"] = len(texts)
+
+    timeline = compile_timeline(spec, canvas)
+    outside, inside = _frames(timeline)
+    for name, frames in (("compose", outside), ("transitions", inside)):
+        timeline._held_key = None
+        stages[name] = measure(lambda: [timeline.frame_function(k / fps) for k in frames], len(frames))
+
+    music = getattr(gen, "create_music", None)
+    if music is not None:
+        music_file = make_music(os.path.join(workdir, "music.wav"), timeline.duration + 1)
+
+        def audio():
+            shutil.rmtree(os.path.join(workdir, "cache"), ignore_errors=True)
+            music(timeline.duration, os.path.join(workdir, "cache"))
+        try:
+            with patched(gen, MUSIC_FILE=music_file):
+                stages["audio"] = measure(audio)
+        except ImportError as exc:
+            stages["audio"] = {"skipped": str(exc)}
+    else:
+        stages["audio"] = {"skipped": f"{generator} non ha musica"}
+
+    timeline = compile_timeline(spec, canvas)
+    output = os.path.join(workdir, "bench.mp4")
+
+    def encode():
+        with FFmpegWriter(output, timeline.size, timeline.fps, settings) as writer:
+            timeline.write(writer)
+    stages["encode"] = measure(encode, timeline.n_frames)
+    stages["encode"]["ffmpeg_peak_rss_mb"] = round(
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+    stages["encode"]["bytes"] = os.path.getsize(output)
+
+    return {
+        "params": {"generator": generator, "slides": slides, "scale": scale, "fps": fps,
+                   "size": list(timeline.size), "frames": timeline.n_frames,
+                   "duration": round(timeline.duration, 3), "held_ratio": round(timeline.held_ratio(), 4)},
+        "stages": stages,
+    }
+
+
+def machine_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {"commit": commit or None, "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def _case_key(run):
+    p = run["params"]
+    return (p["generator"], p["slides"], p["scale"], p["fps"])
+
+
+def compare(old_path, new_path):
+    """Stampa il rapporto nuovo/vecchio dei tempi per le combinazioni comuni"""
+    with open(old_path) as f:
+        old = {_case_key(run): run for run in json.load(f)["runs"]}
+    with open(new_path) as f:
+        new = {_case_key(run): run for run in json.load(f)["runs"]}
+    print(f"{'caso':<24}" + "".join(f"{stage:>13}" for stage in STAGES))
+    for key in sorted(old.keys() & new.keys()):
+        cells = []
+        for stage in STAGES:
+            a = old[key]["stages"].get(stage, {}).get("seconds")
+            b = new[key]["stages"].get(stage, {}).get("seconds")
+            cells.append(f"{b / a:12.2f}x" if a and b else f"{'-':>13}")
+        print(f"{'%s %d slide %gx %dfps' % key:<24}" + "".join(cells))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline del render dei video demo")
+    parser.add_argument("--generator", choices=sorted(GENERATORS), default="v2")
+    parser.add_argument("--slides", type=int, nargs="+", default=[5])
+    parser.add_argument("--scales", type=float, nargs="+", default=[0.5, 1.0],
+                        help="fattori di risoluzione rispetto a 1920x1080")
+    parser.add_argument("--fps", type=int, nargs="+", default=[30])
+    parser.add_argument("--preset", default="ultrafast")
+    parser.add_argument("-o", "--output", default=None, help="file JSON dei risultati")
+    parser.add_argument("--compare", nargs=2, metavar=("VECCHIO", "NUOVO"), default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    settings = EncoderSettings(preset=args.preset)
+    results = {"machine": machine_info(), "settings": dict(settings.output_key()), "runs": []}
+    workdir = tempfile.mkdtemp(prefix="gpress-bench-")
+    try:
+        for slides, scale, fps in itertools.product(args.slides, args.scales, args.fps):
+            print(f"  → {args.generator}: {slides} slide, scala {scale}, {fps} fps...", file=sys.stderr)
+            run = run_case(args.generator, slides, scale, fps, workdir, settings)
+            results["runs"].append(run)
+            print("    " + ", ".join(f"{name} {stage['seconds']:.2f}s" for name, stage in run["stages"].items()
+                                     if "seconds" in stage), file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    data = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+
+
+if __name__ == "__main__":
+    main()
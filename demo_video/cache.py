@@ -0,0 +1,124 @@
+"""
+Cache su disco dei segmenti già codificati e degli asset derivati
+
+Ogni segmento è indicizzato da un hash del suo contenuto: i pixel e la
+disposizione dei layer delle scene che attraversa (quindi testi, colori,
+font, screenshot e costanti di stile), gli istanti campionati e le
+impostazioni dell'encoder. Se cambia una sola slide, solo i segmenti che la
+contengono vengono ricodificati.
+
+Gli asset derivati (screenshot ridimensionati e incorniciati) sono array
+.npy non compressi: i render successivi e i worker li aprono in mmap senza
+decodificare né ricampionare le immagini.
+"""
+
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from demo_video.backgrounds import Plate
+
+# Da incrementare quando cambia il modo in cui i layer vengono composti
+RENDER_VERSION = 4
+
+# Da incrementare quando cambia il modo in cui gli asset vengono costruiti
+ASSET_VERSION = 1
+
+
+def default_cache_dir():
+    root = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.environ.get("GPRESS_VIDEO_CACHE", os.path.join(root, "gpress-demo-video"))
+
+
+def scene_fingerprint(scene):
+    """Hash del contenuto di una scena: pixel, posizioni, tempi ed effetti"""
+    if hasattr(scene, "fingerprint"):
+        # Scene costruite durante il render: basta la loro descrizione
+        return scene.fingerprint()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((scene.name, tuple(scene.size), scene.effects)).encode())
+    for layer in scene.layers:
+        image = layer.image
+        h.update(repr((image.shape, str(image.dtype), layer.position,
+                       layer.start, layer.duration, layer.effects)).encode())
+        if isinstance(image, Plate) or hasattr(image, "frame"):
+            # Lastre, contatori e grafici sono definiti dai loro parametri
+            h.update(repr(image.key).encode())
+            continue
+        h.update(memoryview(image if image.flags.c_contiguous else image.copy()).cast("B"))
+    return h.hexdigest()
+
+
+def segment_key(timeline, segment, settings, fingerprints):
+    """Chiave di un segmento: scene attraversate, tempi locali ed encoder"""
+    fps = timeline.fps
+    first, _ = timeline.locate(segment.first / fps)
+    last, _ = timeline.locate((segment.last - 1) / fps)
+    h = hashlib.blake2b(digest_size=20)
+    h.update(repr((RENDER_VERSION, fps, segment.n_frames, settings.output_key())).encode())
+    for index in range(first, last + 1):
+        # Istante locale del primo frame del segmento rispetto a ogni scena
+        local_t = round(segment.first / fps - timeline.offsets[index], 6)
+        h.update(repr((fingerprints[index], local_t)).encode())
+    return h.hexdigest()
+
+
+class SegmentCache:
+    """Directory di segmenti .mp4 indicizzati per chiave"""
+
+    def __init__(self, root=None):
+        self.root = os.path.join(root or default_cache_dir(), "segments")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key + ".mp4")
+
+    def get(self, key):
+        path = self.path(key)
+        return path if os.path.exists(path) else None
+
+    def store(self, key, src):
+        """Sposta un segmento appena codificato nella cache (scrittura atomica)"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        shutil.move(src, tmp)
+        os.replace(tmp, path)
+        return path
+
+
+class AssetStore:
+    """Directory di asset derivati (.npy) indicizzati per descrizione e file sorgente"""
+
+    def __init__(self, root=None):
+        self.root = os.path.join(root or default_cache_dir(), "assets")
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(description):
+        return hashlib.blake2b(repr((ASSET_VERSION, description)).encode(), digest_size=20).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key + ".npy")
+
+    def get(self, key):
+        """Array in sola lettura mappato dal file, None se manca"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            # File rovinato: l'asset viene ricostruito
+            return None
+
+    def store(self, key, array):
+        """Salva l'array (scrittura atomica) e lo restituisce mappato dal file"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp, np.ascontiguousarray(array))
+        os.replace(tmp, path)
+        return np.load(path, mmap_mode="r")
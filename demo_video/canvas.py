@@ -0,0 +1,91 @@
+"""
+Tela di destinazione: risoluzione, fps e scala del layout
+
+I generatori descrivono il layout in pixel della tela 1920x1080. Una tela
+ridotta (modalità bozza) scala in proporzione coordinate, dimensioni dei
+font e degli screenshot, così l'anteprima ha la stessa composizione del
+video finale; gli asset vengono caricati direttamente alla risoluzione
+ridotta invece di essere rimpiccioliti dopo.
+"""
+
+import os
+from dataclasses import dataclass, replace
+
+from PIL import Image
+
+# Fattore di scala e fps predefiniti di --draft
+DRAFT_SCALE = 0.5
+DRAFT_FPS = 15
+DRAFT_PRESET = "ultrafast"
+
+
+@dataclass(frozen=True)
+class Canvas:
+    """Dimensioni di riferimento del layout, fps e fattore di scala"""
+    base_size: tuple = (1920, 1080)
+    fps: int = 30
+    scale: float = 1.0
+
+    @property
+    def size(self):
+        """Risoluzione della tela, arrotondata per difetto a misure pari (yuv420p
+        di libx264 non accetta dimensioni dispari, es. --draft 0.333 -> 639x360)"""
+        return tuple(max(self.px(v) & ~1, 2) for v in self.base_size)
+
+    @property
+    def is_draft(self):
+        return self.scale != 1.0
+
+    def px(self, value):
+        """Una misura del layout (in pixel a scala piena) sulla tela"""
+        if self.scale == 1.0:
+            return value
+        scaled = int(round(value * self.scale))
+        # Una misura positiva non sparisce mai del tutto (es. linee da 1 px)
+        return max(scaled, 1) if value > 0 else scaled
+
+    def pos(self, position):
+        """Posizione di un layer: scala le coordinate, lascia "center" & co."""
+        if isinstance(position, str):
+            return position
+        return tuple(v if isinstance(v, str) else self.px(v) for v in position)
+
+    def draft(self, scale=DRAFT_SCALE, fps=DRAFT_FPS):
+        return replace(self, scale=scale, fps=fps)
+
+    def open_image(self, path, height, mode='RGB'):
+        """
+        Apre un'immagine che verrà mostrata alta `height` pixel a scala piena.
+
+        In bozza il decoder JPEG riduce già in decodifica (Image.draft), quindi
+        gli screenshot non vengono mai decompressi a piena risoluzione.
+        """
+        img = Image.open(path)
+        if self.is_draft:
+            img.draft(mode, (1, self.px(height)))
+        return img.convert(mode)
+
+
+def add_draft_arguments(parser):
+    parser.add_argument("--draft", type=float, nargs="?", const=DRAFT_SCALE, default=None,
+                        metavar="SCALA",
+                        help=f"anteprima veloce a risoluzione ridotta (default {DRAFT_SCALE}, "
+                             f"{DRAFT_FPS} fps, preset {DRAFT_PRESET})")
+    parser.add_argument("--draft-fps", type=int, default=DRAFT_FPS,
+                        help="fps della bozza")
+
+
+def canvas_from_args(args, size, fps):
+    """Tela del render (piena o bozza) secondo --draft"""
+    canvas = Canvas(tuple(size), fps)
+    if args.draft is not None:
+        if not 0 < args.draft <= 1:
+            raise SystemExit(f"--draft {args.draft:g}: la scala della bozza deve essere in (0, 1]")
+        canvas = canvas.draft(args.draft, args.draft_fps)
+    return canvas
+
+
+def draft_output(path):
+    """La bozza non sovrascrive il video finale"""
+    root, ext = os.path.splitext(path)
+    return f"{root}_draft{ext or '.mp4'}"
@@ -0,0 +1,128 @@
+"""
+Controllo veloce di una timeline, senza comporre né codificare
+
+    python create_demo_video_v2.py --check
+
+Un percorso sbagliato in SLIDES o un testo troppo lungo si scoprono
+altrimenti solo guardando il video finito. Il controllo legge solo le
+intestazioni delle immagini e le metriche dei font, quindi parte e finisce
+in una frazione di secondo, e segnala:
+
+- immagini mancanti (saltate o sostituite dal riquadro "?")
+- font non trovati (il testo userebbe il font di default di PIL)
+- layer che escono dalla tela
+- durata di ogni scena, durata totale e numero di frame
+
+Esce con codice 1 se trova problemi, così la CI può fermare il merge.
+"""
+
+import os
+
+from PIL import Image
+
+from demo_video.compositor import resolve_position
+from demo_video.spec import LAYER_TYPES, _position, compile_timeline, layer_label
+from demo_video.text import font_path, get_font, text_bbox
+
+
+def layer_size(spec, canvas):
+    """Dimensioni (w, h) del layer sulla tela, None se il layer verrebbe saltato"""
+    px = canvas.px
+    kind = spec["type"]
+    if kind in ("gradient", "solid"):
+        return canvas.size
+    if kind == "rect":
+        return tuple(canvas.pos(spec["rect"]))
+    if kind in ("text", "bullet"):
+        bold = spec.get("bold", kind == "text")
+        bbox = text_bbox(spec["text"], get_font(px(spec["size"]), bold))
+        w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        if kind == "bullet":
+            return (w + px(80), h + px(20))
+        pad = canvas.pos(spec.get("pad", (20, 20)))
+        return (w + pad[0] * 2, h + pad[1] * 2)
+    if kind == "image":
+        if not os.path.exists(spec["path"]):
+            return None if spec.get("missing", "skip") == "skip" else tuple(canvas.pos((400, 800)))
+        if "fit" in spec:
+            w, h = canvas.pos(spec["fit"])
+        else:
+            with Image.open(spec["path"]) as img:
+                aspect = img.width / img.height
+            h = px(spec["height"])
+            w = int(h * aspect)
+        padding = px(spec["frame"]["padding"]) if spec.get("frame") else 0
+        return (w + padding * 2, h + padding * 2)
+    if kind in ("counter", "chart"):
+        # Numeri letti dal file di dati: sono pochi pixel, si costruiscono
+        shape = LAYER_TYPES[kind](spec, canvas).shape
+        return (shape[1], shape[0])
+    raise ValueError(f"tipo di layer sconosciuto: {kind!r}")
+
+
+def check_scene(spec, canvas):
+    """Problemi di una scena (messaggi leggibili)"""
+    problems = []
+    placed = {}
+    width, height = canvas.size
+    for layer_spec in spec["layers"]:
+        label = layer_label(layer_spec)
+        if layer_spec["type"] in ("counter", "chart") and not os.path.exists(layer_spec["path"]):
+            problems.append(f"dati mancanti {layer_spec['path']}")
+            continue
+        if layer_spec["type"] == "image" and not os.path.exists(layer_spec["path"]):
+            action = "saltata" if layer_spec.get("missing", "skip") == "skip" else "riquadro ?"
+            problems.append(f"immagine mancante {layer_spec['path']} ({action})")
+        try:
+            size = layer_size(layer_spec, canvas)
+            if size is None:
+                continue
+            x, y = resolve_position(_position(layer_spec, canvas, placed), size, canvas.size)
+        except (KeyError, ValueError) as exc:
+            problems.append(f"{label}: {exc}")
+            continue
+        if "id" in layer_spec:
+            placed[layer_spec["id"]] = (x, y) + size
+        if layer_spec["type"] in ("gradient", "solid"):
+            continue
+        if x < 0 or x + size[0] > width:
+            problems.append(f"{label} esce dalla tela in orizzontale (x {x}..{x + size[0]} su {width})")
+        if y < 0 or y + size[1] > height:
+            problems.append(f"{label} esce dalla tela in verticale (y {y}..{y + size[1]} su {height})")
+    return problems
+
+
+def check_fonts(spec):
+    """Font richiesti dai testi che non si trovano sul sistema"""
+    weights = {layer.get("bold", layer["type"] not in ("bullet", "chart")) for scene in spec["scenes"]
+               for layer in scene["layers"] if layer["type"] in ("text", "bullet", "counter", "chart")}
+    return [f"font {'in grassetto' if bold else 'normale'} non trovato: si userebbe il font di default di PIL"
+            for bold in sorted(weights) if font_path(bold) is None]
+
+
+def check_report(spec, canvas, out=print):
+    """Stampa durate e problemi della timeline; True se non ci sono problemi"""
+    try:
+        timeline = compile_timeline(spec, canvas, lazy=True)
+    except (KeyError, TypeError, ValueError) as exc:
+        out(f"❌ Timeline non valida: {exc!r}")
+        return False
+    out(f"  → Controllo di {len(spec['scenes'])} scene ({canvas.size[0]}x{canvas.size[1]})...")
+    problems = [(None, message) for message in check_fonts(spec)]
+    for offset, scene, scene_spec in zip(timeline.offsets, timeline.scenes, spec["scenes"]):
+        out(f"    {offset:6.1f}s  {scene_spec['name']:<24} {scene.duration:5.1f}s  "
+            f"{len(scene_spec['layers'])} layer")
+        problems += [(scene_spec["name"], message) for message in check_scene(scene_spec, canvas)]
+    out(f"  → Durata totale {timeline.duration:.1f}s: {timeline.n_frames} frame a {timeline.fps} fps")
+    for scene, message in problems:
+        out(f"    ✗ {scene + ': ' if scene else ''}{message}")
+    if problems:
+        out(f"❌ {len(problems)} problemi")
+    else:
+        out("✅ Nessun problema")
+    return not problems
+
+
+def add_check_arguments(parser):
+    parser.add_argument("--check", "--plan", action="store_true",
+                        help="controlla asset, font, ingombri e durate senza rendere il video")
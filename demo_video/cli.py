@@ -0,0 +1,159 @@
+"""
+Riga di comando comune dei generatori di video demo
+
+Ogni generatore descrive solo il suo video (timeline, file d'uscita,
+risoluzione, musica) e chiama run(); argomenti e modalità di render sono
+gli stessi per tutti:
+
+    --check            controlla la timeline senza rendere nulla
+    --variants FILE    una copia del video per variante (demo_video.batch)
+    --outputs ...      più formati in un passaggio (demo_video.outputs)
+    --farm N           render distribuito a chunk (demo_video.farm)
+    --workers N        processi del render a segmenti (demo_video.segments)
+    --no-cache         render unico, senza cache (demo_video.render)
+
+Di default il video viene reso a segmenti con la cache su disco
+(~/.cache/gpress-demo-video, o --cache-dir): un nuovo render rifà solo le
+scene cambiate. --no-cache torna al render unico, senza cache di segmenti
+e screenshot (la colonna sonora codificata resta comunque in cache).
+"""
+
+import argparse
+
+from demo_video.batch import add_batch_arguments, load_variants, render_batch
+from demo_video.cache import AssetStore, SegmentCache
+from demo_video.canvas import DRAFT_PRESET, add_draft_arguments, canvas_from_args, draft_output
+from demo_video.check import add_check_arguments, check_report
+from demo_video.encoder import EncoderSettings, add_encoder_arguments
+from demo_video.farm import add_farm_arguments, farm_problem, render_farm
+from demo_video.memory import set_memory_budget
+from demo_video.outputs import add_output_arguments, render_outputs
+from demo_video.render import render_video
+from demo_video.segments import render_segments
+from demo_video.spec import add_timeline_arguments, compile_timeline, load_spec, save_spec, use_asset_store
+from demo_video.trace import TRACER, add_trace_arguments
+
+
+def parse_args(description, argv=None):
+    parser = argparse.ArgumentParser(
+        description=description,
+        epilog="Di default il render è a segmenti con la cache su disco (vedi --cache-dir): "
+               "si rifanno solo le scene cambiate. Con --no-cache il render è unico, senza cache di segmenti e screenshot.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processi per il render a segmenti (default: 1)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="directory della cache di segmenti e asset, usata di default "
+                             "(default: ~/.cache/gpress-demo-video)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="niente cache di segmenti e screenshot: con --workers 1 esegue un render unico")
+    add_timeline_arguments(parser)
+    add_batch_arguments(parser)
+    add_draft_arguments(parser)
+    add_encoder_arguments(parser)
+    add_trace_arguments(parser)
+    add_output_arguments(parser)
+    add_farm_arguments(parser)
+    add_check_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def run(name, create_timeline_spec, output_file, size, fps, music=None, vertical=None, argv=None):
+    """
+    Genera il video `name` secondo gli argomenti della riga di comando.
+
+    `create_timeline_spec()` restituisce la timeline predefinita;
+    `music(duration, cache_dir)` la colonna sonora (o None); `vertical` è
+    (create_spec, size) del taglio verticale, se il video ne ha uno.
+    """
+    args = parse_args(f"Genera il video demo {name}", argv)
+    if args.farm is not None and farm_problem(args.farm, args.farm_listen):
+        raise SystemExit(farm_problem(args.farm, args.farm_listen))
+    if args.trace:
+        TRACER.enable(args.trace)
+    set_memory_budget(args.memory_budget)
+    if not args.no_cache:
+        # Screenshot già ridimensionati e incorniciati dai render precedenti
+        use_asset_store(AssetStore(args.cache_dir))
+    canvas = canvas_from_args(args, size, fps)
+    output = draft_output(output_file) if canvas.is_draft else output_file
+    print(f"🎬 Creazione video demo {name}...")
+    if canvas.is_draft:
+        print(f"  → Bozza {canvas.size[0]}x{canvas.size[1]} a {canvas.fps} fps")
+
+    # Descrizione dichiarativa del video, compilata in scene
+    if args.timeline:
+        spec = load_spec(args.timeline)
+        canvas = canvas_from_args(args, spec.get("size", size), spec.get("fps", fps))
+    else:
+        spec = create_timeline_spec()
+    if args.export_timeline:
+        save_spec(spec, args.export_timeline)
+        print(f"  → Timeline salvata in {args.export_timeline}")
+    if args.check:
+        # Solo controllo: niente composizione né encoder
+        raise SystemExit(0 if check_report(spec, canvas) else 1)
+
+    soundtrack = None if music is None else (lambda duration: music(duration, args.cache_dir))
+    # In bozza il preset veloce, a meno che --preset non ne chieda un altro
+    overrides = {"preset": DRAFT_PRESET} if canvas.is_draft and args.preset is None else {}
+    settings = EncoderSettings.from_args(args, **overrides)
+    if args.variants:
+        # Una copia del video per lingua, testata o giornalista
+        variants, locales, intro = load_variants(args.variants)
+        print(f"  → {len(variants)} varianti con {args.workers} worker...")
+        cache = None if args.no_cache else SegmentCache(args.cache_dir)
+        failed = render_batch(spec, variants, output, canvas, settings, args.workers, cache,
+                              music=soundtrack, locales=locales, intro=intro, outdir=args.batch_dir)
+        print(f"✅ Varianti create: {len(variants) - len(failed)}/{len(variants)}")
+        if failed:
+            raise SystemExit(1)
+        return
+
+    # Con --farm le scene le compongono i worker: qui basta pianificarle
+    farm = args.farm is not None and not args.outputs
+    if farm:
+        print(f"  → {len(spec['scenes'])} scene composte dai worker della farm...")
+    elif args.stream:
+        print(f"  → {len(spec['scenes'])} scene costruite durante il render "
+              f"(asset entro {args.memory_budget:g} MB)...")
+    else:
+        print(f"  → Compilazione di {len(spec['scenes'])} scene...")
+    # I tratti statici di ogni scena vengono composti una sola volta
+    timeline = compile_timeline(spec, canvas, lazy=args.stream or farm)
+    print(f"  → Frame statici riutilizzati: {timeline.held_ratio():.0%}")
+
+    audio = None
+    if soundtrack is not None:
+        print("  → Aggiunta musica...")
+        audio = soundtrack(timeline.duration)
+
+    print(f"  → Esportazione in {output}...")
+    if args.outputs:
+        # Un solo passaggio: ogni frame composto una volta per tutte le uscite
+        timelines = {"landscape": timeline}
+        if "vertical" in args.outputs:
+            if vertical is None:
+                raise SystemExit(f"Il taglio verticale non è disponibile per il video {name}")
+            if args.timeline:
+                raise SystemExit("Il taglio verticale usa il layout predefinito: non è compatibile con --timeline")
+            create_vertical_spec, vertical_size = vertical
+            timelines["vertical"] = compile_timeline(create_vertical_spec(), canvas_from_args(args, vertical_size, fps),
+                                                     lazy=args.stream)
+        paths = render_outputs(timelines, output, args.outputs, settings, audio=audio)
+        for fmt, path in paths.items():
+            print(f"    ✓ {fmt}: {path}")
+    elif farm:
+        # Chunk assegnati dal coordinatore a worker locali (ed eventualmente remoti)
+        render_farm(spec, canvas, output, args.farm, settings, audio=audio, listen=args.farm_listen,
+                    cache_dir=args.cache_dir, use_cache=not args.no_cache)
+    elif args.workers > 1 or not args.no_cache:
+        cache = None if args.no_cache else SegmentCache(args.cache_dir)
+        render_segments(timeline, output, args.workers, audio=audio, cache=cache, settings=settings)
+    else:
+        render_video(timeline, output, settings, audio=audio)
+
+    print(f"✅ Video creato: {output}")
+    print(f"   Durata: {timeline.duration:.1f} secondi")
+    if args.trace:
+        TRACER.save()
+        print(f"   Trace: {args.trace} (riassunto in {TRACER.summary_path()})")
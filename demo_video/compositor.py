@@ -0,0 +1,425 @@
+"""
+Compositore a rettangoli sporchi
+
+Sostituisce CompositeVideoClip per le scene dei video demo. Ogni layer ha il
+suo riquadro sulla tela; a ogni frame si confronta lo stato dei layer
+(visibilità, opacità, posizione, sprite) con quello del frame precedente e si
+ricompongono solo i rettangoli dei layer cambiati, partendo dal frame
+precedente. La fusione usa alpha premoltiplicato e aritmetica intera.
+
+I layer attivi a ogni istante vengono da un IntervalIndex: il costo di un
+frame dipende dai layer visibili, non da quanti ne contiene la scena.
+
+Dissolvenze con estremi statici: se di un layer cambia solo l'opacità e
+nessun altro layer nel suo riquadro si muove, il riquadro è una miscela
+lineare di due immagini fisse (senza il layer e con il layer pieno). Le due
+immagini vengono composte una volta e ogni frame della dissolvenza costa
+una sola miscela a virgola fissa in uint16.
+"""
+
+import numpy as np
+
+from demo_video.backgrounds import Plate
+from demo_video.intervals import IntervalIndex
+from demo_video.kenburns import ZoomEngine
+from demo_video.trace import TRACER, span
+
+# Oltre questa frazione di tela conviene ricomporre tutto in un colpo solo
+FULL_REDRAW_RATIO = 0.6
+
+
+def resolve_position(position, sprite_size, canvas_size):
+    """Angolo in alto a sinistra di uno sprite (come MoviePy compute_position)"""
+    if position is None:
+        position = (0, 0)
+    if isinstance(position, str):
+        position = {
+            "center": ("center", "center"),
+            "left": ("left", "center"),
+            "right": ("right", "center"),
+            "top": ("center", "top"),
+            "bottom": ("center", "bottom"),
+        }[position]
+    x, y = position
+    if isinstance(x, str):
+        x = {"left": 0, "center": (canvas_size[0] - sprite_size[0]) / 2,
+             "right": canvas_size[0] - sprite_size[0]}[x]
+    if isinstance(y, str):
+        y = {"top": 0, "center": (canvas_size[1] - sprite_size[1]) / 2,
+             "bottom": canvas_size[1] - sprite_size[1]}[y]
+    return int(x), int(y)
+
+
+class Sprite:
+    """Pixel di un layer pronti per la fusione: RGB premoltiplicato e alpha"""
+
+    def __init__(self, image):
+        array = image.array if isinstance(image, Plate) else np.asarray(image)
+        if array.ndim == 2:
+            array = np.repeat(array[..., None], 3, axis=2)
+        if array.shape[2] == 4:
+            alpha = array[..., 3]
+            rgb = (array[..., :3].astype(np.uint16) * alpha[..., None] + 127) // 255
+            self.rgb = rgb.astype(np.uint8)
+            self.alpha = alpha if alpha.min() < 255 else None
+        else:
+            self.rgb = array
+            self.alpha = None
+
+    @classmethod
+    def premultiplied(cls, rgb, alpha):
+        """Sprite da pixel già premoltiplicati (contatori e grafici animati)"""
+        sprite = cls.__new__(cls)
+        sprite.rgb, sprite.alpha = rgb, alpha
+        return sprite
+
+    @property
+    def size(self):
+        return self.rgb.shape[1], self.rgb.shape[0]
+
+
+def blend(dst, rgb, alpha, opacity):
+    """Fonde uno sprite premoltiplicato su dst (in place) con opacità 0..255"""
+    if alpha is None and opacity == 255:
+        dst[...] = rgb
+        return
+    rgb = rgb.astype(np.uint16)
+    if alpha is None:
+        # Sprite opaco: miscela diretta in virgola fissa, senza canale alpha
+        rgb *= opacity
+        rgb += 127
+        # Prodotto in uint16 esplicito: con la promozione di numpy 1.x uint8 * scalare trabocca
+        rgb += np.multiply(dst, 255 - opacity, dtype=np.uint16)
+        rgb //= 255
+        dst[...] = rgb
+        return
+    alpha = alpha.astype(np.uint16)
+    if opacity < 255:
+        rgb = (rgb * opacity + 127) // 255
+        alpha = (alpha * opacity + 127) // 255
+    inv = (255 - alpha)[..., None]
+    dst[...] = rgb + (dst * inv + 127) // 255
+
+
+class Endpoints:
+    """Estremi di una dissolvenza in un riquadro, già allargati a uint16"""
+
+    def __init__(self, key, start, end):
+        self.key = key
+        self.start = start.astype(np.uint16)
+        self.end = end.astype(np.uint16)
+        # Due buffer di lavoro: a ogni frame nessuna allocazione
+        self._scratch = np.empty_like(self.start)
+        self._scratch2 = np.empty_like(self.start)
+
+    def mix(self, dst, opacity):
+        """dst = (start * (255 - opacity) + end * opacity + 127) // 255"""
+        scratch = self._scratch
+        np.multiply(self.start, np.uint16(255 - opacity), out=scratch)
+        scratch += 127
+        # end * opacity sta in uint16 insieme al resto: 255 * 255 + 127 < 65536
+        np.multiply(self.end, np.uint16(opacity), out=self._scratch2)
+        scratch += self._scratch2
+        scratch //= 255
+        np.copyto(dst, scratch, casting='unsafe')
+
+
+def _union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def merge_rects(rects):
+    """Unisce i rettangoli che si sovrappongono (x0, y0, x1, y1)"""
+    merged = []
+    for rect in rects:
+        while True:
+            for n, other in enumerate(merged):
+                if _overlaps(rect, other):
+                    rect = _union(rect, merged.pop(n))
+                    break
+            else:
+                break
+        merged.append(rect)
+    return merged
+
+
+def _opacity(effects, t, duration):
+    value = 1.0
+    for fx in effects:
+        value *= fx.opacity(t, duration)
+    return int(round(255 * min(max(value, 0.0), 1.0)))
+
+
+def _zoom(effects, t, duration):
+    scale = 1.0
+    for fx in effects:
+        scale *= fx.scale(t, duration)
+    return scale
+
+
+def _view(effects, t, duration):
+    """Regione visibile dell'immagine (KenBurns), None se è tutta"""
+    for fx in effects:
+        if hasattr(fx, "view"):
+            return fx.view(t, duration)
+    return None
+
+
+def _progress(effects, t, duration):
+    """Avanzamento di un contatore o grafico (CountUp), None se è al valore finale"""
+    for fx in effects:
+        if hasattr(fx, "progress"):
+            p = fx.progress(t, duration)
+            return p if p < 1.0 else None
+    return None
+
+
+class Compositor:
+    """Compone i frame di una scena ricalcolando solo le aree cambiate"""
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.size = tuple(scene.size)
+        self.duration = scene.duration
+        self.layers = list(scene.layers)
+        self.fill = scene.solid_background()
+        if self.fill is not None:
+            # La tinta unita di fondo si riempie, non si fonde
+            self.layers = self.layers[1:]
+        self.sprites = [Sprite(layer.image) for layer in self.layers]
+        self.names = [layer.name or f"layer {n}" for n, layer in enumerate(self.layers)]
+        self.effect_names = ["+".join(type(fx).__name__ for fx in layer.effects)
+                             for layer in self.layers]
+        self.scene_effects = "+".join(type(fx).__name__ for fx in scene.effects)
+        self.index = IntervalIndex((layer.start, layer.end, n) for n, layer in enumerate(self.layers))
+        self._zoomed = [None] * len(self.layers)
+        self._engines = {}
+        self._state = {}
+        self._endpoints = {}
+        w, h = self.size
+        # Fondo pronto da copiare: più veloce che riempire con una tupla. La
+        # lastra a tinta unita è condivisa fra le scene con lo stesso colore
+        if self.fill is not None:
+            self.background = scene.layers[0].image.array
+        else:
+            self.background = np.zeros((h, w, 3), dtype=np.uint8)
+        self.frame = self.background.copy()
+        self._faded = None
+        self._scratch = None
+
+    def _sprite(self, n, state):
+        """Sprite del layer n nello stato `state` (solo la parte visibile se zoomato)"""
+        if state[5] == 1.0 and state[6] is None and state[7] is None:
+            return self.sprites[n]
+        cached = self._zoomed[n]
+        # La chiave è lo stato senza l'opacità
+        key = state[:4] + state[5:]
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        if state[7] is not None:
+            # Contatore o grafico a metà animazione: pixel per questo avanzamento
+            with span("figure", "effect", layer=self.names[n], progress=round(state[7], 3)):
+                cached = (key, Sprite.premultiplied(*self.layers[n].image.premultiplied(state[7])))
+            self._zoomed[n] = cached
+            return cached[1]
+        engine = self._engines.get(n)
+        if engine is None:
+            image = self.layers[n].image
+            engine = self._engines[n] = ZoomEngine(image.array if isinstance(image, Plate) else image)
+        x, y, size = self._placement(n, state[5])
+        window = (state[0] - x, state[1] - y, state[2] - x, state[3] - y)
+        with span("resized", "effect", layer=self.names[n], scale=state[5]):
+            frame = engine.render(size, state[6] or (0.0, 0.0, 1.0, 1.0), window)
+            cached = (key, Sprite(frame))
+        self._zoomed[n] = cached
+        return cached[1]
+
+    def _placement(self, n, scale):
+        """Angolo e dimensione del layer n ingrandito di `scale`"""
+        w, h = self.sprites[n].size
+        if scale != 1.0:
+            w, h = int(w * scale), int(h * scale)
+        x, y = resolve_position(self.layers[n].position, (w, h), self.size)
+        return x, y, (w, h)
+
+    def layer_state(self, n, t):
+        """
+        (x0, y0, x1, y1, opacità, scala, vista, avanzamento) del layer al tempo
+        t, None se invisibile. Per i layer zoomati il riquadro è solo la parte
+        sulla tela; l'avanzamento riguarda contatori e grafici (CountUp).
+        """
+        layer = self.layers[n]
+        if not (layer.start <= t < layer.end):
+            return None
+        lt = t - layer.start
+        if TRACER.enabled and layer.effects:
+            with span(self.effect_names[n], "effect", layer=self.names[n]):
+                opacity = _opacity(layer.effects, lt, layer.duration)
+                scale = _zoom(layer.effects, lt, layer.duration)
+                view = _view(layer.effects, lt, layer.duration)
+        else:
+            opacity = _opacity(layer.effects, lt, layer.duration)
+            scale = _zoom(layer.effects, lt, layer.duration)
+            view = _view(layer.effects, lt, layer.duration)
+        if opacity == 0:
+            return None
+        progress = _progress(layer.effects, lt, layer.duration) if hasattr(layer.image, "frame") else None
+        x, y, (w, h) = self._placement(n, scale)
+        if scale == 1.0 and view is None:
+            return (x, y, x + w, y + h, opacity, 1.0, None, progress)
+        cw, ch = self.size
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, cw), min(y + h, ch)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return (x0, y0, x1, y1, opacity, scale, view, None)
+
+    def layer_states(self, t):
+        """Stato dei layer attivi al tempo t, in ordine di sovrapposizione"""
+        states = {}
+        for n in self.index.at(t):
+            state = self.layer_state(n, t)
+            if state is not None:
+                states[n] = state
+        return states
+
+    def _clip(self, state):
+        w, h = self.size
+        return (max(state[0], 0), max(state[1], 0), min(state[2], w), min(state[3], h))
+
+    def fading(self, states):
+        """
+        Layer di cui cambia solo l'opacità, lontani da altri layer che cambiano:
+        {n: riquadro}
+        """
+        changed = [n for n in self._state.keys() | states.keys()
+                   if self._state.get(n) != states.get(n)]
+        fades = {}
+        for n in changed:
+            old, new = self._state.get(n), states.get(n)
+            if old is None or new is None or old[:4] != new[:4] or old[5:] != new[5:]:
+                continue
+            rect = self._clip(new)
+            if rect[0] >= rect[2] or rect[1] >= rect[3]:
+                continue
+            if any(_overlaps(rect, state[:4]) for m in changed if m != n
+                   for state in (self._state.get(m), states.get(m)) if state is not None):
+                continue
+            fades[n] = rect
+        return fades
+
+    def dirty_rects(self, states, skip=()):
+        w, h = self.size
+        rects = []
+        for n in self._state.keys() | states.keys():
+            old, new = self._state.get(n), states.get(n)
+            if old == new or n in skip:
+                continue
+            for state in (old, new):
+                if state is None:
+                    continue
+                rect = self._clip(state)
+                if rect[0] < rect[2] and rect[1] < rect[3]:
+                    rects.append(rect)
+        rects = merge_rects(rects)
+        area = sum((r[2] - r[0]) * (r[3] - r[1]) for r in rects)
+        if area > FULL_REDRAW_RATIO * w * h:
+            return [(0, 0, w, h)]
+        return rects
+
+    def redraw(self, rect, states):
+        x0, y0, x1, y1 = rect
+        self.paint(self.frame[y0:y1, x0:x1], rect, states)
+
+    def paint(self, region, rect, states):
+        """Compone i layer in `states` nel riquadro `rect` (region = i suoi pixel)"""
+        x0, y0, x1, y1 = rect
+        visible = [(n, state) for n, state in states.items() if _overlaps(rect, state[:4])]
+        # Un layer opaco che copre tutto il riquadro nasconde fondo e layer sotto
+        for k in range(len(visible) - 1, -1, -1):
+            n, state = visible[k]
+            if (state[4] == 255 and state[0] <= x0 and state[1] <= y0 and state[2] >= x1
+                    and state[3] >= y1 and self._sprite(n, state).alpha is None):
+                visible = visible[k:]
+                break
+        else:
+            region[...] = self.background[y0:y1, x0:x1]
+        for n, state in visible:
+            sx0, sy0, sx1, sy1, opacity = state[:5]
+            ix0, iy0 = max(x0, sx0), max(y0, sy0)
+            ix1, iy1 = min(x1, sx1), min(y1, sy1)
+            sprite = self._sprite(n, state)
+            src = (slice(iy0 - sy0, iy1 - sy0), slice(ix0 - sx0, ix1 - sx0))
+            alpha = sprite.alpha[src] if sprite.alpha is not None else None
+            with span(self.names[n], "layer", opacity=opacity):
+                blend(region[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0], sprite.rgb[src], alpha, opacity)
+
+    def fade_layer(self, n, rect, states):
+        """Riquadro del layer n che cambia solo opacità: miscela dei due estremi"""
+        x0, y0, x1, y1 = rect
+        # Gli estremi dipendono dagli altri layer che toccano il riquadro
+        others = {m: state for m, state in states.items() if m != n and _overlaps(rect, state[:4])}
+        key = (rect, tuple(others.items()))
+        endpoints = self._endpoints.get(n)
+        if endpoints is None or endpoints.key != key:
+            shape = (y1 - y0, x1 - x0, 3)
+            start, end = np.empty(shape, np.uint8), np.empty(shape, np.uint8)
+            self.paint(start, rect, others)
+            full = dict(states)
+            full[n] = states[n][:4] + (255,) + states[n][5:]
+            self.paint(end, rect, {m: full[m] for m in full if m == n or m in others})
+            endpoints = self._endpoints[n] = Endpoints(key, start, end)
+        with span(self.names[n], "fade", opacity=states[n][4]):
+            endpoints.mix(self.frame[y0:y1, x0:x1], states[n][4])
+
+    def render(self, t, out=None):
+        """
+        Frame della scena al tempo t, premoltiplicato su nero.
+
+        Senza `out` restituisce il buffer interno, valido fino alla chiamata
+        successiva; altrimenti scrive il frame in `out`.
+        """
+        states = self.layer_states(t)
+        fades = self.fading(states)
+        while True:
+            rects = self.dirty_rects(states, fades)
+            # Le dissolvenze che toccano zone da ricomporre si ricompongono con loro
+            overlapping = [n for n in fades if any(_overlaps(fades[n], rect) for rect in rects)]
+            if not overlapping:
+                break
+            for n in overlapping:
+                del fades[n]
+        for rect in rects:
+            self.redraw(rect, states)
+        for n, rect in fades.items():
+            self.fade_layer(n, rect, states)
+        for n in list(self._endpoints):
+            if n not in fades:
+                del self._endpoints[n]
+        self._state = states
+
+        opacity = _opacity(self.scene.effects, t, self.duration)
+        if opacity < 255:
+            with span(f"scene {self.scene_effects}", "effect", scene=self.scene.name, opacity=opacity):
+                return self._fade(opacity, out)
+        if out is None:
+            return self.frame
+        np.copyto(out, self.frame)
+        return out
+
+    def _fade(self, opacity, out):
+        if out is None:
+            if self._faded is None:
+                self._faded = np.empty_like(self.frame)
+            out = self._faded
+        if self._scratch is None:
+            self._scratch = np.empty(self.frame.shape, dtype=np.uint16)
+        scratch = self._scratch
+        np.multiply(self.frame, opacity, out=scratch, dtype=np.uint16)
+        scratch += 127
+        scratch //= 255
+        np.copyto(out, scratch, casting='unsafe')
+        return out
@@ -0,0 +1,248 @@
+"""
+Uscita video: pipe di frame grezzi verso un unico processo ffmpeg
+
+I frame vengono composti direttamente in un piccolo anello di buffer uint8
+riutilizzati e scritti su stdin di ffmpeg tramite memoryview, senza copie né
+allocazioni per frame. Un thread dedicato scrive sul pipe mentre il frame
+successivo viene composto.
+"""
+
+import json
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import threading
+from dataclasses import dataclass, asdict
+
+import numpy as np
+
+from demo_video.cache import default_cache_dir
+from demo_video.trace import span
+
+# Disposizione dei file MP4 finali (vedi EncoderSettings.mp4_args):
+# - faststart:  indice (moov) all'inizio, la riproduzione parte prima del download completo
+# - fragmented: frammenti di al massimo 2 secondi, riproducibili mentre arrivano
+MP4_LAYOUTS = {
+    "faststart": ["-movflags", "+faststart"],
+    "fragmented": ["-movflags", "+frag_keyframe+empty_moov+default_base_moof", "-frag_duration", "2000000"],
+}
+
+# Thread dell'encoder senza profilo né --threads
+DEFAULT_THREADS = 4
+
+# Impostazioni scelte da demo_video.autotune e salvate nel profilo della macchina
+PROFILE_KEYS = ("codec", "preset", "crf", "tune", "threads")
+
+
+def ffmpeg_binary():
+    """Eseguibile ffmpeg: FFMPEG_BINARY, quello di imageio-ffmpeg o quello di sistema"""
+    path = os.environ.get("FFMPEG_BINARY")
+    if path and path != "ffmpeg-imageio":
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which("ffmpeg") or "ffmpeg"
+
+
+@dataclass(frozen=True)
+class EncoderSettings:
+    """Parametri dell'encoder video"""
+    codec: str = 'libx264'
+    preset: str = 'medium'
+    crf: int = 23
+    tune: str = None  # es. "stillimage" per le slide
+    gop: int = None  # distanza massima fra keyframe, in frame
+    threads: int = None
+    pix_fmt: str = 'yuv420p'
+    mp4: str = 'faststart'  # disposizione del file finale, vedi MP4_LAYOUTS
+
+    def ffmpeg_args(self):
+        args = ["-c:v", self.codec, "-preset", self.preset, "-crf", str(self.crf)]
+        if self.tune:
+            args += ["-tune", self.tune]
+        if self.gop:
+            args += ["-g", str(self.gop)]
+        if self.threads:
+            args += ["-threads", str(self.threads)]
+        return args + ["-pix_fmt", self.pix_fmt]
+
+    def mp4_args(self):
+        """Argomenti del muxer per il file finale (non per segmenti e chunk intermedi)"""
+        return list(MP4_LAYOUTS[self.mp4])
+
+    def output_key(self):
+        """Parametri che cambiano i frame codificati (thread e disposizione MP4 non contano)"""
+        values = asdict(self)
+        values.pop("threads")
+        values.pop("mp4")
+        return sorted(values.items())
+
+    @classmethod
+    def from_args(cls, args, **overrides):
+        """Opzioni esplicite, poi il profilo della macchina (se c'è), poi i default"""
+        explicit = dict(codec=args.codec, preset=args.preset, crf=args.crf,
+                        tune=args.tune, gop=args.gop, threads=args.threads, mp4=args.mp4)
+        explicit = {key: value for key, value in explicit.items() if value is not None}
+        profile = {} if args.no_encoder_profile else load_profile(args.encoder_profile)
+        if "codec" in explicit and profile.get("codec", explicit["codec"]) != explicit["codec"]:
+            # Il profilo è per un altro codec: preset e tune non valgono
+            profile = {}
+        return cls(**{"threads": DEFAULT_THREADS, **profile, **explicit, **overrides})
+
+
+def machine_id():
+    """Macchina a cui appartiene un profilo dell'encoder"""
+    return {"host": platform.node(), "cpus": os.cpu_count()}
+
+
+def profile_path():
+    return os.path.join(default_cache_dir(), "encoder-profile.json")
+
+
+def load_profile(path=None):
+    """
+    Impostazioni del profilo salvato da demo_video.autotune. Il profilo
+    predefinito vale solo sulla macchina che l'ha misurato ({} altrimenti o
+    se non esiste); un file passato esplicitamente vale sempre.
+    """
+    try:
+        with open(path or profile_path()) as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if path is None and profile.get("machine") != machine_id():
+        return {}
+    return {key: profile["settings"][key] for key in PROFILE_KEYS if key in profile["settings"]}
+
+
+def add_encoder_arguments(parser):
+    """Opzioni da riga di comando per EncoderSettings (senza valore: profilo o default)"""
+    group = parser.add_argument_group("encoder")
+    group.add_argument("--codec", default=None, help=f"default {EncoderSettings.codec}")
+    group.add_argument("--preset", default=None, help=f"default {EncoderSettings.preset}")
+    group.add_argument("--crf", type=int, default=None, help=f"default {EncoderSettings.crf}")
+    group.add_argument("--tune", default=None, help="es. stillimage")
+    group.add_argument("--gop", type=int, default=None, help="frame fra due keyframe")
+    group.add_argument("--threads", type=int, default=None, help=f"default {DEFAULT_THREADS}")
+    group.add_argument("--encoder-profile", default=None, metavar="FILE",
+                       help="profilo di demo_video.autotune (default: quello di questa macchina, se c'è)")
+    group.add_argument("--no-encoder-profile", action="store_true", help="ignora il profilo dell'encoder")
+    group.add_argument("--mp4", choices=sorted(MP4_LAYOUTS), default=EncoderSettings.mp4,
+                       help="MP4 con indice all'inizio o frammentato, per la riproduzione in streaming")
+    return group
+
+
+class FFmpegWriter:
+    """
+    Processo ffmpeg con input rawvideo rgb24 su stdin.
+
+    Uso: buf = writer.next_buffer(); <componi in buf>; writer.submit(buf).
+    writer.repeat() ripete l'ultimo frame inviato senza copiarlo.
+
+    Con `outputs` (argomenti ffmpeg con mappe e file, vedi demo_video.outputs)
+    lo stesso flusso produce più file; l'audio è l'input 1.
+    """
+
+    def __init__(self, path, size, fps, settings=EncoderSettings(), audiofile=None,
+                 output_args=(), ring=3, outputs=None):
+        w, h = size
+        cmd = [ffmpeg_binary(), "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}", "-r", str(fps),
+               "-i", "-"]
+        if outputs is not None:
+            cmd += (["-i", audiofile] if audiofile else []) + list(outputs)
+        else:
+            if audiofile:
+                cmd += ["-i", audiofile, "-map", "0:v", "-map", "1:a", "-c:a", "copy", "-shortest"]
+            cmd += settings.ffmpeg_args() + list(output_args) + [path]
+        self.path = path
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+
+        self.buffers = [np.empty((h, w, 3), dtype=np.uint8) for _ in range(max(ring, 2))]
+        self._pending = [0] * len(self.buffers)
+        self._cond = threading.Condition()
+        self._next = 0
+        self._last = None
+        self._error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while True:
+            slot = self._queue.get()
+            if slot is None:
+                return
+            try:
+                if self._error is None:
+                    with span("write", "encoder", slot=slot):
+                        self.proc.stdin.write(memoryview(self.buffers[slot]).cast("B"))
+            except (BrokenPipeError, OSError) as exc:
+                self._error = exc
+            with self._cond:
+                self._pending[slot] -= 1
+                self._cond.notify_all()
+
+    def next_buffer(self):
+        """Prossimo buffer libero dell'anello (attende che ffmpeg lo abbia letto)"""
+        slot = self._next
+        if slot == self._last:
+            slot = (slot + 1) % len(self.buffers)
+        with self._cond:
+            if self._pending[slot]:
+                with span("wait buffer", "encoder"):
+                    while self._pending[slot]:
+                        self._cond.wait()
+        self._next = (slot + 1) % len(self.buffers)
+        return self.buffers[slot]
+
+    def _slot(self, buf):
+        for n, b in enumerate(self.buffers):
+            if b is buf:
+                return n
+        raise ValueError("il frame deve essere un buffer ottenuto da next_buffer()")
+
+    def submit(self, buf):
+        self._check()
+        slot = self._slot(buf)
+        with self._cond:
+            self._pending[slot] += 1
+        self._last = slot
+        self._queue.put(slot)
+
+    def repeat(self):
+        """Rimanda l'ultimo frame (tratti statici della timeline)"""
+        self._check()
+        with self._cond:
+            self._pending[self._last] += 1
+        self._queue.put(self._last)
+
+    def _check(self):
+        if self._error is not None:
+            self.close()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self.proc.stdin.close()
+        stderr = self.proc.stderr.read().decode(errors="replace")
+        self.proc.stderr.close()
+        code = self.proc.wait()
+        if code != 0 or self._error is not None:
+            raise IOError(f"ffmpeg non è riuscito a scrivere {self.path}:\n{stderr}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.proc.kill()
+            self._queue.put(None)
+            self._thread.join()
+            self.proc.wait()
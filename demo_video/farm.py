@@ -0,0 +1,443 @@
+"""
+Render distribuito: un coordinatore e worker che parlano HTTP
+
+    python create_demo_video_v2.py --farm 3                    # 3 worker locali
+    python create_demo_video_v2.py --farm 0 --farm-listen 0.0.0.0:8765
+    python -m demo_video.farm http://coordinatore:8765 --token ...   # su ogni macchina
+
+La timeline viene divisa in chunk: i segmenti di render_segments (corpo delle
+scene e confini con le dissolvenze) tagliati a multipli del GOP, così ogni
+chunk comincia con un keyframe. Il coordinatore tiene la descrizione della
+timeline e la coda dei chunk; ogni worker compila la stessa descrizione
+(scene costruite solo quando servono), chiede un chunk, lo codifica come
+file a GOP chiusi e lo carica. Alla fine i chunk vengono uniti con stream
+copy (vedi concat_segments).
+
+Protocollo (JSON, header X-Farm-Token su ogni richiesta):
+
+- GET  /spec                    descrizione, tela e parametri dell'encoder
+- GET  /job                     200 con un chunk, 204 se riprovare, 410 a fine lavoro
+- PUT  /chunks/<n>?lease=...    il file del chunk
+- POST /chunks/<n>/fail?lease=  il worker non è riuscito a produrlo
+
+Un chunk assegnato ha un lease: se il worker non lo consegna entro il
+tempo viene riassegnato, e vale la prima consegna che arriva. Un chunk che
+fallisce torna in coda fino a MAX_ATTEMPTS tentativi. I worker remoti
+devono avere gli stessi asset (percorsi della descrizione) nella loro
+directory di lavoro.
+"""
+
+import argparse
+import ipaddress
+import json
+import os
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from dataclasses import asdict, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from demo_video.cache import AssetStore
+from demo_video.canvas import Canvas
+from demo_video.encoder import EncoderSettings, FFmpegWriter
+from demo_video.segments import Segment, concat_segments, plan_segments
+from demo_video.spec import compile_timeline, use_asset_store
+
+# Lunghezza massima di un chunk, tempo per consegnarlo e tentativi
+CHUNK_SECONDS = 4
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+# Attesa dei worker quando non ci sono chunk liberi
+POLL_SECONDS = 0.5
+
+TOKEN_HEADER = "X-Farm-Token"
+TOKEN_ENV = "GPRESS_FARM_TOKEN"
+
+
+def plan_chunks(timeline, gop, max_frames):
+    """Segmenti della timeline tagliati in chunk di al più `max_frames`, a multipli di `gop`"""
+    step = max(max_frames // gop, 1) * gop
+    chunks = []
+    for segment in plan_segments(timeline):
+        for first in range(segment.first, segment.last, step):
+            name = segment.name if first == segment.first else f"{segment.name} +{first - segment.first}"
+            chunks.append(Segment(name, first, min(first + step, segment.last)))
+    return chunks
+
+
+def chunk_args(settings, path):
+    """Argomenti d'uscita di un chunk: GOP chiusi, così si unisce senza ricodifica"""
+    return settings.ffmpeg_args() + ["-flags", "+cgop", path]
+
+
+class Coordinator:
+    """Coda dei chunk con lease, tentativi e consegne in ritardo"""
+
+    def __init__(self, spec, canvas, settings, chunks, workdir, token,
+                 lease=LEASE_SECONDS, attempts=MAX_ATTEMPTS, verbose=True):
+        self.spec = spec
+        self.canvas = canvas
+        self.settings = settings
+        self.chunks = chunks
+        self.workdir = workdir
+        self.token = token
+        self.lease = lease
+        self.attempts = attempts
+        self.verbose = verbose
+        self.error = None
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = deque(range(len(chunks)))
+        self._leases = {}  # chunk -> (lease, scadenza)
+        self._issued = [set() for _ in chunks]  # lease assegnati a ogni chunk, anche scaduti
+        self._tries = [0] * len(chunks)
+        self._done = {}
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def _fail(self, n, message):
+        self._leases.pop(n, None)
+        if self._tries[n] >= self.attempts:
+            self.error = f"chunk {self.chunks[n].name}: {message} ({self._tries[n]} tentativi)"
+            self._log(f"    ✗ Chunk {self.chunks[n].name}: {message}, rinuncio")
+            self.finished.set()
+        else:
+            self._log(f"    ✗ Chunk {self.chunks[n].name}: {message}, di nuovo in coda")
+            self._pending.appendleft(n)
+
+    @property
+    def active(self):
+        return bool(self._leases)
+
+    def paths(self):
+        return [self._done[n] for n in range(len(self.chunks))]
+
+    def describe(self):
+        return {"spec": self.spec,
+                "canvas": {"base_size": list(self.canvas.base_size), "fps": self.canvas.fps,
+                           "scale": self.canvas.scale},
+                "settings": asdict(self.settings)}
+
+    def expire(self):
+        """Rimette in coda i chunk il cui lease è scaduto"""
+        with self._lock:
+            now = time.monotonic()
+            for n, (_, deadline) in list(self._leases.items()):
+                if now > deadline:
+                    self._fail(n, "in ritardo")
+
+    def job(self):
+        """Prossimo chunk da assegnare; None se non ce ne sono (per ora o più)"""
+        self.expire()
+        with self._lock:
+            now = time.monotonic()
+            if self.finished.is_set() or not self._pending:
+                return None
+            n = self._pending.popleft()
+            self._tries[n] += 1
+            lease = secrets.token_hex(8)
+            self._leases[n] = (lease, now + self.lease)
+            self._issued[n].add(lease)
+            chunk = self.chunks[n]
+            return {"chunk": n, "name": chunk.name, "first": chunk.first, "last": chunk.last, "lease": lease}
+
+    def accept(self, n, lease, path):
+        """
+        Consegna di un chunk con un lease che gli è stato assegnato (anche
+        scaduto): vale la prima, le altre vengono scartate
+        """
+        with self._lock:
+            if n in self._done or self.finished.is_set() or lease not in self._issued[n]:
+                os.remove(path)
+                return False
+            final = os.path.join(self.workdir, f"{n:04d}.mp4")
+            os.replace(path, final)
+            self._done[n] = final
+            # Anche la consegna in ritardo di un lease scaduto chiude il chunk
+            self._leases.pop(n, None)
+            self._pending = deque(m for m in self._pending if m != n)
+            self._log(f"    ✓ Chunk {self.chunks[n].name} ({self.chunks[n].n_frames} frame) "
+                      f"[{len(self._done)}/{len(self.chunks)}]")
+            if len(self._done) == len(self.chunks):
+                self.finished.set()
+            return True
+
+    def reject(self, n, lease, message):
+        with self._lock:
+            if n not in self._done and self._leases.get(n, (None,))[0] == lease:
+                self._fail(n, message or "errore nel worker")
+
+    def serve(self, address):
+        """Server HTTP del coordinatore (da avviare con serve_forever)"""
+        server = ThreadingHTTPServer(address, _Handler)
+        server.daemon_threads = True
+        server.coordinator = self
+        return server
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, code, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        coordinator = self.server.coordinator
+        if not secrets.compare_digest(self.headers.get(TOKEN_HEADER, ""), coordinator.token):
+            self._reply(403, {"error": "token non valido"})
+            return None, None, None
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        return coordinator, url.path.strip("/").split("/"), query.get("lease", [""])[0]
+
+    def do_GET(self):
+        coordinator, parts, _ = self._route()
+        if coordinator is None:
+            return
+        if parts == ["spec"]:
+            self._reply(200, coordinator.describe())
+        elif parts == ["job"]:
+            job = coordinator.job()
+            if job is not None:
+                self._reply(200, job)
+            else:
+                self._reply(410 if coordinator.finished.is_set() else 204)
+        else:
+            self._reply(404)
+
+    def do_PUT(self):
+        coordinator, parts, lease = self._route()
+        if coordinator is None:
+            return
+        if (len(parts) != 2 or parts[0] != "chunks" or not parts[1].isdigit()
+                or int(parts[1]) >= len(coordinator.chunks)):
+            self._reply(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        path = os.path.join(coordinator.workdir, f".upload-{secrets.token_hex(8)}.mp4")
+        received = 0
+        with open(path, "wb") as f:
+            while received < length:
+                block = self.rfile.read(min(1 << 20, length - received))
+                if not block:
+                    break
+                f.write(block)
+                received += len(block)
+        if received != length or length == 0:
+            os.remove(path)
+            coordinator.reject(int(parts[1]), lease, "caricamento incompleto")
+            self._reply(400, {"error": "caricamento incompleto"})
+            return
+        self._reply(200, {"accepted": coordinator.accept(int(parts[1]), lease, path)})
+
+    def do_POST(self):
+        coordinator, parts, lease = self._route()
+        if coordinator is None:
+            return
+        if len(parts) != 3 or parts[0] != "chunks" or parts[2] != "fail" or not parts[1].isdigit():
+            self._reply(404)
+            return
+        message = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode(errors="replace")
+        coordinator.reject(int(parts[1]), lease, message.strip())
+        self._reply(200, {})
+
+
+def _request(url, token, method="GET", data=None):
+    """(stato, JSON della risposta) di una richiesta al coordinatore"""
+    request = urllib.request.Request(url, data=data, method=method, headers={TOKEN_HEADER: token})
+    try:
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            return response.status, json.loads(body) if body else None
+    except urllib.error.HTTPError as exc:
+        return exc.code, None
+
+
+def run_worker(url, token, workdir=None):
+    """
+    Chiede e codifica chunk finché il coordinatore ha lavoro; restituisce il
+    numero di chunk consegnati.
+    """
+    url = url.rstrip("/")
+    status, info = _request(f"{url}/spec", token)
+    if status != 200:
+        raise RuntimeError(f"il coordinatore ha risposto {status}")
+    canvas = Canvas(tuple(info["canvas"]["base_size"]), info["canvas"]["fps"], info["canvas"]["scale"])
+    settings = EncoderSettings(**info["settings"])
+    timeline = compile_timeline(info["spec"], canvas, lazy=True)
+    workdir = workdir or tempfile.gettempdir()
+    delivered = 0
+    while True:
+        status, job = _request(f"{url}/job", token)
+        if status == 410:
+            return delivered
+        if status == 204:
+            time.sleep(POLL_SECONDS)
+            continue
+        if status != 200:
+            raise RuntimeError(f"il coordinatore ha risposto {status}")
+        path = os.path.join(workdir, f"gpress-chunk-{os.getpid()}-{job['chunk']}.mp4")
+        target = f"{url}/chunks/{job['chunk']}?lease={job['lease']}"
+        try:
+            with FFmpegWriter(path, timeline.size, timeline.fps, settings,
+                              outputs=chunk_args(settings, path)) as writer:
+                timeline.write(writer, job["first"], job["last"])
+            with open(path, "rb") as f:
+                status, reply = _request(target, token, "PUT", f.read())
+            # Un caricamento rifiutato va segnalato: il chunk torna subito in coda
+            if status != 200:
+                raise RuntimeError(f"caricamento rifiutato dal coordinatore ({status})")
+            delivered += bool(reply and reply.get("accepted"))
+        except Exception as exc:
+            _request(f"{url}/chunks/{job['chunk']}/fail?lease={job['lease']}", token, "POST",
+                     f"{type(exc).__name__}: {exc}".encode())
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def parse_address(value):
+    host, _, port = value.rpartition(":")
+    try:
+        return (host or "127.0.0.1", int(port))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"indirizzo non valido: {value} (HOST:PORTA)") from None
+
+
+def _loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def farm_problem(workers, listen):
+    """Perché il render distribuito non potrebbe finire, o None"""
+    if workers < 0:
+        return f"--farm {workers}: il numero di worker locali non può essere negativo"
+    if workers == 0 and _loopback(listen[0]):
+        return ("--farm 0: senza worker locali servono worker remoti, ma il coordinatore ascolta "
+                f"solo su {listen[0]} (usa --farm-listen 0.0.0.0:PORTA)")
+    return None
+
+
+def render_farm(spec, canvas, output, workers=2, settings=EncoderSettings(), audio=None,
+                listen=("127.0.0.1", 0), chunk_seconds=CHUNK_SECONDS, lease=LEASE_SECONDS,
+                cache_dir=None, use_cache=True, verbose=True):
+    """
+    Rende la timeline `spec` con un coordinatore e `workers` processi locali
+    (0 se lavorano solo worker remoti) e unisce i chunk in `output` con
+    `audio`, il percorso di una traccia già codificata. Con use_cache=False
+    i worker locali non usano la cache degli asset.
+    """
+    problem = farm_problem(workers, listen)
+    if problem:
+        raise ValueError(problem)
+    timeline = compile_timeline(spec, canvas, lazy=True)
+    # Keyframe a intervalli fissi: i tagli fra i chunk cadono su keyframe
+    settings = replace(settings, gop=settings.gop or 2 * canvas.fps)
+    if workers > 1:
+        settings = replace(settings, threads=max(1, (os.cpu_count() or 1) // workers))
+    chunks = plan_chunks(timeline, settings.gop, int(chunk_seconds * canvas.fps))
+
+    tmpdir = tempfile.mkdtemp(prefix=".farm-", dir=os.path.dirname(os.path.abspath(output)))
+    token = secrets.token_urlsafe(16)
+    coordinator = Coordinator(spec, canvas, settings, chunks, tmpdir, token, lease, verbose=verbose)
+    server = coordinator.serve(listen)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    url = f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+    processes = []
+    try:
+        if verbose:
+            print(f"  → Coordinatore su {url}: {len(chunks)} chunk, {workers} worker locali")
+            if not _loopback(listen[0]):
+                print(f"    Worker remoti: {TOKEN_ENV}={token} python -m demo_video.farm "
+                      f"http://{socket.gethostname()}:{port}")
+        command = [sys.executable, "-m", "demo_video.farm", url]
+        if cache_dir:
+            command += ["--cache-dir", cache_dir]
+        if not use_cache:
+            command.append("--no-cache")
+        # I worker importano questo pacchetto anche da un'altra directory di lavoro
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        path = os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))
+        env = dict(os.environ, **{TOKEN_ENV: token, "PYTHONPATH": path})
+        processes = [subprocess.Popen(command, env=env) for _ in range(workers)]
+
+        # Un worker locale caduto viene rimpiazzato; il suo chunk torna in coda
+        # quando scade il lease
+        restarts = workers * MAX_ATTEMPTS
+        while not coordinator.finished.wait(POLL_SECONDS):
+            coordinator.expire()
+            for n, process in enumerate(processes):
+                if process.poll() not in (None, 0) and restarts > 0:
+                    restarts -= 1
+                    if verbose:
+                        print(f"    ✗ Worker locale {process.pid} terminato ({process.returncode}), lo riavvio")
+                    processes[n] = subprocess.Popen(command, env=env)
+            if processes and all(p.poll() is not None for p in processes) and not coordinator.active:
+                raise RuntimeError("i worker locali sono terminati prima della fine del render")
+        if coordinator.error:
+            raise RuntimeError(coordinator.error)
+        concat_segments(coordinator.paths(), output, audio, settings.mp4_args())
+    finally:
+        server.shutdown()
+        server.server_close()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return chunks
+
+
+def add_farm_arguments(parser):
+    group = parser.add_argument_group("render distribuito")
+    group.add_argument("--farm", type=int, default=None, metavar="WORKER",
+                       help="rende a chunk con un coordinatore e WORKER processi locali")
+    group.add_argument("--farm-listen", type=parse_address, default=("127.0.0.1", 0), metavar="HOST:PORTA",
+                       help="indirizzo del coordinatore (0.0.0.0:PORTA per i worker remoti)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker del render distribuito dei video demo")
+    parser.add_argument("url", help="indirizzo del coordinatore, es. http://127.0.0.1:8765")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV, ""),
+                        help=f"token del coordinatore (default: ${TOKEN_ENV})")
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--no-cache", action="store_true", help="non usa gli screenshot in cache")
+    args = parser.parse_args(argv)
+    if not args.no_cache:
+        use_asset_store(AssetStore(args.cache_dir))
+    try:
+        run_worker(args.url, args.token)
+    except urllib.error.URLError:
+        # Il coordinatore ha chiuso: il lavoro è finito o è stato interrotto
+        pass
+
+
+if __name__ == "__main__":
+    main()
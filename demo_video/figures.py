@@ -0,0 +1,321 @@
+"""
+Contatori e grafici con i numeri dei dati dell'app
+
+I numeri non sono scritti nei generatori: vengono letti a ogni render da
+assets/data/journalists.json (la lista dei giornalisti, da cui si contano
+totale, testate, paesi e categorie) o da un export JSON di statistiche (un
+dizionario, anche annidato). Un dato si indica con un percorso puntato, es.
+"count", "by_country.IT", "savings.min".
+
+Con l'effetto CountUp i layer crescono da zero al valore finale:
+
+- Counter: le cifre sono maschere di glifi preparate una volta, su celle
+  larghe uguali; un frame copia la maschera del testo fisso e ci incolla
+  le cifre del valore corrente, senza rasterizzare testo
+- Chart: barre o linea disegnate con operazioni vettoriali sopra una base
+  con le etichette già rasterizzate
+
+Un frame dell'animazione costa poco più della fusione di uno sprite fisso
+della stessa misura; finita l'animazione il layer è uno sprite fisso.
+"""
+
+import json
+import os
+import string
+from collections import Counter as Tally
+
+import numpy as np
+
+from demo_video.text import atlas_for, draw_text, font_key, get_font, text_bbox
+
+DIGITS = "0123456789"
+THOUSANDS = "."  # separatore delle migliaia, come in "9.177"
+
+# Opacità dell'area sotto la linea nei grafici a linea
+AREA_ALPHA = 64
+
+_metrics = {}  # percorso -> ((mtime, dimensione), metriche)
+
+
+def journalist_metrics(journalists):
+    """Metriche della lista dei giornalisti dell'app"""
+    return {"count": len(journalists),
+            "outlets": len({p.get("outlet") for p in journalists if p.get("outlet")}),
+            "by_country": dict(Tally(p.get("country") or "?" for p in journalists)),
+            "by_category": dict(Tally(p.get("category") or "?" for p in journalists))}
+
+
+def load_metrics(path):
+    """Metriche di un file di dati, rilette quando il file cambia"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _metrics.get(path)
+    if cached is None or cached[0] != version:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        cached = _metrics[path] = (version, journalist_metrics(data) if isinstance(data, list) else data)
+    return cached[1]
+
+
+def metric(metrics, name):
+    """Valore del dato `name` (percorso puntato)"""
+    value = metrics
+    for part in name.split("."):
+        try:
+            value = value[part] if isinstance(value, dict) else value[int(part)]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise KeyError(f"dato {name!r} non trovato") from None
+    return value
+
+
+def template_parts(template, metrics):
+    """Testo fisso e valori dei campi di un modello, es. "{count} giornalisti" -> [9001.0, " giornalisti"]"""
+    parts = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        if literal:
+            parts.append(literal)
+        if field is not None:
+            parts.append(float(metric(metrics, field)))
+    return parts
+
+
+def format_number(value):
+    return f"{int(round(value)):,}".replace(",", THOUSANDS)
+
+
+def _paste(mask, glyph, x, y):
+    np.maximum(mask[y:y + glyph.shape[0], x:x + glyph.shape[1]], glyph,
+               out=mask[y:y + glyph.shape[0], x:x + glyph.shape[1]])
+
+
+def _rgba(mask, color):
+    out = np.zeros(mask.shape + (4,), dtype=np.uint8)
+    out[..., :3] = color
+    out[..., 3] = mask
+    return out
+
+
+def _premultiply(color, alpha):
+    """Colore RGB premoltiplicato per alpha (come in compositor.Sprite)"""
+    return tuple((c * alpha + 127) // 255 for c in color)
+
+
+class Counter:
+    """
+    Testo con numeri dai dati, es. "{count} Giornalisti" o "€{savings.min}".
+    frame(p) mostra ogni numero a p volte il suo valore.
+    """
+
+    def __init__(self, template, metrics, font_size, color, bold=True, pad=(20, 20)):
+        parts = template_parts(template, metrics)
+        self.color = tuple(color)
+        self.key = ("counter", tuple(parts), font_size, font_key(bold), self.color, bold, tuple(pad))
+        atlas = atlas_for(get_font(font_size, bold))
+        glyphs = {ch: atlas.glyph(ch) for ch in DIGITS}
+        # Cifre tabellari: ogni cifra al centro di una cella larga quanto la più larga
+        cell = max(g[3] for g in glyphs.values())
+
+        fixed = []  # (penna, carattere)
+        self.values = []
+        self._digits = []  # (penna, numero, potenza di 10)
+        self._marks = []  # separatori: (penna, carattere, numero, potenza di 10)
+        pen = 0.0
+        for part in parts:
+            if isinstance(part, str):
+                for ch in part:
+                    fixed.append((pen, ch))
+                    pen += atlas.glyph(ch)[3]
+                continue
+            n = len(self.values)
+            self.values.append(part)
+            text = format_number(part)
+            power = sum(ch.isdigit() for ch in text)
+            for ch in text:
+                if ch.isdigit():
+                    power -= 1
+                    self._digits.append((pen, n, power))
+                    pen += cell
+                else:
+                    self._marks.append((pen, ch, n, power))
+                    pen += atlas.glyph(ch)[3]
+
+        # Riquadro che contiene ogni cifra possibile in ogni cella
+        self._glyphs = {}
+        boxes = []
+        for pen, ch in fixed + [(pen, ch) for pen, ch, _, _ in self._marks]:
+            mask, x0, y0, _ = self._glyphs[ch] = atlas.glyph(ch)
+            boxes.append((int(round(pen)) + x0, y0, mask))
+        for pen, _, _ in self._digits:
+            for ch, (mask, x0, y0, advance) in glyphs.items():
+                boxes.append((int(round(pen + (cell - advance) / 2)) + x0, y0, mask))
+        left = min((x for x, _, _ in boxes), default=0)
+        top = min((y for _, y, _ in boxes), default=0)
+        width = max((x + m.shape[1] for x, _, m in boxes), default=1) - left
+        height = max((y + m.shape[0] for _, y, m in boxes), default=1) - top
+        px, py = pad
+        self._origin = (px - left, py - top)
+
+        # Testo fisso disegnato una volta; le cifre per ogni frame
+        self._base = np.zeros((height + py * 2, width + px * 2), dtype=np.uint8)
+        for pen, ch in fixed:
+            mask, x0, y0, _ = self._glyphs[ch]
+            _paste(self._base, mask, int(round(pen)) + x0 + self._origin[0], y0 + self._origin[1])
+        self._digit_glyphs = [glyphs[ch] for ch in DIGITS]
+        self._cell = cell
+        # Colore premoltiplicato per ogni valore di alpha
+        self._lut = np.array([_premultiply(self.color, a) for a in range(256)], dtype=np.uint8)
+        self._final = self.frame(1.0)
+        self._final.setflags(write=False)
+
+    def frame(self, progress):
+        """Sprite RGBA con i numeri a `progress` (0..1) del valore finale"""
+        return _rgba(self._mask(progress), self.color)
+
+    def premultiplied(self, progress):
+        """(RGB premoltiplicato, alpha) a `progress`, per il compositore"""
+        mask = self._mask(progress)
+        return self._lut[mask], mask
+
+    def _mask(self, progress):
+        current = [int(round(value * progress)) for value in self.values]
+        mask = self._base.copy()
+        ox, oy = self._origin
+        for pen, n, power in self._digits:
+            value = current[n]
+            # Niente zeri iniziali: le cifre compaiono man mano che il numero cresce
+            if value < 10 ** power and power > 0:
+                continue
+            glyph, x0, y0, advance = self._digit_glyphs[value // 10 ** power % 10]
+            _paste(mask, glyph, int(round(pen + (self._cell - advance) / 2)) + x0 + ox, y0 + oy)
+        for pen, ch, n, power in self._marks:
+            if current[n] >= 10 ** power:
+                glyph, x0, y0, _ = self._glyphs[ch]
+                _paste(mask, glyph, int(round(pen)) + x0 + ox, y0 + oy)
+        return mask
+
+    def __array__(self, dtype=None, copy=None):
+        return self._final if dtype is None else self._final.astype(dtype)
+
+    @property
+    def shape(self):
+        return self._final.shape
+
+    @property
+    def dtype(self):
+        return self._final.dtype
+
+
+def chart_items(metrics, name, kind="bar", top=None):
+    """
+    Coppie (etichetta, valore) del dato `name`: un dizionario (per le barre
+    ordinato dal valore più alto, per la linea nell'ordine del file) o una
+    lista di numeri o di coppie
+    """
+    value = metric(metrics, name)
+    if isinstance(value, dict):
+        items = [(str(k), float(v)) for k, v in value.items()]
+        if kind == "bar":
+            items.sort(key=lambda item: -item[1])
+    else:
+        items = [(str(v[0]), float(v[1])) if isinstance(v, (list, tuple)) else ("", float(v)) for v in value]
+    return items[:top] if top else items
+
+
+class Chart:
+    """
+    Grafico a barre o a linea di `items` in un riquadro `plot` (w, h), con
+    le etichette sotto. frame(p) disegna barre alte p volte il valore o la
+    linea fino a p della larghezza.
+    """
+
+    def __init__(self, items, plot, kind="bar", color=(76, 175, 80), label_size=18,
+                 label_color=(180, 180, 180)):
+        if kind not in ("bar", "line"):
+            raise ValueError(f"grafico sconosciuto: {kind!r} (bar o line)")
+        if not items:
+            raise ValueError("grafico senza dati")
+        self.kind = kind
+        self.color = tuple(color)
+        self.key = ("chart", kind, tuple(items), tuple(plot), self.color, label_size, font_key(False),
+                    tuple(label_color))
+        w, h = plot
+        labels = [label for label, _ in items]
+        font = get_font(label_size, bold=False)
+        label_height = 0
+        if any(labels):
+            boxes = [text_bbox(label, font) for label in labels if label]
+            label_height = max(b[3] for b in boxes) + label_size // 2
+        self._base = np.zeros((h + label_height, w, 4), dtype=np.uint8)
+
+        values = np.array([value for _, value in items], dtype=np.float64)
+        peak = max(values.max(), 1e-9)
+        n = len(items)
+        if kind == "bar":
+            slot = w / n
+            centers = (np.arange(n) + 0.5) * slot
+            # Colonna -> barra (-1 negli spazi fra le barre)
+            self._bars = np.full(w, -1)
+            for i, c in enumerate(centers):
+                half = max(slot * 0.35, 1)
+                self._bars[int(round(c - half)):int(round(c + half))] = i
+            self._heights = np.where(values > 0, np.maximum(values / peak * h, 1), 0)
+        else:
+            # La linea si svela da sinistra: maschere calcolate una volta, per frame se ne taglia una parte
+            centers = np.linspace(0, w - 1, n) if n > 1 else np.array([w / 2])
+            line = np.interp(np.arange(w), centers, (h - 1) * (1 - values / peak))[None, :]
+            rows = np.arange(h)[:, None]
+            self._area = rows > line
+            self._stroke = np.abs(rows - line) <= max(label_size / 6, 1.5) / 2
+        self._rows = np.arange(h)[:, None]
+        self._plot = (w, h)
+
+        for label, c in zip(labels, centers):
+            if label:
+                x0, _, x1, _ = text_bbox(label, font)
+                x = int(round(c - (x1 - x0) / 2 - x0))
+                draw_text(self._base, (min(max(x, 0), max(w - (x1 - x0), 0)), h + label_size // 4),
+                          label, font, tuple(label_color))
+        # Base premoltiplicata: le etichette non cambiano
+        alpha = self._base[..., 3]
+        self._base_rgb = ((self._base[..., :3].astype(np.uint16) * alpha[..., None] + 127) // 255).astype(np.uint8)
+        self._final = self.frame(1.0)
+        self._final.setflags(write=False)
+
+    def _marks(self, progress):
+        """(colonne, maschera, alpha) delle parti del riquadro disegnate a `progress`"""
+        w, h = self._plot
+        if self.kind == "bar":
+            heights = np.where(self._bars >= 0, self._heights[self._bars] * progress, 0)
+            return [(w, self._rows >= h - np.rint(heights)[None, :], 255)]
+        columns = int(progress * (w - 1)) + 1
+        return [(columns, self._area[:, :columns], AREA_ALPHA), (columns, self._stroke[:, :columns], 255)]
+
+    def frame(self, progress):
+        """Sprite RGBA del grafico a `progress` (0..1)"""
+        out = self._base.copy()
+        h = self._plot[1]
+        for columns, mask, alpha in self._marks(progress):
+            out[:h, :columns][mask] = self.color + (alpha,)
+        return out
+
+    def premultiplied(self, progress):
+        """(RGB premoltiplicato, alpha) a `progress`, per il compositore"""
+        rgb = self._base_rgb.copy()
+        alpha = self._base[..., 3].copy()
+        h = self._plot[1]
+        for columns, mask, a in self._marks(progress):
+            rgb[:h, :columns][mask] = _premultiply(self.color, a)
+            alpha[:h, :columns][mask] = a
+        return rgb, alpha
+
+    def __array__(self, dtype=None, copy=None):
+        return self._final if dtype is None else self._final.astype(dtype)
+
+    @property
+    def shape(self):
+        return self._final.shape
+
+    @property
+    def dtype(self):
+        return self._final.dtype
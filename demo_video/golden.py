@@ -0,0 +1,280 @@
+"""
+Regressione sui frame campione (golden frame), senza render completi
+
+    python -m demo_video.golden                  # confronta con i golden salvati
+    python -m demo_video.golden --update         # li rigenera dopo una modifica voluta
+    python -m demo_video.golden --set v2 --diff-dir /tmp/diff
+
+Il confronto gira anche con pytest (tests/test_golden.py) nel workflow
+"Demo Video" di GitHub Actions.
+
+Per ogni set (v1, v2, v2-vertical) la timeline del generatore viene
+pianificata come con --stream e si compongono solo i frame agli istanti che
+contano, con i soli layer visibili (vedi demo_video.preview):
+
+- fine di ogni scena: l'ultimo frame pieno prima della dissolvenza
+- metà di ogni dissolvenza fra scene
+- fine di ogni effetto di un layer: il titolo entrato, ogni punto elenco
+  comparso, il contatore arrivato al valore finale
+
+Gli input sono resi fissi: screenshot sintetici al posto di quelli veri (che
+non sono nel repository) e i numeri dei contatori salvati con i golden.
+Cambiano i frame solo se cambiano codice, layout o tempi: una modifica a
+create_bullet_point o agli offset "1.0 + i*0.3" fa fallire il confronto.
+
+Il confronto è percettivo: luminanza sfocata (le differenze di antialiasing
+fra versioni di FreeType restano sotto la soglia), divisa in riquadri di
+TILE pixel; un frame è diverso se in un riquadro cambia più di
+TILE_TOLERANCE dei pixel. Un testo spostato di 10 px non passa.
+"""
+
+import argparse
+import importlib
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from demo_video.canvas import DRAFT_SCALE, Canvas
+from demo_video.figures import load_metrics
+from demo_video.preview import last_full_frame, render_frames
+from demo_video.spec import compile_timeline
+from demo_video.text import font_path
+
+# Set di golden: generatore e layout
+SETS = {"v1": ("create_demo_video", None),
+        "v2": ("create_demo_video_v2", None),
+        "v2-vertical": ("create_demo_video_v2", "vertical")}
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "golden")
+
+# Differenza percettiva: sfocatura, soglia di luminanza (0..255) e riquadri
+BLUR_RADIUS = 1.0
+PIXEL_THRESHOLD = 24
+TILE = 16
+TILE_TOLERANCE = 0.05
+
+# Screenshot sintetici: dimensioni di un telefono, ridotte
+SCREENSHOT_SIZE = (585, 1266)
+
+
+def synthetic_screenshot(path, n, size=SCREENSHOT_SIZE):
+    """Screenshot finto deterministico (solo numpy, niente rumore né font)"""
+    w, h = size
+    y = np.linspace(0, 1, h)[:, None, None]
+    top = np.array([(40 * n + 30) % 200, 60, 120], dtype=np.float64)
+    bottom = np.array([20, (50 * n + 90) % 200, 60], dtype=np.float64)
+    pixels = (top + (bottom - top) * y).repeat(w, axis=1)
+    for k in range(8):
+        y0 = 100 + k * 140
+        pixels[y0:y0 + 100, 30:w - 30] = ((70 * k + 40 * n) % 256, 200 - 20 * k, (30 * k + 60) % 256)
+        pixels[y0 + 40:y0 + 60, 60:60 + (k + 3) * 40] = 255
+    Image.fromarray(pixels.astype(np.uint8)).save(path)
+    return path
+
+
+def hermetic_spec(spec, workdir, data_dir):
+    """
+    Copia della timeline con input fissi: le immagini diventano screenshot
+    sintetici in `workdir`, i file di dati le copie in `data_dir`
+    """
+    spec = json.loads(json.dumps(spec, default=list))
+    images = {}
+    for scene in spec["scenes"]:
+        for layer in scene["layers"]:
+            if layer["type"] == "image":
+                if layer["path"] not in images:
+                    n = len(images)
+                    images[layer["path"]] = synthetic_screenshot(os.path.join(workdir, f"screen_{n}.png"), n)
+                layer["path"] = images[layer["path"]]
+            elif layer["type"] in ("counter", "chart"):
+                layer["path"] = os.path.join(data_dir, os.path.basename(layer["path"]))
+    return spec
+
+
+def freeze_data(spec, data_dir):
+    """Salva in `data_dir` le metriche dei file di dati usati dalla timeline"""
+    os.makedirs(data_dir, exist_ok=True)
+    for path in {layer["path"] for scene in spec["scenes"] for layer in scene["layers"]
+                 if layer["type"] in ("counter", "chart")}:
+        with open(os.path.join(data_dir, os.path.basename(path)), "w", encoding="utf-8") as f:
+            json.dump(load_metrics(path), f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write("\n")
+
+
+def sample_times(timeline):
+    """Istanti campione (secondi sulla griglia dei frame) con il motivo di ciascuno"""
+    fps = timeline.fps
+    reasons = {}
+
+    def add(offset, scene, local_t, reason):
+        # Primo frame dall'istante in poi, dentro la scena
+        k = min(math.ceil((offset + local_t) * fps - 1e-6), math.ceil((offset + scene.duration) * fps) - 1)
+        reasons.setdefault(k, reason)
+
+    for offset, scene in zip(timeline.offsets, timeline.scenes):
+        add(offset, scene, last_full_frame(scene, fps), "fine scena")
+        for a, b in (fx.animated_span(scene.duration) for fx in scene.effects):
+            if b > a:
+                add(offset, scene, (a + b) / 2, "metà dissolvenza")
+        for n, layer in enumerate(scene.layers):
+            for a, b in layer.animated_spans():
+                if a < b < scene.duration:
+                    add(offset, scene, b, f"fine effetto layer {n}")
+    return [(k / fps, reasons[k]) for k in sorted(reasons)]
+
+
+def perceptual_diff(a, b):
+    """
+    (quota di pixel diversi nel riquadro peggiore, sua posizione, maschera)
+    fra due frame RGB della stessa dimensione
+    """
+    def luma(frame):
+        image = Image.fromarray(frame).convert("L").filter(ImageFilter.GaussianBlur(BLUR_RADIUS))
+        return np.asarray(image, dtype=np.int16)
+
+    mask = np.abs(luma(a) - luma(b)) > PIXEL_THRESHOLD
+    h, w = mask.shape
+    th, tw = -(-h // TILE), -(-w // TILE)
+    padded = np.zeros((th * TILE, tw * TILE), dtype=np.float32)
+    padded[:h, :w] = mask
+    tiles = padded.reshape(th, TILE, tw, TILE).mean(axis=(1, 3))
+    ty, tx = np.unravel_index(np.argmax(tiles), tiles.shape)
+    return float(tiles[ty, tx]), (int(tx) * TILE, int(ty) * TILE), mask
+
+
+def diff_image(golden, frame, mask):
+    """Golden, frame nuovo e differenze (in rosso) affiancati"""
+    overlay = (frame // 3).copy()
+    overlay[mask] = (255, 0, 0)
+    return Image.fromarray(np.concatenate([golden, frame, overlay], axis=1))
+
+
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "scena"
+
+
+def load_set(name, scale=DRAFT_SCALE):
+    """Timeline del set di golden `name` e la sua cartella"""
+    module, layout = SETS[name]
+    gen = importlib.import_module(module)
+    spec = gen.create_timeline_spec(layout) if layout else gen.create_timeline_spec()
+    canvas = Canvas(tuple(spec.get("size", (1920, 1080))), spec.get("fps", 30), scale)
+    return spec, canvas
+
+
+def fonts():
+    return {"bold": os.path.basename(font_path(True) or "default"),
+            "regular": os.path.basename(font_path(False) or "default")}
+
+
+def update_set(name, golden_dir, scale=DRAFT_SCALE, out=print):
+    """Rigenera i golden di un set"""
+    spec, canvas = load_set(name, scale)
+    folder = os.path.join(golden_dir, name)
+    if os.path.isdir(folder):
+        shutil.rmtree(folder)
+    data_dir = os.path.join(folder, "data")
+    freeze_data(spec, data_dir)
+    with tempfile.TemporaryDirectory(prefix="gpress-golden-") as workdir:
+        timeline = compile_timeline(hermetic_spec(spec, workdir, data_dir), canvas, lazy=True)
+        samples = sample_times(timeline)
+        frames = render_frames(timeline, [t for t, _ in samples])
+    entries = []
+    for n, ((t, reason), (frame, scene, local_t)) in enumerate(zip(samples, frames)):
+        file = f"{n:03d}_{slug(scene)}.png"
+        Image.fromarray(frame).save(os.path.join(folder, file), optimize=True)
+        entries.append({"file": file, "t": round(t, 6), "scene": scene, "local_t": round(local_t, 6),
+                        "reason": reason})
+    manifest = {"size": list(timeline.size), "fps": timeline.fps, "scale": scale,
+                "duration": round(timeline.duration, 6), "fonts": fonts(), "frames": entries}
+    with open(os.path.join(folder, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    out(f"    ✓ {name}: {len(entries)} golden in {folder}")
+
+
+def check_set(name, golden_dir, diff_dir=None, out=print):
+    """Confronta un set con i suoi golden; restituisce il numero di problemi"""
+    folder = os.path.join(golden_dir, name)
+    try:
+        with open(os.path.join(folder, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        out(f"    ✗ {name}: golden mancanti (python -m demo_video.golden --update --set {name})")
+        return 1
+    spec, canvas = load_set(name, manifest["scale"])
+    if manifest["fonts"] != fonts():
+        out(f"    ! {name}: golden creati con i font {manifest['fonts']}, qui {fonts()}")
+    problems = 0
+    with tempfile.TemporaryDirectory(prefix="gpress-golden-") as workdir:
+        timeline = compile_timeline(hermetic_spec(spec, workdir, os.path.join(folder, "data")), canvas, lazy=True)
+        if abs(timeline.duration - manifest["duration"]) > 1e-6:
+            out(f"    ✗ {name}: durata {timeline.duration:.3f}s, nei golden {manifest['duration']:.3f}s")
+            problems += 1
+        expected = [round(t, 6) for t, _ in sample_times(timeline)]
+        if expected != [entry["t"] for entry in manifest["frames"]]:
+            out(f"    ✗ {name}: istanti campione cambiati (tempi di scene o effetti diversi)")
+            problems += 1
+        # Gli istanti dei golden: un layer che entra più tardi si vede come differenza di pixel
+        entries = [entry for entry in manifest["frames"] if entry["t"] < timeline.duration]
+        frames = render_frames(timeline, [entry["t"] for entry in entries])
+    for entry, (frame, scene, local_t) in zip(entries, frames):
+        golden = np.asarray(Image.open(os.path.join(folder, entry["file"])).convert("RGB"))
+        label = f"{name} {entry['file']} ({entry['reason']} @ {entry['local_t']:.2f}s)"
+        if golden.shape != frame.shape:
+            out(f"    ✗ {label}: {frame.shape[1]}x{frame.shape[0]}, golden {golden.shape[1]}x{golden.shape[0]}")
+            problems += 1
+            continue
+        worst, (x, y), mask = perceptual_diff(golden, frame)
+        if worst <= TILE_TOLERANCE:
+            continue
+        problems += 1
+        message = f"    ✗ {label}: {worst:.0%} di pixel diversi nel riquadro a ({x}, {y})"
+        if diff_dir:
+            os.makedirs(diff_dir, exist_ok=True)
+            path = os.path.join(diff_dir, f"{name}_{entry['file']}")
+            diff_image(golden, frame, mask).save(path)
+            message += f" → {path}"
+        out(message)
+    if not problems:
+        out(f"    ✓ {name}: {len(entries)} frame uguali ai golden")
+    return problems
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Regressione sui frame campione dei video demo")
+    parser.add_argument("--set", dest="sets", choices=sorted(SETS), nargs="+", default=list(SETS))
+    parser.add_argument("--update", action="store_true", help="rigenera i golden (dopo una modifica voluta)")
+    parser.add_argument("--golden-dir", default=GOLDEN_DIR)
+    parser.add_argument("--diff-dir", default=None, metavar="DIR",
+                        help="salva golden, frame nuovo e differenze dei frame che non passano")
+    parser.add_argument("--scale", type=float, default=DRAFT_SCALE, help="risoluzione dei golden (con --update)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    t0 = time.perf_counter()
+    if args.update:
+        print(f"  → Aggiornamento golden in {args.golden_dir}...")
+        for name in args.sets:
+            update_set(name, args.golden_dir, args.scale)
+        return
+    print(f"  → Confronto con i golden in {args.golden_dir}...")
+    problems = sum(check_set(name, args.golden_dir, args.diff_dir) for name in args.sets)
+    elapsed = time.perf_counter() - t0
+    if problems:
+        print(f"❌ {problems} differenze ({elapsed:.1f}s)")
+        sys.exit(1)
+    print(f"✅ Frame uguali ai golden ({elapsed:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
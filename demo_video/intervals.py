@@ -0,0 +1,41 @@
+"""
+Indice di intervalli per le timeline compilate
+
+Gli estremi di tutti gli intervalli dividono il tempo in tratti elementari;
+per ciascun tratto si calcola una volta sola quali elementi sono attivi.
+A ogni frame basta una ricerca binaria invece di controllare tutti i layer.
+"""
+
+from bisect import bisect_right
+
+
+class IntervalIndex:
+    """Elementi attivi in [start, end), interrogabili per istante"""
+
+    def __init__(self, intervals):
+        intervals = [(start, end, item) for start, end, item in intervals if end > start]
+        self.bounds = sorted({t for start, end, _ in intervals for t in (start, end)})
+        starts = {}
+        ends = {}
+        for start, end, item in intervals:
+            starts.setdefault(start, []).append(item)
+            ends.setdefault(end, []).append(item)
+
+        # Scansione degli estremi: gli elementi attivi restano nell'ordine originale
+        order = {item: n for n, (_, _, item) in enumerate(intervals)}
+        active = set()
+        self._active = []
+        for t in self.bounds[:-1]:
+            active.difference_update(ends.get(t, ()))
+            active.update(starts.get(t, ()))
+            self._active.append(tuple(sorted(active, key=order.__getitem__)))
+
+    def __len__(self):
+        return len(self._active)
+
+    def at(self, t):
+        """Elementi attivi all'istante t"""
+        n = bisect_right(self.bounds, t) - 1
+        if 0 <= n < len(self._active):
+            return self._active[n]
+        return ()
@@ -0,0 +1,70 @@
+"""
+Cache degli asset decodificati con un limite di memoria
+
+Screenshot ridimensionati, sprite di testo e gli altri layer costruiti dal
+compilatore della timeline finiscono qui. Quando la somma dei byte supera il
+budget vengono scartati quelli usati meno di recente: chi li tiene ancora
+(la scena in corso) continua a usarli, gli altri vengono liberati.
+
+Una parte del budget (FRAME_SHARE) è riservata ai frame derivati, come gli
+sprite zoomati di demo_video.kenburns: sono tanti e grandi, e non devono
+scacciare screenshot e testi.
+"""
+
+from collections import OrderedDict
+
+# Budget predefinito, modificabile con --memory-budget
+DEFAULT_BUDGET_MB = 512
+FRAME_SHARE = 0.25
+
+
+class AssetCache:
+    """LRU di array NumPy con limite in byte"""
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget = int(budget_mb * 2**20)
+        self.items = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return item
+
+    def put(self, key, array):
+        if key in self.items:
+            self.nbytes -= self.items.pop(key).nbytes
+        if array.nbytes > self.budget:
+            # Più grande dell'intero budget: non lo si tiene
+            return array
+        self.items[key] = array
+        self.nbytes += array.nbytes
+        while self.nbytes > self.budget:
+            _, old = self.items.popitem(last=False)
+            self.nbytes -= old.nbytes
+        return array
+
+    def resize(self, budget_mb):
+        self.budget = int(budget_mb * 2**20)
+        while self.items and self.nbytes > self.budget:
+            _, old = self.items.popitem(last=False)
+            self.nbytes -= old.nbytes
+
+    def clear(self):
+        self.items.clear()
+        self.nbytes = 0
+
+
+ASSETS = AssetCache(DEFAULT_BUDGET_MB * (1 - FRAME_SHARE))
+FRAMES = AssetCache(DEFAULT_BUDGET_MB * FRAME_SHARE)
+
+
+def set_memory_budget(budget_mb):
+    ASSETS.resize(budget_mb * (1 - FRAME_SHARE))
+    FRAMES.resize(budget_mb * FRAME_SHARE)
@@ -0,0 +1,192 @@
+"""
+Più uscite da un solo passaggio di composizione
+
+Con --outputs 720p,vertical,gif,webp,poster il render produce, oltre al
+video principale:
+
+- 720p:     copia ridotta per le email
+- vertical: taglio 1080x1920 per i social, con un layout suo (la timeline
+            "vertical" del generatore, non un ritaglio)
+- gif/webp: anteprima in loop di qualche secondo, piccola e a fps ridotti
+- poster:   JPEG di un frame della prima slide
+- hls:      scala HLS/CMAF (1080p, 720p, 480p in segmenti fMP4) per l'app,
+            con un segmento che inizia a ogni scena: chi salta a una scena
+            scarica solo da lì, e il primo segmento è breve
+
+Ogni frame orizzontale viene composto una volta e mandato a un solo processo
+ffmpeg che lo divide (filtro split) fra video principale, 720p e anteprime;
+il taglio verticale è composto nello stesso ciclo e va a un secondo
+processo. Layer e asset uguali nei due layout (testi, sfondi) vengono
+costruiti una volta sola grazie alla cache degli asset.
+"""
+
+import argparse
+import math
+import os
+from contextlib import ExitStack
+from dataclasses import replace
+from itertools import zip_longest
+
+from PIL import Image
+
+from demo_video.encoder import EncoderSettings, FFmpegWriter
+
+FORMATS = ("720p", "vertical", "gif", "webp", "poster", "hls")
+
+# Anteprime in loop: durata, fps e larghezza
+PREVIEW_SECONDS = 6
+PREVIEW_FPS = 12
+PREVIEW_WIDTH = 480
+
+# Il poster è preso a questa distanza dall'inizio della prima slide, quando
+# i suoi layer sono già entrati
+POSTER_DELAY = 2.0
+
+# Scala HLS: altezza e bitrate massimo (kbit/s) di ogni versione; le versioni
+# più alte della tela (es. nelle bozze) sono saltate
+HLS_LADDER = ((1080, 5000), (720, 2800), (480, 1200))
+# Durata massima di un segmento: le scene più lunghe sono divise in parti uguali
+HLS_SEGMENT_SECONDS = 2
+
+
+def output_paths(output, formats):
+    """Percorso di ogni uscita aggiuntiva, accanto al video principale"""
+    root, ext = os.path.splitext(output)
+    names = {"720p": f"{root}_720p{ext}", "vertical": f"{root}_vertical{ext}",
+             "gif": f"{root}_preview.gif", "webp": f"{root}_preview.webp",
+             "poster": f"{root}_poster.jpg", "hls": os.path.join(f"{root}_hls", "master.m3u8")}
+    return {fmt: names[fmt] for fmt in formats}
+
+
+def highlight(timeline):
+    """Inizio della prima slide (dopo l'intro): da lì anteprime e poster"""
+    return timeline.offsets[1] if len(timeline.scenes) > 1 else 0.0
+
+
+def hls_cuts(timeline):
+    """Primi frame dei segmenti HLS: l'inizio di ogni scena e tagli regolari al suo interno"""
+    fps = timeline.fps
+    starts = timeline.offsets[:len(timeline.scenes)]
+    bounds = [math.ceil(offset * fps - 1e-6) for offset in starts] + [timeline.n_frames]
+    cuts = []
+    for a, b in zip(bounds, bounds[1:]):
+        parts = max(math.ceil((b - a) / (HLS_SEGMENT_SECONDS * fps)), 1)
+        cuts += sorted({a + (b - a) * n // parts for n in range(parts)})
+    return cuts
+
+
+def hls_args(source, path, settings, timeline, audiofile=None):
+    """
+    Filtri e argomenti ffmpeg della scala HLS da `source`: una versione per
+    altezza di HLS_LADDER, con keyframe (e quindi segmenti) solo in hls_cuts
+    """
+    height = timeline.size[1]
+    ladder = [(h, rate) for h, rate in HLS_LADDER if h <= height] or [(height, HLS_LADDER[-1][1])]
+    fps = timeline.fps
+    cuts = hls_cuts(timeline)
+    # Mezzo frame prima: ffmpeg forza il keyframe sul primo frame con tempo >= t
+    times = ",".join(f"{max(k - 0.5, 0) / fps:.6f}" for k in cuts)
+    graph = ["{}split={}{}".format(source, len(ladder), "".join(f"[hs{n}]" for n in range(len(ladder))))]
+    graph += [f"[hs{n}]scale=-2:{h}:flags=lanczos[hv{n}]" for n, (h, _) in enumerate(ladder)]
+
+    args = [arg for n in range(len(ladder)) for arg in ("-map", f"[hv{n}]")]
+    if audiofile:
+        args += ["-map", "1:a"] * len(ladder) + ["-c:a", "copy", "-shortest"]
+    # Nessun keyframe automatico fra un taglio e l'altro
+    args += replace(settings, gop=None).ffmpeg_args()
+    args += ["-g", str(2 * HLS_SEGMENT_SECONDS * fps), "-sc_threshold", "0"]
+    for n, (_, rate) in enumerate(ladder):
+        # Senza indice di stream -force_key_frames vale solo per la prima versione
+        args += [f"-force_key_frames:v:{n}", times, f"-maxrate:v:{n}", f"{rate}k", f"-bufsize:v:{n}", f"{2 * rate}k"]
+    streams = " ".join(f"v:{n}{f',a:{n}' if audiofile else ''},name:{h}p" for n, (h, _) in enumerate(ladder))
+    folder = os.path.dirname(path)
+    args += ["-f", "hls", "-hls_playlist_type", "vod", "-hls_segment_type", "fmp4",
+             # Un segmento per ogni keyframe
+             "-hls_time", f"{0.5 / fps:.6f}", "-hls_flags", "independent_segments",
+             "-hls_fmp4_init_filename", "init.mp4",
+             "-hls_segment_filename", os.path.join(folder, "%v", "seg_%03d.m4s"),
+             "-master_pl_name", os.path.basename(path), "-var_stream_map", streams,
+             os.path.join(folder, "%v", "index.m3u8")]
+    return graph, args
+
+
+def landscape_args(output, paths, settings, audiofile=None, preview_start=0.0, timeline=None):
+    """
+    Argomenti ffmpeg che dividono il flusso orizzontale fra le uscite
+    (`timeline` serve solo per i tagli della scala HLS)
+    """
+    branches = ["main"] + [fmt for fmt in ("720p", "gif", "webp", "hls") if fmt in paths]
+    graph = []
+    if len(branches) > 1:
+        graph.append("[0:v]split={}{}".format(len(branches), "".join(f"[s{n}]" for n in range(len(branches)))))
+    preview = (f"trim=start={preview_start:.3f}:duration={PREVIEW_SECONDS},setpts=PTS-STARTPTS,"
+               f"fps={PREVIEW_FPS},scale={PREVIEW_WIDTH}:-2:flags=lanczos")
+    audio = ["-map", "1:a", "-c:a", "copy", "-shortest"] if audiofile else []
+    args = []
+    for n, fmt in enumerate(branches):
+        source = f"[s{n}]" if len(branches) > 1 else "0:v"
+        if fmt == "main":
+            args += ["-map", source] + audio + settings.ffmpeg_args() + settings.mp4_args() + [output]
+        elif fmt == "720p":
+            graph.append(f"{source}scale=-2:'min(720,ih)':flags=lanczos[o{n}]")
+            args += ["-map", f"[o{n}]"] + audio + settings.ffmpeg_args() + settings.mp4_args() + [paths[fmt]]
+        elif fmt == "gif":
+            # Palette calcolata sull'anteprima stessa
+            graph.append(f"{source}{preview},split[g{n}][h{n}];[g{n}]palettegen[p{n}];"
+                         f"[h{n}][p{n}]paletteuse[o{n}]")
+            args += ["-map", f"[o{n}]", "-loop", "0", paths[fmt]]
+        elif fmt == "webp":
+            graph.append(f"{source}{preview}[o{n}]")
+            args += ["-map", f"[o{n}]", "-c:v", "libwebp_anim", "-q:v", "70", "-loop", "0", paths[fmt]]
+        elif fmt == "hls":
+            filters, hls = hls_args(source, paths[fmt], settings, timeline, audiofile)
+            graph += filters
+            args += hls
+    return (["-filter_complex", ";".join(graph)] if graph else []) + args
+
+
+def render_outputs(timelines, output, formats, settings=EncoderSettings(), audio=None):
+    """
+    Rende il video principale e le uscite in `formats` in un solo passaggio.
+
+    `timelines` ha la timeline "landscape" e, se serve il taglio verticale,
+    quella "vertical". `audio` è il percorso di una traccia già codificata.
+    Restituisce {formato: percorso}.
+    """
+    landscape = timelines["landscape"]
+    paths = output_paths(output, formats)
+    start = highlight(landscape)
+    poster = None
+    if "poster" in paths:
+        poster = min(int(round((start + POSTER_DELAY) * landscape.fps)), landscape.n_frames - 1)
+    if "hls" in paths:
+        os.makedirs(os.path.dirname(paths["hls"]), exist_ok=True)
+    with ExitStack() as stack:
+        args = landscape_args(output, paths, settings, audio, start, landscape)
+        writer = stack.enter_context(FFmpegWriter(output, landscape.size, landscape.fps,
+                                                  audiofile=audio, outputs=args))
+        streams = [landscape.stream(writer)]
+        if "vertical" in paths:
+            vertical = timelines["vertical"]
+            writer = stack.enter_context(FFmpegWriter(paths["vertical"], vertical.size, vertical.fps,
+                                                      settings, audio, settings.mp4_args()))
+            streams.append(vertical.stream(writer))
+        for frames in zip_longest(*streams):
+            k, frame = frames[0] or (None, None)
+            if k == poster:
+                Image.fromarray(frame).save(paths["poster"], quality=90)
+    return paths
+
+
+def parse_formats(value):
+    formats = [fmt.strip() for fmt in value.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"uscite sconosciute: {', '.join(unknown)} (disponibili: {', '.join(FORMATS)})")
+    return formats
+
+
+def add_output_arguments(parser):
+    parser.add_argument("--outputs", type=parse_formats, default=[], metavar="LISTA",
+                        help="uscite aggiuntive nello stesso passaggio: " + ",".join(FORMATS))
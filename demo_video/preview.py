@@ -0,0 +1,180 @@
+"""
+Frame singoli e provini senza rendere il video
+
+    python -m demo_video.preview --generator v2 --at end --sheet provino.jpg
+    python -m demo_video.preview --timeline demo.json --at 3.5 12 mid --out-dir frames/
+
+Per controllare un layout non serve comporre tutto il video: la timeline
+viene pianificata senza pixel (come con --stream), si costruiscono solo le
+scene che contengono gli istanti richiesti e, di ciascuna, solo i layer
+visibili in quegli istanti. Ogni frame è una sola chiamata al compositore.
+
+Istanti accettati da --at:
+
+- numeri: secondi dall'inizio del video
+- end:    ultimo frame pieno di ogni scena (prima della dissolvenza d'uscita)
+- mid:    metà di ogni scena
+"""
+
+import argparse
+import importlib
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+
+from PIL import Image, ImageDraw
+
+from demo_video.cache import AssetStore
+from demo_video.canvas import add_draft_arguments, canvas_from_args
+from demo_video.compositor import Compositor
+from demo_video.memory import DEFAULT_BUDGET_MB, set_memory_budget
+from demo_video.spec import compile_timeline, load_spec, use_asset_store
+from demo_video.text import font_path, load_font
+
+GENERATORS = {"v1": "create_demo_video", "v2": "create_demo_video_v2"}
+SCENE_TOKENS = ("end", "mid")
+
+# Provino: larghezza delle miniature, colonne, altezza dell'etichetta
+THUMB_WIDTH = 480
+SHEET_COLUMNS = 4
+LABEL_HEIGHT = 28
+
+
+def last_full_frame(scene, fps):
+    """Tempo locale dell'ultimo frame della scena prima della dissolvenza d'uscita"""
+    t = scene.duration
+    for fx in scene.effects:
+        a, b = fx.animated_span(scene.duration)
+        if b >= scene.duration and a > 0:
+            t = min(t, a + 1 / fps)
+    return max(math.ceil(t * fps) - 1, 0) / fps
+
+
+def resolve_times(timeline, tokens):
+    """Istanti (in secondi, ordinati) per numeri e parole chiave di --at"""
+    times = set()
+    for token in tokens:
+        if token == "end":
+            times.update(offset + last_full_frame(scene, timeline.fps)
+                         for offset, scene in zip(timeline.offsets, timeline.scenes))
+        elif token == "mid":
+            times.update(offset + scene.duration / 2 for offset, scene in zip(timeline.offsets, timeline.scenes))
+        else:
+            times.add(min(max(float(token), 0.0), timeline.duration - 1 / timeline.fps))
+    # Sulla griglia dei frame, come nel video
+    return sorted({round(t * timeline.fps) / timeline.fps for t in times})
+
+
+def render_frames(timeline, times):
+    """
+    Frame (RGB uint8) della timeline agli istanti `times`, con nome della
+    scena e tempo locale. Le scene pianificate (LazyScene) vengono costruite
+    solo con i layer visibili agli istanti che le riguardano.
+    """
+    by_scene = defaultdict(list)
+    for t in times:
+        index, local_t = timeline.locate(t)
+        by_scene[index].append((t, local_t))
+    frames = {}
+    for index, hits in sorted(by_scene.items()):
+        scene = timeline.scenes[index]
+        if hasattr(scene, "build"):
+            scene = scene.build([local_t for _, local_t in hits])
+        compositor = Compositor(scene)
+        for t, local_t in hits:
+            frames[t] = (compositor.render(local_t).copy(), scene.name, local_t)
+    return [frames[t] for t in times]
+
+
+def contact_sheet(frames, width=THUMB_WIDTH, columns=SHEET_COLUMNS):
+    """Griglia di miniature etichettate con scena e tempo"""
+    h, w = frames[0][0].shape[:2]
+    thumb = (width, max(int(round(h * width / w)), 1))
+    columns = min(columns, len(frames))
+    rows = -(-len(frames) // columns)
+    sheet = Image.new("RGB", (columns * thumb[0], rows * (thumb[1] + LABEL_HEIGHT)), (24, 24, 24))
+    draw = ImageDraw.Draw(sheet)
+    font = load_font(font_path(False), LABEL_HEIGHT // 2)
+    for n, (frame, name, local_t) in enumerate(frames):
+        x = (n % columns) * thumb[0]
+        y = (n // columns) * (thumb[1] + LABEL_HEIGHT)
+        sheet.paste(Image.fromarray(frame).resize(thumb, Image.Resampling.BILINEAR, reducing_gap=2.0), (x, y))
+        draw.text((x + 8, y + thumb[1] + 6), f"{name} @ {local_t:.2f}s", fill=(230, 230, 230), font=font)
+    return sheet
+
+
+def save_frames(frames, times, outdir):
+    """Un PNG per frame; restituisce i percorsi"""
+    os.makedirs(outdir, exist_ok=True)
+    paths = []
+    for t, (frame, name, _) in zip(times, frames):
+        path = os.path.join(outdir, f"{t:08.3f}_{name}.png")
+        Image.fromarray(frame).save(path)
+        paths.append(path)
+    return paths
+
+
+def parse_time(value):
+    if value in SCENE_TOKENS:
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"istante non valido: {value} (secondi, {' o '.join(SCENE_TOKENS)})") from None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Frame singoli e provini di un video demo")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--generator", choices=sorted(GENERATORS), default="v2")
+    source.add_argument("--timeline", default=None, metavar="FILE", help="timeline JSON/YAML")
+    parser.add_argument("--layout", default=None, help="layout del generatore (es. vertical, solo v2)")
+    parser.add_argument("--at", type=parse_time, nargs="+", default=["end"], metavar="T",
+                        help="istanti in secondi, 'end' o 'mid' (default: end)")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--sheet", default=None, metavar="FILE", help="salva un provino unico")
+    output.add_argument("--out-dir", default=None, metavar="DIR", help="salva un PNG per frame")
+    parser.add_argument("--width", type=int, default=THUMB_WIDTH, help="larghezza delle miniature")
+    parser.add_argument("--columns", type=int, default=SHEET_COLUMNS)
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--no-cache", action="store_true", help="non usa gli screenshot in cache")
+    parser.add_argument("--memory-budget", type=float, default=DEFAULT_BUDGET_MB, metavar="MB")
+    add_draft_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def load_timeline_spec(args):
+    if args.timeline:
+        return load_spec(args.timeline)
+    gen = importlib.import_module(GENERATORS[args.generator])
+    return gen.create_timeline_spec(args.layout) if args.layout else gen.create_timeline_spec()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    set_memory_budget(args.memory_budget)
+    if not args.no_cache:
+        use_asset_store(AssetStore(args.cache_dir))
+    spec = load_timeline_spec(args)
+    canvas = canvas_from_args(args, spec.get("size", (1920, 1080)), spec.get("fps", 30))
+
+    t0 = time.perf_counter()
+    timeline = compile_timeline(spec, canvas, lazy=True)
+    times = resolve_times(timeline, [str(t) for t in args.at])
+    frames = render_frames(timeline, times)
+    print(f"  → {len(frames)} frame in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+    if args.out_dir:
+        for path in save_frames(frames, times, args.out_dir):
+            print(f"    ✓ {path}")
+    else:
+        sheet = args.sheet or "contact_sheet.jpg"
+        contact_sheet(frames, args.width, args.columns).save(sheet, quality=90)
+        print(f"    ✓ {sheet}")
+
+
+if __name__ == "__main__":
+    main()
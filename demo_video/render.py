@@ -0,0 +1,17 @@
+"""
+Render in un solo passaggio: timeline -> FFmpegWriter -> file
+"""
+
+from demo_video.encoder import EncoderSettings, FFmpegWriter
+
+
+def render_video(timeline, output, settings=EncoderSettings(), audio=None):
+    """
+    Compone e codifica tutta la timeline con un solo processo ffmpeg.
+
+    `audio` è il percorso di una traccia già codificata (vedi
+    demo_video.audio.music_track), copiata senza ricodifica.
+    """
+    with FFmpegWriter(output, timeline.size, timeline.fps, settings, audio,
+                      output_args=settings.mp4_args()) as writer:
+        timeline.write(writer)
@@ -0,0 +1,212 @@
+"""
+Scene dei video demo: layer, effetti e intervalli statici
+
+Una scena descrive i suoi layer (immagine, posizione, inizio, durata, effetti)
+invece di costruire subito un CompositeVideoClip: in questo modo il renderer
+sa in anticipo quali intervalli di tempo non cambiano e può comporre un solo
+frame per ciascuno. La composizione vera e propria è in demo_video.compositor.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from demo_video.backgrounds import Plate
+
+
+@dataclass(frozen=True)
+class CrossFadeIn:
+    """Dissolvenza in entrata (come vfx.CrossFadeIn)"""
+    duration: float
+
+    def animated_span(self, clip_duration):
+        return (0.0, min(self.duration, clip_duration))
+
+    def opacity(self, t, clip_duration):
+        return 1.0 if t >= self.duration else t / self.duration
+
+    def scale(self, t, clip_duration):
+        return 1.0
+
+
+@dataclass(frozen=True)
+class CrossFadeOut:
+    """Dissolvenza in uscita (come vfx.CrossFadeOut)"""
+    duration: float
+
+    def animated_span(self, clip_duration):
+        return (max(clip_duration - self.duration, 0.0), clip_duration)
+
+    def opacity(self, t, clip_duration):
+        return min((clip_duration - t) / self.duration, 1.0)
+
+    def scale(self, t, clip_duration):
+        return 1.0
+
+
+@dataclass(frozen=True)
+class SlowZoom:
+    """Zoom lento lineare: scala 1 + amount * t / durata"""
+    amount: float
+
+    def animated_span(self, clip_duration):
+        return (0.0, clip_duration)
+
+    def opacity(self, t, clip_duration):
+        return 1.0
+
+    def scale(self, t, clip_duration):
+        return 1 + self.amount * t / clip_duration
+
+
+@dataclass(frozen=True)
+class KenBurns:
+    """
+    Zoom dentro l'immagine verso un punto che si sposta: la vista si
+    ingrandisce fino a 1 + zoom mentre il suo centro va da `start` a `end`
+    (frazioni di larghezza e altezza). Lo sprite mantiene la sua dimensione.
+    """
+    zoom: float = 0.1
+    start: tuple = (0.5, 0.5)
+    end: tuple = (0.5, 0.5)
+
+    def __post_init__(self):
+        # Da JSON arrivano liste
+        object.__setattr__(self, "start", tuple(self.start))
+        object.__setattr__(self, "end", tuple(self.end))
+
+    def animated_span(self, clip_duration):
+        return (0.0, clip_duration)
+
+    def opacity(self, t, clip_duration):
+        return 1.0
+
+    def scale(self, t, clip_duration):
+        return 1.0
+
+    def view(self, t, clip_duration):
+        """Regione visibile (x0, y0, x1, y1) in frazioni dell'immagine"""
+        p = t / clip_duration
+        half = 0.5 / (1 + self.zoom * p)
+        cx, cy = (a + (b - a) * p for a, b in zip(self.start, self.end))
+        cx = min(max(cx, half), 1 - half)
+        cy = min(max(cy, half), 1 - half)
+        return (cx - half, cy - half, cx + half, cy + half)
+
+
+@dataclass(frozen=True)
+class CountUp:
+    """
+    Contatori e grafici (vedi demo_video.figures) che crescono da zero al
+    valore finale in `duration` secondi, rallentando verso la fine
+    """
+    duration: float = 1.5
+
+    def animated_span(self, clip_duration):
+        return (0.0, min(self.duration, clip_duration))
+
+    def opacity(self, t, clip_duration):
+        return 1.0
+
+    def scale(self, t, clip_duration):
+        return 1.0
+
+    def progress(self, t, clip_duration):
+        """Avanzamento 0..1 (ease-out cubico)"""
+        p = min(max(t / self.duration, 0.0), 1.0) if self.duration > 0 else 1.0
+        return 1 - (1 - p) ** 3
+
+
+@dataclass
+class Layer:
+    """Elemento di una scena, visibile in [start, start + duration)"""
+    image: np.ndarray
+    duration: float
+    position: tuple = (0, 0)
+    start: float = 0
+    effects: tuple = ()
+    name: str = ""  # etichetta per la trace
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+    def animated_spans(self):
+        """Intervalli (in tempo scena) in cui il layer cambia aspetto"""
+        spans = []
+        for fx in self.effects:
+            a, b = fx.animated_span(self.duration)
+            spans.append((self.start + a, self.start + b))
+        return spans
+
+
+@dataclass
+class Scene:
+    """Insieme di layer composti su una tela di dimensione fissa"""
+    name: str
+    size: tuple
+    layers: list
+    effects: tuple = ()
+    # Durata della scena completa quando sono costruiti solo alcuni layer
+    # (vedi LazyScene.build): dissolvenze e CrossFadeOut restano agli stessi tempi
+    fixed_duration: float = None
+
+    @property
+    def duration(self):
+        if self.fixed_duration is not None:
+            return self.fixed_duration
+        # Come CompositeVideoClip: la scena termina con l'ultimo layer
+        return max(layer.end for layer in self.layers)
+
+    def with_effects(self, effects):
+        """Copia della scena con effetti aggiuntivi sull'intera composizione"""
+        return replace(self, effects=tuple(self.effects) + tuple(effects))
+
+    def animated_spans(self):
+        spans = []
+        for layer in self.layers:
+            spans.extend(layer.animated_spans())
+        duration = self.duration
+        spans.extend(fx.animated_span(duration) for fx in self.effects)
+        return spans
+
+    def static_spans(self):
+        """
+        Intervalli [a, b) in cui il frame composto non cambia.
+
+        I confini sono gli istanti in cui un layer compare o scompare e gli
+        estremi di ogni effetto; un intervallo fra due confini è statico se
+        non interseca nessun effetto in corso.
+        """
+        duration = self.duration
+        animated = self.animated_spans()
+        bounds = {0.0, duration}
+        for layer in self.layers:
+            bounds.update((layer.start, min(layer.end, duration)))
+        for a, b in animated:
+            bounds.update((a, b))
+        bounds = sorted(b for b in bounds if 0 <= b <= duration)
+
+        # Quanti effetti coprono ogni tratto fra due confini consecutivi
+        depth = [0] * (len(bounds) + 1)
+        for a, b in animated:
+            if b > a:
+                depth[bisect_left(bounds, a)] += 1
+                depth[bisect_left(bounds, b)] -= 1
+        spans = []
+        covered = 0
+        for n, (a, b) in enumerate(zip(bounds, bounds[1:])):
+            covered += depth[n]
+            if not covered:
+                spans.append((a, b))
+        return spans
+
+    def solid_background(self):
+        """Colore del fondo se il primo layer è una tinta unita per tutta la scena"""
+        first = self.layers[0]
+        if (isinstance(first.image, Plate) and first.image.color is not None
+                and first.image.size == tuple(self.size)
+                and first.start == 0 and first.end >= self.duration):
+            return first.image.color
+        return None
@@ -0,0 +1,167 @@
+"""
+Render parallelo per segmenti
+
+La timeline viene divisa in segmenti: il corpo di ogni scena e, fra due
+scene, un breve segmento di confine che contiene la dissolvenza. Ogni
+segmento viene codificato da un processo separato (o preso dalla cache, vedi
+demo_video.cache) e alla fine i file sono uniti con il demuxer concat di
+ffmpeg senza ricodifica.
+"""
+
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+import multiprocessing
+
+from demo_video.cache import scene_fingerprint, segment_key
+from demo_video.encoder import MP4_LAYOUTS, EncoderSettings, FFmpegWriter, ffmpeg_binary
+from demo_video.scene import CrossFadeIn, CrossFadeOut
+from demo_video.trace import TRACER
+
+# Timeline ereditata dai processi worker (vedi _init_worker)
+_timeline = None
+
+
+@dataclass(frozen=True)
+class Segment:
+    """Intervallo di frame [first, last) della timeline"""
+    name: str
+    first: int
+    last: int
+
+    @property
+    def n_frames(self):
+        return self.last - self.first
+
+
+def _fade(scene, kind):
+    return max((fx.duration for fx in scene.effects if isinstance(fx, kind)), default=0)
+
+
+def _frame_at(t, fps):
+    # Primo frame con tempo >= t (tolleranza per gli errori di arrotondamento)
+    return math.ceil(t * fps - 1e-6)
+
+
+def plan_segments(timeline):
+    """Segmenti della timeline: corpo di ogni scena e confini con le dissolvenze"""
+    fps = timeline.fps
+    cuts = {0: None, timeline.n_frames: None}
+    for i in range(len(timeline.scenes) - 1):
+        boundary = timeline.offsets[i + 1]
+        fade_out = _fade(timeline.scenes[i], CrossFadeOut)
+        fade_in = _fade(timeline.scenes[i + 1], CrossFadeIn)
+        a = _frame_at(boundary - fade_out, fps)
+        b = _frame_at(boundary + fade_in, fps)
+        if a < b:
+            cuts.setdefault(a, f"{i}>{i + 1}")
+            cuts[b] = None
+        else:
+            cuts.setdefault(a, None)
+
+    frames = sorted(cuts)
+    segments = []
+    for a, b in zip(frames, frames[1:]):
+        if b <= a:
+            continue
+        label = cuts[a]
+        if label is None:
+            index, _ = timeline.locate(a / fps)
+            label = timeline.scenes[index].name
+        segments.append(Segment(f"{len(segments):03d} {label}", a, b))
+    return segments
+
+
+def _init_worker(timeline):
+    global _timeline
+    _timeline = timeline
+
+
+def _init_pool_worker(timeline):
+    TRACER.forget()
+    _init_worker(timeline)
+
+
+def _render_segment(segment, path, settings):
+    timeline = _timeline
+    with FFmpegWriter(path, timeline.size, timeline.fps, settings) as writer:
+        timeline.write(writer, segment.first, segment.last)
+    # Nei worker la trace del segmento passa al processo principale
+    TRACER.save_part()
+    return path
+
+
+def concat_segments(paths, output, audiofile=None, mp4_args=MP4_LAYOUTS["faststart"]):
+    """Unisce i segmenti con il demuxer concat (stream copy) e aggiunge l'audio"""
+    list_file = output + ".segments.txt"
+    with open(list_file, "w") as f:
+        for path in paths:
+            f.write("file '{}'\n".format(os.path.abspath(path).replace("'", r"'\''")))
+    cmd = [ffmpeg_binary(), "-y", "-loglevel", "error",
+           "-f", "concat", "-safe", "0", "-i", list_file]
+    if audiofile:
+        cmd += ["-i", audiofile, "-map", "0:v", "-map", "1:a", "-shortest"]
+    cmd += ["-c", "copy"] + list(mp4_args) + [output]
+    try:
+        subprocess.run(cmd, check=True)
+    finally:
+        os.remove(list_file)
+
+
+def render_segments(timeline, output, workers=1, audio=None, cache=None,
+                    settings=EncoderSettings(), verbose=True):
+    """
+    Codifica i segmenti con `workers` processi e li concatena.
+
+    Con una SegmentCache i segmenti già presenti vengono riusati e quelli
+    nuovi salvati per i render successivi. `audio` è il percorso di una
+    traccia già codificata (vedi demo_video.audio.music_track).
+    """
+    segments = plan_segments(timeline)
+    if workers > 1:
+        settings = replace(settings, threads=max(1, (os.cpu_count() or 1) // workers))
+
+    tmpdir = tempfile.mkdtemp(prefix=".segments-", dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        paths = [os.path.join(tmpdir, f"{n:04d}.mp4") for n in range(len(segments))]
+        keys = [None] * len(segments)
+        if cache is not None:
+            fingerprints = [scene_fingerprint(scene) for scene in timeline.scenes]
+            keys = [segment_key(timeline, segment, settings, fingerprints) for segment in segments]
+            for n, key in enumerate(keys):
+                paths[n] = cache.get(key) or paths[n]
+        todo = [n for n, path in enumerate(paths) if not os.path.exists(path)]
+        if cache is not None and verbose:
+            print(f"    {len(segments) - len(todo)}/{len(segments)} segmenti dalla cache")
+
+        jobs = [(segments[n], paths[n], settings) for n in todo]
+        if workers > 1 and len(jobs) > 1:
+            TRACER.start_frames(sum(segments[n].n_frames for n in todo))
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            with ProcessPoolExecutor(workers, mp_context=context,
+                                     initializer=_init_pool_worker, initargs=(timeline,)) as pool:
+                futures = [pool.submit(_render_segment, *job) for job in jobs]
+                for n, future in zip(todo, futures):
+                    future.result()
+                    if verbose:
+                        print(f"    ✓ Segmento {segments[n].name} ({segments[n].n_frames} frame)")
+        else:
+            _init_worker(timeline)
+            for n, job in zip(todo, jobs):
+                _render_segment(*job)
+                if verbose:
+                    print(f"    ✓ Segmento {segments[n].name} ({segments[n].n_frames} frame)")
+
+        if cache is not None:
+            for n in todo:
+                paths[n] = cache.store(keys[n], paths[n])
+
+        concat_segments(paths, output, audio, settings.mp4_args())
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return segments
@@ -0,0 +1,406 @@
+"""
+Timeline dichiarative in JSON o YAML
+
+Una timeline è un dizionario:
+
+    {"fps": 30, "size": [1920, 1080], "scenes": [
+        {"name": "intro", "duration": 5,
+         "effects": [{"type": "CrossFadeOut", "duration": 0.5}],
+         "layers": [
+            {"type": "solid", "color": [18, 18, 18]},
+            {"type": "text", "text": "G-Press", "size": 100, "color": [76, 175, 80],
+             "position": ["center", 580], "start": 0.5,
+             "effects": [{"type": "CrossFadeIn", "duration": 0.8}]}]}]}
+
+Misure, posizioni e dimensioni dei font sono in pixel di `size`: la tela del
+render (vedi demo_video.canvas) le scala. Le posizioni accettano anche
+"center", "left", ... come in MoviePy. Un layer senza `duration` dura fino
+alla fine della scena. Una coordinata x può essere {"after": id, "gap": px},
+cioè a destra del layer con quell'"id".
+
+I layer "counter" e "chart" prendono i numeri da un file di dati dell'app
+(vedi demo_video.figures) e con l'effetto CountUp crescono da zero:
+
+    {"type": "counter", "path": "assets/data/journalists.json",
+     "text": "{count} giornalisti", "size": 42, "color": [76, 175, 80],
+     "effects": [{"type": "CountUp", "duration": 1.5}]}
+
+compile_timeline() trasforma la descrizione in scene pronte per Timeline.
+Con lazy=True (render in streaming) ogni scena resta una descrizione finché
+il render non la raggiunge e viene liberata quando la si lascia: in memoria
+c'è una scena alla volta più gli asset nel budget di demo_video.memory.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, replace
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from demo_video.backgrounds import gradient_plate, solid_plate
+from demo_video.canvas import Canvas
+from demo_video.compositor import resolve_position
+from demo_video.figures import Chart, Counter, chart_items, load_metrics, template_parts
+from demo_video.memory import ASSETS, DEFAULT_BUDGET_MB
+from demo_video.scene import Layer, Scene, CountUp, CrossFadeIn, CrossFadeOut, KenBurns, SlowZoom
+from demo_video.text import draw_text, font_key, get_font, text_bbox, text_sprite
+from demo_video.timeline import Timeline
+from demo_video.trace import span
+
+EFFECTS = {
+    "CrossFadeIn": CrossFadeIn,
+    "CrossFadeOut": CrossFadeOut,
+    "SlowZoom": SlowZoom,
+    "KenBurns": KenBurns,
+    "CountUp": CountUp,
+}
+
+
+def load_spec(path):
+    """Legge una timeline da .json, .yaml o .yml"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Per le timeline YAML serve PyYAML: pip install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def save_spec(spec, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(spec, f, ensure_ascii=False, indent=2)
+
+
+def effect(spec):
+    params = dict(spec)
+    return EFFECTS[params.pop("type")](**params)
+
+
+def _color(value):
+    return tuple(value)
+
+
+def _gradient(spec, canvas):
+    return gradient_plate(canvas.size, _color(spec["colors"][0]), _color(spec["colors"][1]))
+
+
+def _solid(spec, canvas):
+    return solid_plate(canvas.size, _color(spec["color"]))
+
+
+def _text(spec, canvas):
+    pad = canvas.pos(spec.get("pad", (20, 20)))
+    return text_sprite(spec["text"], canvas.px(spec["size"]), _color(spec["color"]),
+                       spec.get("bold", True), pad)
+
+
+def _rect(spec, canvas):
+    w, h = canvas.pos(spec["rect"])
+    return np.full((h, w, 3), _color(spec["color"]), dtype=np.uint8)
+
+
+def _bullet(spec, canvas):
+    """Testo con pallino colorato a sinistra"""
+    px = canvas.px
+    font = get_font(px(spec["size"]), bold=spec.get("bold", False))
+    bbox = text_bbox(spec["text"], font)
+    w, h = bbox[2] - bbox[0] + px(80), bbox[3] - bbox[1] + px(20)
+    img = Image.new('RGBA', (w, h), (0, 0, 0, 0))
+    ImageDraw.Draw(img).ellipse([px(20), h//2 - px(6), px(32), h//2 + px(6)],
+                                fill=_color(spec["dot_color"]) + (255,))
+    return draw_text(np.array(img), canvas.pos((50, 5)), spec["text"], font, _color(spec["color"]))
+
+
+def _image(spec, canvas):
+    """
+    Immagine da file ridimensionata ad altezza `height` (o a `fit` [w, h]),
+    con cornice opzionale {"padding": px, "color": [r, g, b]}.
+
+    Se il file manca: "missing": "skip" toglie il layer, "placeholder" mette
+    un riquadro grigio con un punto interrogativo.
+    """
+    path = spec["path"]
+    mode = spec.get("mode", "RGB")
+    if not os.path.exists(path):
+        if spec.get("missing", "skip") == "skip":
+            return None
+        img = Image.new('RGB', canvas.pos((400, 800)), (50, 50, 50))
+        ImageDraw.Draw(img).text(canvas.pos((150, 400)), "?", fill=(100, 100, 100))
+        return np.array(img)
+
+    if "fit" in spec:
+        img = canvas.open_image(path, spec["fit"][1], mode)
+        img = img.resize(canvas.pos(spec["fit"]), Image.Resampling.LANCZOS)
+    else:
+        img = canvas.open_image(path, spec["height"], mode)
+        height = canvas.px(spec["height"])
+        aspect = img.width / img.height
+        img = img.resize((int(height * aspect), height), Image.Resampling.LANCZOS)
+
+    frame = spec.get("frame")
+    if frame:
+        padding = canvas.px(frame["padding"])
+        framed = Image.new('RGB', (img.width + padding*2, img.height + padding*2),
+                           _color(frame["color"]))
+        framed.paste(img, (padding, padding))
+        img = framed
+    return np.array(img)
+
+
+def _counter(spec, canvas):
+    """Testo con numeri dal file di dati `path`, es. "{count} giornalisti" (vedi demo_video.figures)"""
+    return Counter(spec["text"], load_metrics(spec["path"]), canvas.px(spec["size"]), _color(spec["color"]),
+                   spec.get("bold", True), canvas.pos(spec.get("pad", (20, 20))))
+
+
+def _chart(spec, canvas):
+    """Grafico a barre o a linea del dato `metric` del file `path`, nel riquadro `plot`"""
+    kind = spec.get("kind", "bar")
+    return Chart(chart_items(load_metrics(spec["path"]), spec["metric"], kind, spec.get("top")),
+                 canvas.pos(spec["plot"]), kind, _color(spec["color"]), canvas.px(spec.get("label_size", 18)),
+                 _color(spec.get("label_color", (180, 180, 180))))
+
+
+# Layer con testo: grassetto predefinito del loro font
+FONT_LAYERS = {"text": True, "bullet": False, "counter": True, "chart": False}
+
+
+def layer_inputs(spec):
+    """
+    Ingressi di un layer che non stanno nella sua descrizione: date dei file,
+    font effettivo e valori dei dati di contatori e grafici
+    """
+    inputs = []
+    if "path" in spec and os.path.exists(spec["path"]):
+        inputs.append(os.stat(spec["path"]).st_mtime_ns)
+    if spec["type"] in FONT_LAYERS:
+        inputs.append(font_key(spec.get("bold", FONT_LAYERS[spec["type"]])))
+    if spec["type"] == "counter":
+        inputs.append(template_parts(spec["text"], load_metrics(spec["path"])))
+    elif spec["type"] == "chart":
+        inputs.append(chart_items(load_metrics(spec["path"]), spec["metric"], spec.get("kind", "bar"), spec.get("top")))
+    return inputs
+
+
+LAYER_TYPES = {
+    "gradient": _gradient,
+    "solid": _solid,
+    "text": _text,
+    "rect": _rect,
+    "bullet": _bullet,
+    "image": _image,
+    "counter": _counter,
+    "chart": _chart,
+}
+
+# Chiavi che dicono dove e quando mostrare un layer, non come appare
+LAYOUT_KEYS = {"id", "position", "start", "duration", "effects"}
+
+# Layer costruiti una volta e condivisi (in sola lettura) fra scene e
+# varianti, nel budget di memoria degli asset; testi e sfondi hanno già le
+# loro cache
+CACHED_TYPES = {"image", "rect", "bullet"}
+
+# Layer salvati anche su disco (vedi use_asset_store)
+STORED_TYPES = {"image"}
+_store = None
+
+
+def use_asset_store(store):
+    """Salva e riapre in mmap le immagini elaborate in `store` (AssetStore o None)"""
+    global _store
+    _store = store
+
+
+def _build_key(spec, canvas):
+    content = {k: v for k, v in spec.items() if k not in LAYOUT_KEYS}
+    if "path" in spec and os.path.exists(spec["path"]):
+        stat = os.stat(spec["path"])
+        content["source"] = (os.path.abspath(spec["path"]), stat.st_mtime_ns, stat.st_size)
+    return json.dumps(content, sort_keys=True, default=list) + repr(canvas)
+
+
+def build_layer(spec, canvas):
+    """Pixel di un layer; quelli uguali in più scene vengono costruiti una volta"""
+    if spec["type"] not in CACHED_TYPES:
+        return LAYER_TYPES[spec["type"]](spec, canvas)
+    description = _build_key(spec, canvas)
+    key = ("layer", description)
+    image = ASSETS.get(key)
+    if image is None:
+        image = _load_stored(spec, description, canvas)
+        if image is None:
+            return None
+        image.setflags(write=False)
+        ASSETS.put(key, image)
+    return image
+
+
+def _load_stored(spec, description, canvas):
+    stored = _store is not None and spec["type"] in STORED_TYPES and os.path.exists(spec.get("path", ""))
+    if stored:
+        key = _store.key(description)
+        image = _store.get(key)
+        if image is not None:
+            return image
+    image = LAYER_TYPES[spec["type"]](spec, canvas)
+    if stored and image is not None:
+        image = _store.store(key, image)
+    return image
+
+
+def _position(spec, canvas, placed):
+    position = spec.get("position", (0, 0))
+    if isinstance(position, str):
+        return position
+    x, y = position
+    if isinstance(x, dict):
+        if x["after"] not in placed:
+            raise ValueError(f"layer {x['after']!r} non trovato (serve un 'id' precedente)")
+        px, _, pw, _ = placed[x["after"]]
+        x = px + pw + canvas.px(x.get("gap", 0))
+    elif not isinstance(x, str):
+        x = canvas.px(x)
+    if not isinstance(y, str):
+        y = canvas.px(y)
+    return (x, y)
+
+
+def layer_label(spec):
+    """Nome leggibile di un layer (per la trace)"""
+    if "id" in spec:
+        return spec["id"]
+    if "text" in spec:
+        return f'{spec["type"]} "{spec["text"]}"'
+    if "path" in spec:
+        return f'{spec["type"]} {os.path.basename(spec["path"])}'
+    return spec["type"]
+
+
+def compile_scene(spec, canvas=Canvas(), times=None):
+    """
+    Scene da una descrizione di scena.
+
+    Con `times` (istanti nella scena) si costruiscono solo i layer visibili
+    in almeno uno di quegli istanti, più quelli a cui si aggancia la loro
+    posizione ({"after": id}).
+    """
+    with span("scene", "build", scene=spec["name"]):
+        return _compile_scene(spec, canvas, times)
+
+
+def _active(layer_spec, duration, times):
+    start = layer_spec.get("start", 0)
+    end = start + layer_spec.get("duration", duration - start)
+    return any(start <= t < end for t in times)
+
+
+def _compile_scene(spec, canvas, times=None):
+    duration = spec["duration"]
+    layers = []
+    placed = {}
+    needed = None
+    if times is not None:
+        needed = {id(layer) for layer in spec["layers"] if _active(layer, duration, times)}
+        anchors = {layer["position"][0]["after"] for layer in spec["layers"]
+                   if id(layer) in needed and isinstance(layer.get("position"), list)
+                   and isinstance(layer["position"][0], dict)}
+        needed |= {id(layer) for layer in spec["layers"] if layer.get("id") in anchors}
+    for layer_spec in spec["layers"]:
+        if needed is not None and id(layer_spec) not in needed:
+            continue
+        label = layer_label(layer_spec)
+        with span(layer_spec["type"], "build", layer=label):
+            image = build_layer(layer_spec, canvas)
+        if image is None:
+            continue
+        start = layer_spec.get("start", 0)
+        # "center" & co. si risolvono qui sulla dimensione di partenza: uno
+        # sprite che poi si ingrandisce (SlowZoom) resta ancorato in alto a sinistra
+        size = (image.shape[1], image.shape[0])
+        position = resolve_position(_position(layer_spec, canvas, placed), size, canvas.size)
+        if "id" in layer_spec:
+            placed[layer_spec["id"]] = position + size
+        layers.append(Layer(image,
+                            layer_spec.get("duration", duration - start),
+                            position,
+                            start,
+                            [effect(fx) for fx in layer_spec.get("effects", ())],
+                            label))
+    return Scene(spec["name"], canvas.size, layers,
+                 tuple(effect(fx) for fx in spec.get("effects", ())))
+
+
+@dataclass
+class LazyScene(Scene):
+    """
+    Scena costruita solo quando serve.
+
+    I layer hanno tempi ed effetti ma non i pixel: bastano per durata e
+    intervalli statici. build() restituisce la scena vera, che la Timeline
+    tiene solo finché la compone.
+    """
+    spec: dict = None
+    canvas: Canvas = None
+
+    def build(self, times=None):
+        # Con `times` mancano i layer non visibili: la durata resta quella pianificata
+        return replace(compile_scene(self.spec, self.canvas, times), effects=self.effects,
+                       fixed_duration=self.duration)
+
+    def fingerprint(self):
+        """
+        Hash della descrizione senza costruire i pixel: come scene_fingerprint
+        cambia con i file, i font e i dati da cui vengono i pixel
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps(self.spec, sort_keys=True, default=list).encode())
+        for layer in self.spec["layers"]:
+            h.update(repr(layer_inputs(layer)).encode())
+        h.update(repr(self.canvas).encode())
+        return h.hexdigest()
+
+
+def plan_scene(spec, canvas=Canvas()):
+    """LazyScene da una descrizione di scena"""
+    duration = spec["duration"]
+    layers = []
+    for layer_spec in spec["layers"]:
+        if (layer_spec["type"] == "image" and not os.path.exists(layer_spec["path"])
+                and layer_spec.get("missing", "skip") == "skip"):
+            continue
+        start = layer_spec.get("start", 0)
+        layers.append(Layer(None,
+                            layer_spec.get("duration", duration - start),
+                            start=start,
+                            effects=[effect(fx) for fx in layer_spec.get("effects", ())]))
+    return LazyScene(spec["name"], canvas.size, layers,
+                     tuple(effect(fx) for fx in spec.get("effects", ())), spec=spec, canvas=canvas)
+
+
+def compile_timeline(spec, canvas=None, lazy=False):
+    """
+    Timeline da una descrizione completa; `canvas` (es. bozza) ha la precedenza.
+
+    Con `lazy` le scene vengono costruite durante il render (vedi LazyScene).
+    """
+    if canvas is None:
+        canvas = Canvas(tuple(spec.get("size", (1920, 1080))), spec.get("fps", 30))
+    build = plan_scene if lazy else compile_scene
+    scenes = [build(scene, canvas) for scene in spec["scenes"]]
+    return Timeline(scenes, canvas.fps)
+
+
+def add_timeline_arguments(parser):
+    parser.add_argument("--timeline", default=None, metavar="FILE",
+                        help="rende una timeline JSON/YAML invece di quella predefinita")
+    parser.add_argument("--export-timeline", default=None, metavar="FILE",
+                        help="salva in JSON la timeline usata")
+    parser.add_argument("--stream", action="store_true",
+                        help="costruisce ogni scena solo quando il render la raggiunge")
+    parser.add_argument("--memory-budget", type=float, default=DEFAULT_BUDGET_MB, metavar="MB",
+                        help=f"memoria per gli asset decodificati (default: {DEFAULT_BUDGET_MB})")
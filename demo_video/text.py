@@ -0,0 +1,165 @@
+"""
+Rasterizzazione del testo con cache
+
+- i font TrueType vengono aperti una sola volta per (percorso, dimensione)
+- ogni font ha un atlante di glifi: una stringa nuova si compone copiando
+  i glifi già rasterizzati invece di ridisegnarla con FreeType
+- gli sprite finiti sono in cache per (testo, font, colore, margini), nel
+  budget di memoria degli asset (demo_video.memory)
+"""
+
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from demo_video.memory import ASSETS
+
+FONT_PATHS = {
+    True: [
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+        "/usr/share/fonts/truetype/freefont/FreeSansBold.ttf",
+    ],
+    False: [
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+        "/usr/share/fonts/truetype/freefont/FreeSansBold.ttf",
+    ],
+}
+
+
+@lru_cache(maxsize=None)
+def font_path(bold=True):
+    """Primo font disponibile, None se serve il font di default di PIL"""
+    for path in FONT_PATHS[bold]:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=64)
+def load_font(path, size):
+    if path is None:
+        return ImageFont.load_default()
+    return ImageFont.truetype(path, size)
+
+
+def font_key(bold=True):
+    """Font effettivo (percorso e data del file) per le chiavi delle cache"""
+    path = font_path(bold)
+    return (path, os.stat(path).st_mtime_ns if path else None)
+
+
+def get_font(size, bold=True):
+    """Ottiene un font con fallback (handle condiviso per percorso e dimensione)"""
+    return load_font(font_path(bold), size)
+
+
+class GlyphAtlas:
+    """Glifi di un font rasterizzati una volta e riusati per ogni stringa"""
+
+    def __init__(self, font):
+        self.font = font
+        self.glyphs = {}
+
+    def glyph(self, ch):
+        """Maschera del glifo, offset rispetto alla penna e avanzamento"""
+        entry = self.glyphs.get(ch)
+        if entry is None:
+            x0, y0, x1, y1 = self.font.getbbox(ch)
+            mask = Image.new('L', (max(x1 - x0, 1), max(y1 - y0, 1)), 0)
+            ImageDraw.Draw(mask).text((-x0, -y0), ch, font=self.font, fill=255)
+            entry = (np.array(mask), x0, y0, self.font.getlength(ch))
+            self.glyphs[ch] = entry
+        return entry
+
+    def layout(self, text):
+        """
+        Glifi con la posizione (x, y) del loro angolo in alto a sinistra.
+
+        Le penne sono misurate dal font sulla stringa (con il kerning), come
+        in ImageDraw.text: il kerning di una coppia allunga l'avanzamento del
+        primo glifo, quindi la penna del glifo i è la lunghezza di text[:i + 1]
+        meno il suo avanzamento, arrotondata al pixel per eccesso da .5.
+        """
+        glyphs = [self.glyph(ch) for ch in text]
+        pens = [math.floor(self.font.getlength(text[:i + 1]) - g[3] + 0.5) for i, g in enumerate(glyphs)]
+        return [(g[0], pen + g[1], g[2]) for g, pen in zip(glyphs, pens)]
+
+    def bbox(self, text):
+        """Come ImageDraw.textbbox((0, 0), text)"""
+        if not text:
+            return (0, 0, 0, 0)
+        return self.font.getbbox(text)
+
+    def mask(self, text):
+        """Maschera alpha della stringa e sua origine (come bbox[:2])"""
+        x0, y0, x1, y1 = self.bbox(text)
+        out = np.zeros((max(y1 - y0, 1), max(x1 - x0, 1)), dtype=np.uint8)
+        for m, x, y in self.layout(text):
+            # Il riquadro della stringa intera può tagliare bordi vuoti dei glifi
+            left, top = max(x0 - x, 0), max(y0 - y, 0)
+            region = out[y - y0 + top:y - y0 + m.shape[0], x - x0 + left:x - x0 + m.shape[1]]
+            m = m[top:top + region.shape[0], left:left + region.shape[1]]
+            # Dove due glifi si sovrappongono PIL compone "over": m + region * (255 - m) / 255
+            tmp = region * (255 - m.astype(np.uint32)) + 128
+            region[...] = m + (((tmp >> 8) + tmp) >> 8)
+        return out, (x0, y0)
+
+
+@lru_cache(maxsize=64)
+def atlas_for(font):
+    return GlyphAtlas(font)
+
+
+def text_bbox(text, font):
+    return atlas_for(font).bbox(text)
+
+
+def draw_text(canvas, xy, text, font, color):
+    """Disegna il testo su un array RGBA (come ImageDraw.text con fill opaco)"""
+    mask, (x0, y0) = atlas_for(font).mask(text)
+    x, y = xy[0] + x0, xy[1] + y0
+    # Ritaglia la maschera ai bordi della tela, come fa PIL
+    cx, cy = max(-x, 0), max(-y, 0)
+    region = canvas[y + cy:y + mask.shape[0], x + cx:x + mask.shape[1]]
+    mask = mask[cy:cy + region.shape[0], cx:cx + region.shape[1]].astype(np.uint32)
+    # Composizione "over" non premoltiplicata: pesi in scala 255 * 255
+    src = mask * 255
+    dst = region[..., 3] * (255 - mask)
+    total = src + dst
+    div = np.maximum(total, 1)
+    for c in range(3):
+        region[..., c] = (color[c] * src + region[..., c] * dst + div // 2) // div
+    region[..., 3] = (total + 127) // 255
+    return canvas
+
+
+def text_sprite(text, font_size, color, bold=True, pad=(20, 20)):
+    """
+    Sprite RGBA del testo con margini `pad` (orizzontale, verticale).
+
+    Il risultato è condiviso fra tutte le chiamate con gli stessi argomenti,
+    quindi è in sola lettura.
+    """
+    key = ("text", text, font_size, tuple(color), bold, tuple(pad))
+    sprite = ASSETS.get(key)
+    if sprite is None:
+        sprite = ASSETS.put(key, _text_sprite(text, font_size, color, bold, pad))
+    return sprite
+
+
+def _text_sprite(text, font_size, color, bold, pad):
+    mask, (x0, y0) = atlas_for(get_font(font_size, bold)).mask(text)
+    h, w = mask.shape
+    canvas = np.zeros((h + pad[1] * 2, w + pad[0] * 2, 4), dtype=np.uint8)
+    # Su tela trasparente basta copiare la maschera (il testo inizia in pad + origine)
+    x, y = pad[0] + x0, pad[1] + y0
+    alpha = canvas[y:y + h, x:x + w, 3]
+    alpha[...] = mask[:alpha.shape[0], :alpha.shape[1]]
+    canvas[..., :3][canvas[..., 3] > 0] = color
+    canvas.setflags(write=False)
+    return canvas
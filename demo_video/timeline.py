@@ -0,0 +1,135 @@
+"""
+Timeline: scene concatenate una dopo l'altra su sfondo nero
+
+Negli intervalli statici di una scena il frame viene composto una sola volta
+e poi ripassato all'encoder così com'è, senza ricomporre i layer.
+
+Le scene con un metodo build() (demo_video.spec.LazyScene) vengono costruite
+quando il render le raggiunge e lasciate al garbage collector quando passa
+alla scena successiva.
+"""
+
+import time
+from bisect import bisect_right
+from itertools import accumulate
+
+from demo_video.compositor import Compositor
+from demo_video.trace import TRACER, span
+
+
+class Timeline:
+    """Sequenza di scene (come concatenate_videoclips con method="compose")"""
+
+    def __init__(self, scenes, fps):
+        self.scenes = list(scenes)
+        self.fps = fps
+        self.size = tuple(self.scenes[0].size)
+        self.offsets = list(accumulate((s.duration for s in self.scenes), initial=0.0))
+        self.duration = self.offsets[-1]
+        self._spans = [s.static_spans() for s in self.scenes]
+        self._span_starts = [[a for a, _ in spans] for spans in self._spans]
+        self._compositor = None
+        self._compositor_index = None
+        self._held_key = None
+        self._held_frame = None
+
+    def __getstate__(self):
+        # Il compositore e il frame in cache restano nel processo che li ha creati
+        state = self.__dict__.copy()
+        state.update(_compositor=None, _compositor_index=None, _held_key=None, _held_frame=None)
+        return state
+
+    @property
+    def n_frames(self):
+        return int(round(self.duration * self.fps))
+
+    def locate(self, t):
+        """Indice della scena attiva al tempo t e tempo locale nella scena"""
+        index = min(bisect_right(self.offsets, t) - 1, len(self.scenes) - 1)
+        return index, t - self.offsets[index]
+
+    def hold_key(self, index, local_t):
+        """Chiave dell'intervallo statico che contiene local_t, None se animato"""
+        n = bisect_right(self._span_starts[index], local_t) - 1
+        if n >= 0 and local_t < self._spans[index][n][1]:
+            return (index, n)
+        return None
+
+    def held_ratio(self):
+        """Frazione dei frame che riusano un frame già composto"""
+        keys = set()
+        held = 0
+        for k in range(self.n_frames):
+            key = self.hold_key(*self.locate(k / self.fps))
+            if key is None:
+                continue
+            if key in keys:
+                held += 1
+            keys.add(key)
+        return held / max(self.n_frames, 1)
+
+    def compositor(self, index):
+        if self._compositor is None or self._compositor_index != index:
+            scene = self.scenes[index]
+            # Prima di costruire la nuova scena si libera quella precedente
+            self._compositor = None
+            self._held_key = self._held_frame = None
+            if hasattr(scene, "build"):
+                scene = scene.build()
+            self._compositor = Compositor(scene)
+            self._compositor_index = index
+        return self._compositor
+
+    def compose(self, index, local_t, out=None):
+        """Compone il frame di una scena sopra lo sfondo nero"""
+        with span("frame", "frame", scene=self.scenes[index].name, t=round(local_t, 4)):
+            return self.compositor(index).render(local_t, out)
+
+    def frame_function(self, t):
+        index, local_t = self.locate(t)
+        key = self.hold_key(index, local_t)
+        if key is not None and key == self._held_key:
+            return self._held_frame
+        frame = self.compose(index, local_t)
+        if key is not None:
+            self._held_key = key
+            self._held_frame = frame
+        return frame
+
+    def write(self, writer, first=0, last=None):
+        """
+        Compone i frame [first, last) nei buffer di un FFmpegWriter.
+
+        Nei tratti statici il frame già inviato viene ripetuto senza
+        ricomporlo né copiarlo.
+        """
+        for _ in self.stream(writer, first, last):
+            pass
+
+    def stream(self, writer, first=0, last=None):
+        """
+        Come write(), un frame alla volta: dopo ogni frame restituisce
+        (k, buffer con il frame k). Serve ad alimentare più writer nello
+        stesso ciclo (vedi demo_video.outputs).
+        """
+        last = self.n_frames if last is None else last
+        timed = TRACER.enabled
+        TRACER.start_frames(last - first)
+        held = None
+        frame = None
+        t0 = time.perf_counter() if timed else 0.0
+        for k in range(first, last):
+            index, local_t = self.locate(k / self.fps)
+            key = self.hold_key(index, local_t)
+            if key is not None and key == held:
+                writer.repeat()
+            else:
+                frame = writer.next_buffer()
+                self.compose(index, local_t, out=frame)
+                writer.submit(frame)
+                held = key
+            if timed:
+                t1 = time.perf_counter()
+                TRACER.frame(t1 - t0)
+                t0 = t1
+            yield k, frame
@@ -0,0 +1,215 @@
+"""
+Tracciamento opzionale del render
+
+Con --trace FILE i generatori registrano:
+
+- la costruzione dei layer e delle scene (testo, immagini, sfondi)
+- ogni frame composto, con la fusione di ogni layer, gli effetti
+  (CrossFadeIn, CrossFadeOut, SlowZoom) e i ridimensionamenti dello zoom
+- le scritture verso ffmpeg e le attese sul buffer libero
+
+FILE è una trace JSON per chrome://tracing o ui.perfetto.dev. Accanto viene
+scritto un file .summary.json con p50/p99 dei tempi per frame, frame al
+secondo, ETA e picco di memoria; durante il render il riassunto viene
+aggiornato ogni pochi secondi, così si può seguire un render lungo.
+
+Senza --trace TRACER è spento e ogni span costa solo una chiamata.
+"""
+
+import glob
+import json
+import os
+import resource
+import threading
+import time
+
+import numpy as np
+
+# Ogni quanti secondi riscrivere il riassunto durante il render
+SUMMARY_INTERVAL = 2.0
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "t0")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.cat, self.t0, time.perf_counter(), self.args)
+        return False
+
+
+def _peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / 1024, 1), round(children / 1024, 1)
+
+
+class Tracer:
+    """Eventi in formato Chrome trace più i tempi di ogni frame"""
+
+    def __init__(self):
+        self.path = None
+        self.events = []
+        self.frame_times = []
+        self.frames_total = 0
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._started = None
+        self._frames_started = None
+        self._last_summary = 0.0
+        self._pid = None
+        self._parts = 0
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def enable(self, path):
+        self.path = path
+        self.events = []
+        self.frame_times = []
+        self._origin = time.perf_counter()
+        self._started = time.time()
+        self._pid = os.getpid()
+
+    def span(self, name, cat="render", **args):
+        if self.path is None:
+            return _NO_SPAN
+        return _Span(self, name, cat, args)
+
+    def complete(self, name, cat, t0, t1, args=None):
+        event = {"name": name, "cat": cat, "ph": "X", "pid": os.getpid(),
+                 "tid": threading.get_native_id(),
+                 "ts": round((t0 - self._origin) * 1e6, 1), "dur": round((t1 - t0) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def start_frames(self, total):
+        """Frame che il render deve ancora produrre (per frame/s ed ETA)"""
+        if self.path is not None:
+            self.frames_total += total
+            if self._frames_started is None:
+                self._frames_started = time.time()
+
+    def frame(self, seconds):
+        """Tempo di un frame consegnato all'encoder (composto o ripetuto)"""
+        if self.path is None:
+            return
+        self.frame_times.append(seconds)
+        now = time.perf_counter()
+        # Solo il processo principale aggiorna il riassunto
+        if now - self._last_summary >= SUMMARY_INTERVAL and os.getpid() == self._pid:
+            self._last_summary = now
+            self.write_summary()
+
+    def summary(self):
+        times = np.array(self.frame_times or [0.0])
+        done = len(self.frame_times)
+        now = time.time()
+        elapsed = now - self._started if self._started else 0.0
+        rendering = now - self._frames_started if self._frames_started else 0.0
+        fps = done / rendering if rendering > 0 else 0.0
+        remaining = max(self.frames_total - done, 0)
+        own, children = _peak_rss_mb()
+        return {
+            "frames": done,
+            "frames_total": self.frames_total,
+            "elapsed_s": round(elapsed, 3),
+            "frames_per_s": round(fps, 2),
+            "eta_s": round(remaining / fps, 1) if fps > 0 else None,
+            "frame_ms": {
+                "p50": round(float(np.percentile(times, 50)) * 1e3, 3),
+                "p99": round(float(np.percentile(times, 99)) * 1e3, 3),
+                "max": round(float(times.max()) * 1e3, 3),
+            },
+            "peak_rss_mb": own,
+            "peak_rss_children_mb": children,
+            "slowest": self.slowest(),
+        }
+
+    def slowest(self, limit=10):
+        """Span con il tempo totale più alto, raggruppati per nome"""
+        totals = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            entry = totals.setdefault((event["cat"], event["name"]), [0.0, 0])
+            entry[0] += event["dur"]
+            entry[1] += 1
+        ranked = sorted(totals.items(), key=lambda item: -item[1][0])[:limit]
+        return [{"cat": cat, "name": name, "total_ms": round(total / 1e3, 3), "count": count}
+                for (cat, name), (total, count) in ranked]
+
+    def summary_path(self):
+        root, _ = os.path.splitext(self.path)
+        return root + ".summary.json"
+
+    def write_summary(self):
+        tmp = self.summary_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp, self.summary_path())
+
+    def forget(self):
+        """In un processo appena creato con fork: scarta gli eventi del padre"""
+        with self._lock:
+            self.events = []
+        self.frame_times = []
+
+    def save_part(self):
+        """Nei processi worker: salva eventi e tempi per il processo principale"""
+        if self.path is None or os.getpid() == self._pid:
+            return
+        self._parts += 1
+        with open(f"{self.path}.part-{os.getpid()}-{self._parts}", "w") as f:
+            json.dump({"events": self.events, "frame_times": self.frame_times}, f)
+        self.events = []
+        self.frame_times = []
+
+    def save(self):
+        """Scrive la trace (con gli eventi dei worker) e il riassunto finale"""
+        if self.path is None:
+            return
+        for part in sorted(glob.glob(glob.escape(self.path) + ".part-*")):
+            with open(part) as f:
+                data = json.load(f)
+            self.events.extend(data["events"])
+            self.frame_times.extend(data["frame_times"])
+            os.remove(part)
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        self.write_summary()
+
+
+TRACER = Tracer()
+
+
+def span(name, cat="render", **args):
+    return TRACER.span(name, cat, **args)
+
+
+def add_trace_arguments(parser):
+    parser.add_argument("--trace", default=None, metavar="FILE",
+                        help="salva una trace Chrome/Perfetto e FILE.summary.json")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# I generatori (create_demo_video*.py) e demo_video stanno nella radice del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,70 @@
+import os
+import subprocess
+
+import numpy as np
+import pytest
+
+from demo_video import audio
+from demo_video.audio import AUDIO_RATE, decode_pcm, music_bed, music_track
+from demo_video.bench import make_music
+from demo_video.canvas import Canvas
+from demo_video.encoder import EncoderSettings, ffmpeg_binary
+from demo_video.render import render_video
+from demo_video.spec import compile_timeline
+
+SPEC = {"fps": 10, "size": [1920, 1080], "scenes": [
+    {"name": "slide", "duration": 1, "layers": [{"type": "solid", "color": [18, 18, 18]}]}]}
+
+
+def test_music_track_cache_key(tmp_path):
+    music = make_music(str(tmp_path / "music.wav"), 3)
+    cache = str(tmp_path / "cache")
+    track = music_track(music, 2.0, volume=0.3, fade_out=1, cache_root=cache)
+    mtime = os.stat(track).st_mtime_ns
+    # Stessi parametri: la traccia in cache, senza ricodificare
+    assert music_track(music, 2.0, volume=0.3, fade_out=1, cache_root=cache) == track
+    assert os.stat(track).st_mtime_ns == mtime
+    others = {music_track(music, 2.5, volume=0.3, fade_out=1, cache_root=cache),
+              music_track(music, 2.0, volume=0.5, fade_out=1, cache_root=cache),
+              music_track(music, 2.0, volume=0.3, fade_out=0, cache_root=cache)}
+    assert track not in others and len(others) == 3
+    # Un'altra musica nello stesso percorso cambia la chiave (hash del contenuto)
+    make_music(music, 4)
+    assert music_track(music, 2.0, volume=0.3, fade_out=1, cache_root=cache) != track
+
+
+def test_music_bed_volume_and_fade():
+    pcm = np.full((3 * AUDIO_RATE, 2), 10000, dtype="<i2")
+    bed = music_bed(pcm, 2.0, volume=0.5, fade_out=1.0)
+    assert bed.shape == (2 * AUDIO_RATE, 2) and bed.dtype == np.dtype("<i2")
+    assert np.all(bed[:AUDIO_RATE] == 5000)
+    # Nell'ultimo secondo la dissolvenza scende linearmente fino a zero
+    fade = bed[AUDIO_RATE:, 0].astype(int)
+    assert np.all(np.diff(fade) <= 0) and fade[-1] <= 1
+    assert abs(fade[AUDIO_RATE // 2] - 2500) <= 1
+
+
+def test_short_music_ends_in_silence():
+    bed = music_bed(np.full((AUDIO_RATE, 2), 1000, dtype="<i2"), 2.0)
+    assert np.all(bed[:AUDIO_RATE] == 1000) and np.all(bed[AUDIO_RATE:] == 0)
+
+
+def test_decoded_pcm_is_cached(tmp_path, monkeypatch):
+    music = make_music(str(tmp_path / "music.wav"), 1)
+    cache = str(tmp_path / "cache")
+    pcm = decode_pcm(music, cache)
+    assert pcm.shape == (AUDIO_RATE, 2)
+    # La seconda volta niente ffmpeg: il .npy in cache si apre in mmap
+    monkeypatch.setattr(audio.subprocess, "run", lambda *a, **k: pytest.fail("ffmpeg rilanciato"))
+    again = decode_pcm(music, cache)
+    assert isinstance(again, np.memmap) and np.array_equal(again, pcm)
+
+
+def test_track_is_muxed_without_reencoding(tmp_path):
+    music = make_music(str(tmp_path / "music.wav"), 2)
+    track = music_track(music, 1.0, cache_root=str(tmp_path / "cache"))
+    timeline = compile_timeline(SPEC, Canvas((1920, 1080), 10, 0.1))
+    output = str(tmp_path / "video.mp4")
+    render_video(timeline, output, EncoderSettings(preset="ultrafast"), audio=track)
+    probe = subprocess.run([ffmpeg_binary(), "-i", output], capture_output=True, text=True).stderr
+    assert "Audio: aac" in probe and "Video: h264" in probe
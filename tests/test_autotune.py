@@ -0,0 +1,45 @@
+from demo_video.autotune import X265_CRF_OFFSET, candidates, choose, classify_frames, sample_ranges
+from demo_video.canvas import Canvas
+from demo_video.spec import compile_timeline
+
+SPEC = {"fps": 10, "size": [1920, 1080], "scenes": [
+    {"name": "slide", "duration": 3,
+     "effects": [{"type": "CrossFadeIn", "duration": 0.5}],
+     "layers": [{"type": "solid", "color": [18, 18, 18]},
+                {"type": "text", "text": "G-Press", "size": 80, "color": [76, 175, 80],
+                 "position": ["center", "center"], "start": 1,
+                 "effects": [{"type": "SlowZoom", "amount": 0.1}]}]}]}
+
+
+def _result(codec, preset, crf, seconds, mb):
+    return {"settings": {"codec": codec, "preset": preset, "crf": crf, "tune": None, "threads": 4},
+            "seconds": seconds, "mb": mb}
+
+
+RESULTS = [_result("libx264", "ultrafast", 23, 10, 40), _result("libx264", "slow", 23, 60, 20),
+           _result("libx265", "medium", 23 + X265_CRF_OFFSET, 90, 12), _result("libx264", "medium", 18, 40, 50),
+           {"settings": {"codec": "libx264", "preset": "slow", "crf": 18, "tune": "grain", "threads": 4},
+            "error": "tune non valido"}]
+
+
+def test_choose_within_budget():
+    # Senza budget: la qualità migliore (CRF più basso), poi la più veloce
+    assert choose(RESULTS)["settings"]["crf"] == 18
+    # Con un limite di tempo, a pari qualità il file più piccolo
+    assert choose(RESULTS, max_seconds=80, max_mb=45)["settings"]["preset"] == "slow"
+    assert choose(RESULTS, max_seconds=100, max_mb=15)["settings"]["codec"] == "libx265"
+    assert choose(RESULTS, max_seconds=5) is None
+
+
+def test_candidates_scale_x265_crf():
+    grid = list(candidates(["libx264", "libx265"], ["medium"], [23], None, [4]))
+    assert [(s.codec, s.crf, s.tune) for s in grid] == \
+        [("libx264", 23, None), ("libx264", 23, "stillimage"), ("libx265", 23 + X265_CRF_OFFSET, None)]
+
+
+def test_sample_covers_each_kind_of_frame():
+    timeline = compile_timeline(SPEC, Canvas((1920, 1080), 10, 0.1), lazy=True)
+    kinds = classify_frames(timeline)
+    # Dissolvenza di scena, poi fermo fino all'ingresso del testo che si ingrandisce
+    assert kinds == ["fade"] * 5 + ["hold"] * 5 + ["motion"] * 20
+    assert sample_ranges(kinds, 8) == {"fade": (0, 5), "hold": (5, 10), "motion": (10, 18)}
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from demo_video.backgrounds import gradient_plate, solid_plate
+
+
+def _lines(size, color1, color2):
+    """Sfumatura disegnata riga per riga con ImageDraw, come faceva il generatore v1"""
+    img = Image.new('RGB', size, color1)
+    draw = ImageDraw.Draw(img)
+    for y in range(size[1]):
+        r = int(color1[0] + (color2[0] - color1[0]) * y / size[1])
+        g = int(color1[1] + (color2[1] - color1[1]) * y / size[1])
+        b = int(color1[2] + (color2[2] - color1[2]) * y / size[1])
+        draw.line([(0, y), (size[0], y)], fill=(r, g, b))
+    return np.array(img)
+
+
+@pytest.mark.parametrize("color1, color2", [((26, 26, 46), (76, 175, 80)), ((255, 0, 128), (0, 255, 3))])
+def test_gradient_matches_line_drawing(color1, color2):
+    assert np.array_equal(gradient_plate((320, 181), color1, color2).array, _lines((320, 181), color1, color2))
+
+
+def test_plates_are_shared_and_read_only():
+    plate = gradient_plate((64, 36), (26, 26, 46), (76, 175, 80))
+    assert gradient_plate((64, 36), (26, 26, 46), (76, 175, 80)) is plate
+    assert plate.array is plate.array
+    with pytest.raises(ValueError):
+        plate.array[0, 0] = 0
+
+
+def test_solid_plate_is_lazy():
+    plate = solid_plate((64, 36), (18, 19, 20))
+    assert plate.color == (18, 19, 20) and plate.shape == (36, 64, 3)
+    # Il compositore usa il colore: l'array si costruisce solo se richiesto
+    assert plate._array is None
+    assert np.array_equal(plate.array, np.full((36, 64, 3), (18, 19, 20), dtype=np.uint8))
@@ -0,0 +1,46 @@
+from demo_video import batch
+from demo_video.batch import apply_variant, render_batch
+from demo_video.canvas import Canvas
+from demo_video.encoder import EncoderSettings
+
+
+def test_render_batch_without_variants(capsys, tmp_path):
+    # Nessuna variante: esce prima di compilare la timeline e creare directory
+    assert render_batch(None, [], str(tmp_path / "video.mp4"), None, None) == []
+    assert "Nessuna variante" in capsys.readouterr().out
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_apply_variant_keeps_counter_fields():
+    spec = {"scenes": [{"name": "intro", "layers": [
+        {"type": "text", "text": "Ciao {name}"},
+        {"type": "counter", "text": "{count} giornalisti"}]}]}
+    layers = apply_variant(spec, {"id": "a", "name": "Rossi"})["scenes"][0]["layers"]
+    assert layers[0]["text"] == "Ciao Rossi"
+    assert layers[1]["text"] == "{count} giornalisti"
+
+
+def test_render_batch_encodes_music_per_duration(tmp_path, monkeypatch):
+    # Una variante che allunga la scena non deve restare muta
+    spec = {"scenes": [{"name": "intro", "duration": 1,
+                        "layers": [{"type": "solid", "color": [0, 0, 0]}]}]}
+
+    def longer(spec, variant, locales=None, intro=None):
+        spec = apply_variant(spec, variant, locales, intro)
+        spec["scenes"][0]["duration"] = variant.get("seconds", 1)
+        return spec
+    monkeypatch.setattr(batch, "apply_variant", longer)
+    rendered = {}
+    monkeypatch.setattr(batch, "render_video",
+                        lambda timeline, output, settings, audio=None: rendered.update({timeline.duration: audio}))
+    encoded = []
+
+    def music(duration):
+        encoded.append(duration)
+        return f"music_{duration:g}.m4a"
+    variants = [{"id": "a"}, {"id": "b", "seconds": 2}, {"id": "c"}]
+    failed = render_batch(spec, variants, str(tmp_path / "video.mp4"), Canvas((64, 36), 5),
+                          EncoderSettings(), music=music)
+    assert failed == []
+    assert encoded == [1, 2]
+    assert rendered == {1: "music_1.m4a", 2: "music_2.m4a"}
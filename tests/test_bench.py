@@ -0,0 +1,26 @@
+import types
+
+import pytest
+
+import create_demo_video_v2
+from demo_video.bench import patched, run_case
+from demo_video.encoder import EncoderSettings
+
+
+def test_patched_restores_globals_after_errors():
+    module = types.SimpleNamespace(SLIDES=[1, 2])
+    with pytest.raises(RuntimeError):
+        with patched(module, SLIDES=[3], MUSIC_FILE="x.wav"):
+            assert module.SLIDES == [3] and module.MUSIC_FILE == "x.wav"
+            raise RuntimeError
+    assert module.SLIDES == [1, 2]
+    assert not hasattr(module, "MUSIC_FILE")
+
+
+def test_run_case_leaves_generator_untouched(tmp_path):
+    slides, music_file = create_demo_video_v2.SLIDES, create_demo_video_v2.MUSIC_FILE
+    result = run_case("v2", 1, 0.25, 10, str(tmp_path), EncoderSettings(preset="ultrafast"))
+    assert create_demo_video_v2.SLIDES is slides
+    assert create_demo_video_v2.MUSIC_FILE == music_file
+    assert result["params"]["frames"] > 0
+    assert set(result["stages"]) == {"assets", "text", "compose", "transitions", "audio", "encode"}
@@ -0,0 +1,147 @@
+import copy
+import glob
+import json
+import os
+from dataclasses import replace
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from demo_video import text
+from demo_video.cache import AssetStore, SegmentCache, scene_fingerprint, segment_key
+from demo_video.canvas import Canvas
+from demo_video.encoder import EncoderSettings
+from demo_video.memory import ASSETS
+from demo_video.segments import plan_segments, render_segments
+from demo_video.spec import LAYER_TYPES, build_layer, compile_timeline, use_asset_store
+
+CANVAS = Canvas((1920, 1080), 10, 0.1)
+
+
+def _scene(name, duration, text):
+    return {"name": name, "duration": duration,
+            "effects": [{"type": "CrossFadeIn", "duration": 0.5}, {"type": "CrossFadeOut", "duration": 0.5}],
+            "layers": [{"type": "solid", "color": [18, 18, 18]},
+                       {"type": "text", "text": text, "size": 80, "color": [76, 175, 80],
+                        "position": ["center", "center"]}]}
+
+
+SPEC = {"fps": 10, "size": [1920, 1080],
+        "scenes": [_scene("intro", 3, "G-Press"), _scene("slide", 5, "Trova Email"), _scene("outro", 3, "Fine")]}
+
+
+def _keys(spec, settings=EncoderSettings()):
+    timeline = compile_timeline(spec, CANVAS, lazy=True)
+    segments = plan_segments(timeline)
+    fingerprints = [scene_fingerprint(scene) for scene in timeline.scenes]
+    return segments, [segment_key(timeline, segment, settings, fingerprints) for segment in segments]
+
+
+def test_changing_a_layer_changes_only_its_segments():
+    segments, before = _keys(SPEC)
+    changed = copy.deepcopy(SPEC)
+    changed["scenes"][1]["layers"][1]["text"] = "Trova Giornalisti"
+    _, after = _keys(changed)
+    names = [s.name.split(" ", 1)[1] for s, a, b in zip(segments, before, after) if a != b]
+    # La scena cambiata e le dissolvenze che la toccano; intro e outro restano in cache
+    assert names == ["0>1", "slide", "1>2"]
+
+
+def test_segment_keys_and_encoder_settings():
+    _, keys = _keys(SPEC)
+    assert keys == _keys(SPEC)[1]
+    assert len(set(keys)) == len(keys)
+    # Thread e disposizione dell'mp4 non cambiano i frame codificati
+    assert _keys(SPEC, EncoderSettings(threads=8, mp4="fragmented"))[1] == keys
+    crf = _keys(SPEC, replace(EncoderSettings(), crf=18))[1]
+    assert not set(crf) & set(keys)
+
+
+def test_rerender_reuses_cached_segments(tmp_path, capsys):
+    cache = SegmentCache(str(tmp_path / "cache"))
+    settings = EncoderSettings(preset="ultrafast")
+    render_segments(compile_timeline(SPEC, CANVAS), str(tmp_path / "a.mp4"), cache=cache, settings=settings)
+    assert "0/5 segmenti dalla cache" in capsys.readouterr().out
+    changed = copy.deepcopy(SPEC)
+    changed["scenes"][1]["layers"][1]["text"] = "Trova Giornalisti"
+    render_segments(compile_timeline(changed, CANVAS), str(tmp_path / "b.mp4"), cache=cache, settings=settings)
+    # Solo intro e outro non dipendono dal testo cambiato
+    assert "2/5 segmenti dalla cache" in capsys.readouterr().out
+
+
+def _spec(data):
+    return {"fps": 10, "size": [1920, 1080], "scenes": [
+        {"name": "dati", "duration": 2,
+         "layers": [{"type": "solid", "color": [18, 18, 18]},
+                    {"type": "text", "text": "G-Press", "size": 80, "color": [255, 255, 255]},
+                    {"type": "counter", "path": str(data), "text": "{count} giornalisti", "size": 40,
+                     "color": [76, 175, 80], "position": ["center", 700]}]}]}
+
+
+def _fingerprint(spec):
+    return compile_timeline(spec, CANVAS, lazy=True).scenes[0].fingerprint()
+
+
+def test_lazy_fingerprint_follows_font(tmp_path, monkeypatch):
+    data = tmp_path / "journalists.json"
+    data.write_text(json.dumps([{"country": "IT"}]))
+    before = _fingerprint(_spec(data))
+    assert _fingerprint(_spec(data)) == before
+    # Un altro font installato (o il fallback di PIL) cambia i pixel del testo
+    monkeypatch.setattr(text, "font_path", lambda bold=True: None)
+    assert _fingerprint(_spec(data)) != before
+
+
+def test_lazy_fingerprint_follows_data(tmp_path):
+    data = tmp_path / "journalists.json"
+    data.write_text(json.dumps([{"country": "IT"}]))
+    before = _fingerprint(_spec(data))
+    data.write_text(json.dumps([{"country": "IT"}, {"country": "US"}]))
+    assert _fingerprint(_spec(data)) != before
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AssetStore(str(tmp_path / "cache"))
+    use_asset_store(store)
+    yield store
+    use_asset_store(None)
+
+
+def _stored(store):
+    return glob.glob(os.path.join(store.root, "*", "*.npy"))
+
+
+def test_asset_store_round_trip(store):
+    array = np.arange(24, dtype=np.uint8).reshape(2, 4, 3)
+    key = store.key("screenshot")
+    assert store.get(key) is None
+    mapped = store.store(key, array)
+    assert isinstance(mapped, np.memmap) and np.array_equal(mapped, array)
+    assert np.array_equal(store.get(key), array)
+    # Un file rovinato non è un errore: l'asset si ricostruisce
+    with open(store.path(key), "wb") as f:
+        f.write(b"rotto")
+    assert store.get(key) is None
+
+
+def test_screenshots_are_reused_from_disk(store, tmp_path, monkeypatch):
+    path = tmp_path / "screen.png"
+    Image.new("RGB", (400, 800), (76, 175, 80)).save(path)
+    layer = {"type": "image", "path": str(path), "height": 600, "position": ["center", 100],
+             "frame": {"padding": 8, "color": [255, 255, 255]}}
+    built = build_layer(layer, CANVAS)
+    assert len(_stored(store)) == 1
+    # Nuovo processo (cache in memoria vuota): l'immagine si riapre in mmap senza ridimensionarla
+    ASSETS.clear()
+    monkeypatch.setitem(LAYER_TYPES, "image", lambda *a: pytest.fail("immagine ricostruita"))
+    again = build_layer(dict(layer, position=[0, 0], start=1), CANVAS)
+    assert isinstance(again, np.memmap) and np.array_equal(again, built)
+    monkeypatch.undo()
+    # Lo screenshot cambiato ha un'altra chiave
+    ASSETS.clear()
+    Image.new("RGB", (400, 700), (26, 26, 46)).save(path)
+    os.utime(path, ns=(1, 1))
+    build_layer(layer, CANVAS)
+    assert len(_stored(store)) == 2
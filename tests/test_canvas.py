@@ -0,0 +1,38 @@
+import argparse
+
+import pytest
+
+from demo_video.canvas import Canvas, canvas_from_args
+
+
+@pytest.mark.parametrize("scale", [1.0, 0.5, 0.333, 0.25, 0.1, 0.0007])
+def test_size_is_even(scale):
+    w, h = Canvas((1920, 1080), 30, scale).size
+    assert w % 2 == 0 and h % 2 == 0
+    assert w <= max(round(1920 * scale), 2) and h <= max(round(1080 * scale), 2)
+
+
+def test_odd_draft_rounds_down():
+    assert Canvas((1920, 1080), 15, 0.333).size == (638, 360)
+    assert Canvas((1080, 1920), 15, 0.333).size == (360, 638)
+
+
+def test_full_size_unchanged():
+    assert Canvas().size == (1920, 1080)
+    assert Canvas((1921, 1081)).size == (1920, 1080)
+
+
+def _draft_args(value):
+    return argparse.Namespace(draft=value, draft_fps=15)
+
+
+@pytest.mark.parametrize("value", [0, -0.5, 1.5])
+def test_draft_scale_out_of_range(value):
+    with pytest.raises(SystemExit, match="deve essere in"):
+        canvas_from_args(_draft_args(value), (1920, 1080), 30)
+
+
+def test_draft_scale_in_range():
+    assert canvas_from_args(_draft_args(1.0), (1920, 1080), 30).size == (1920, 1080)
+    assert canvas_from_args(_draft_args(0.5), (1920, 1080), 30) == Canvas((1920, 1080), 15, 0.5)
+    assert canvas_from_args(_draft_args(None), (1920, 1080), 30) == Canvas((1920, 1080), 30)
@@ -0,0 +1,61 @@
+import imageio_ffmpeg
+import pytest
+
+from demo_video import cli, spec
+from demo_video.canvas import DRAFT_PRESET
+from demo_video.cli import run
+
+SPEC = {"fps": 10, "size": [1920, 1080], "scenes": [
+    {"name": "intro", "duration": 1,
+     "layers": [{"type": "solid", "color": [18, 18, 18]},
+                {"type": "text", "text": "G-Press", "size": 100, "color": [76, 175, 80],
+                 "position": ["center", "center"]}]}]}
+
+
+def _spec():
+    return SPEC
+
+
+def test_check_only(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit:
+        run("prova", _spec, str(tmp_path / "video.mp4"), (1920, 1080), 10, argv=["--check", "--no-cache"])
+    assert exit.value.code == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_draft_render(tmp_path):
+    music = []
+    run("prova", _spec, str(tmp_path / "video.mp4"), (1920, 1080), 10,
+        music=lambda duration, cache_dir: music.append(duration),
+        argv=["--no-cache", "--draft", "0.1", "--draft-fps", "10", "--no-encoder-profile"])
+    frames, _ = imageio_ffmpeg.count_frames_and_secs(str(tmp_path / "video_draft.mp4"))
+    assert frames == 10
+    assert music == [1.0]
+
+
+def test_vertical_needs_a_layout(tmp_path):
+    with pytest.raises(SystemExit, match="verticale"):
+        run("prova", _spec, str(tmp_path / "video.mp4"), (1920, 1080), 10,
+            argv=["--no-cache", "--draft", "0.1", "--outputs", "vertical", "--no-encoder-profile"])
+
+
+@pytest.mark.parametrize("extra, preset", [([], DRAFT_PRESET), (["--preset", "slow"], "slow")])
+def test_draft_preset_yields_to_explicit_preset(tmp_path, monkeypatch, extra, preset):
+    used = []
+    monkeypatch.setattr(cli, "render_video", lambda timeline, output, settings, audio=None: used.append(settings))
+    run("prova", _spec, str(tmp_path / "video.mp4"), (1920, 1080), 10,
+        argv=["--no-cache", "--draft", "0.1", "--no-encoder-profile"] + extra)
+    assert used[0].preset == preset
+
+
+def test_farm_path_does_not_compile_scenes(tmp_path, monkeypatch):
+    # I worker compongono le scene: il coordinatore non deve costruire i pixel
+    monkeypatch.setattr(spec, "compile_scene", lambda *a, **k: pytest.fail("scena compilata"))
+    calls = []
+    monkeypatch.setattr(cli, "render_farm", lambda spec, canvas, output, workers, settings, **kw: calls.append(kw))
+    music = []
+    run("prova", _spec, str(tmp_path / "video.mp4"), (1920, 1080), 10,
+        music=lambda duration, cache_dir: music.append(duration) or "music.m4a",
+        argv=["--no-cache", "--farm", "2", "--no-encoder-profile"])
+    assert music == [1.0]
+    assert calls[0]["audio"] == "music.m4a"
@@ -0,0 +1,99 @@
+import argparse
+import json
+
+import imageio_ffmpeg
+import numpy as np
+import pytest
+
+from demo_video import encoder
+from demo_video.encoder import (DEFAULT_THREADS, EncoderSettings, FFmpegWriter, add_encoder_arguments,
+                                load_profile, machine_id)
+
+SIZE = (64, 48)
+COLORS = [(200, 40, 40), (40, 200, 40), (40, 40, 200)]
+
+
+def _read(path):
+    reader = imageio_ffmpeg.read_frames(str(path))
+    meta = next(reader)
+    w, h = meta["size"]
+    return [np.frombuffer(frame, np.uint8).reshape(h, w, 3) for frame in reader]
+
+
+def test_submit_and_repeat(tmp_path):
+    output = tmp_path / "video.mp4"
+    with FFmpegWriter(str(output), SIZE, 10, EncoderSettings(preset="ultrafast", crf=0, pix_fmt="yuv444p"),
+                      ring=2) as writer:
+        for color in COLORS:
+            buf = writer.next_buffer()
+            buf[...] = color
+            writer.submit(buf)
+            # Il frame appena inviato resta valido per repeat(): l'anello non lo riusa
+            assert writer.next_buffer() is not buf
+            writer.repeat()
+    frames = _read(output)
+    assert len(frames) == 2 * len(COLORS)
+    for n, frame in enumerate(frames):
+        assert np.abs(frame.astype(int) - COLORS[n // 2]).max() <= 2, n
+
+
+def test_submit_needs_a_ring_buffer(tmp_path):
+    with FFmpegWriter(str(tmp_path / "video.mp4"), SIZE, 10, EncoderSettings(preset="ultrafast")) as writer:
+        with pytest.raises(ValueError):
+            writer.submit(np.zeros((SIZE[1], SIZE[0], 3), np.uint8))
+        buf = writer.next_buffer()
+        buf[...] = 0
+        writer.submit(buf)
+
+
+def test_ffmpeg_errors_are_raised(tmp_path):
+    writer = FFmpegWriter(str(tmp_path / "manca" / "video.mp4"), SIZE, 10, EncoderSettings(preset="ultrafast"))
+    buf = writer.next_buffer()
+    buf[...] = 0
+    writer.submit(buf)
+    with pytest.raises(IOError, match="ffmpeg"):
+        writer.close()
+
+
+def _args(argv, profile=None, tmp_path=None):
+    parser = argparse.ArgumentParser()
+    add_encoder_arguments(parser)
+    if profile is not None:
+        path = tmp_path / "profile.json"
+        path.write_text(json.dumps({"machine": {"host": "altra"}, "settings": profile}))
+        argv = argv + ["--encoder-profile", str(path)]
+    return parser.parse_args(argv)
+
+
+PROFILE = {"codec": "libx264", "preset": "veryfast", "crf": 20, "tune": "stillimage", "threads": 6}
+
+
+def test_from_args_defaults(monkeypatch, tmp_path):
+    # Nessun profilo per questa macchina: default della dataclass e DEFAULT_THREADS
+    monkeypatch.setattr(encoder, "default_cache_dir", lambda: str(tmp_path))
+    settings = EncoderSettings.from_args(_args([]))
+    assert settings == EncoderSettings(threads=DEFAULT_THREADS)
+
+
+def test_from_args_precedence(tmp_path):
+    # Un profilo passato esplicitamente vale anche se misurato su un'altra macchina
+    assert EncoderSettings.from_args(_args([], PROFILE, tmp_path)) == EncoderSettings(**PROFILE)
+    # Le opzioni esplicite vincono sul profilo, gli override su tutto
+    settings = EncoderSettings.from_args(_args(["--crf", "28", "--threads", "2"], PROFILE, tmp_path),
+                                         preset="ultrafast")
+    assert (settings.preset, settings.crf, settings.tune, settings.threads) == ("ultrafast", 28, "stillimage", 2)
+    assert EncoderSettings.from_args(_args(["--no-encoder-profile"], PROFILE, tmp_path)).preset == "medium"
+
+
+def test_profile_for_another_codec_is_ignored(tmp_path):
+    settings = EncoderSettings.from_args(_args(["--codec", "libx265"], PROFILE, tmp_path))
+    assert (settings.codec, settings.preset, settings.tune, settings.threads) == \
+        ("libx265", "medium", None, DEFAULT_THREADS)
+
+
+def test_default_profile_belongs_to_its_machine(monkeypatch, tmp_path):
+    monkeypatch.setattr(encoder, "default_cache_dir", lambda: str(tmp_path))
+    (tmp_path / "encoder-profile.json").write_text(json.dumps({"machine": machine_id(), "settings": PROFILE}))
+    assert load_profile() == PROFILE
+    (tmp_path / "encoder-profile.json").write_text(json.dumps({"machine": {"host": "altra"}, "settings": PROFILE}))
+    assert load_profile() == {}
@@ -0,0 +1,153 @@
+import threading
+
+import imageio_ffmpeg
+import pytest
+
+from demo_video import farm
+from demo_video.canvas import Canvas
+from demo_video.encoder import EncoderSettings
+from demo_video.segments import concat_segments
+from demo_video.spec import compile_timeline
+
+SPEC = {"fps": 10, "size": [1920, 1080], "scenes": [
+    {"name": "uno", "duration": 2,
+     "effects": [{"type": "CrossFadeOut", "duration": 0.5}],
+     "layers": [{"type": "solid", "color": [18, 18, 18]},
+                {"type": "text", "text": "G-Press", "size": 100, "color": [76, 175, 80],
+                 "position": ["center", "center"], "effects": [{"type": "CrossFadeIn", "duration": 0.5}]}]},
+    {"name": "due", "duration": 2,
+     "layers": [{"type": "solid", "color": [76, 175, 80]}]}]}
+
+CANVAS = Canvas((1920, 1080), 10, 0.1)
+SETTINGS = EncoderSettings(preset="ultrafast", gop=5, threads=1)
+
+
+class _Killed(BaseException):
+    """Il worker muore a metà lease: niente consegna e niente /fail"""
+
+
+def _coordinator(tmp_path, lease):
+    timeline = compile_timeline(SPEC, CANVAS, lazy=True)
+    chunks = farm.plan_chunks(timeline, SETTINGS.gop, 10)
+    workdir = tmp_path / "chunks"
+    workdir.mkdir()
+    coordinator = farm.Coordinator(SPEC, CANVAS, SETTINGS, chunks, str(workdir), "segreto",
+                                   lease=lease, verbose=False)
+    server = coordinator.serve(("127.0.0.1", 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return timeline, coordinator, server, "http://127.0.0.1:%d" % server.server_address[1]
+
+
+def _run(coordinator, server, workers, tmp_path):
+    """Avvia i worker (nome del thread -> funzione) e unisce i chunk consegnati"""
+    threads = [threading.Thread(target=target, name=name, daemon=True) for name, target in workers.items()]
+    for thread in threads:
+        thread.start()
+    try:
+        assert coordinator.finished.wait(60), "il render non è finito"
+        for thread in threads:
+            thread.join(10)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert coordinator.error is None
+    output = str(tmp_path / "out.mp4")
+    concat_segments(coordinator.paths(), output)
+    return imageio_ffmpeg.count_frames_and_secs(output)[0]
+
+
+def test_killed_worker_chunk_is_reassigned(tmp_path, monkeypatch):
+    timeline, coordinator, server, url = _coordinator(tmp_path, lease=1)
+    killed = []
+
+    class Writer(farm.FFmpegWriter):
+        def submit(self, buf):
+            if threading.current_thread().name == "vittima" and not killed:
+                killed.append(True)
+                raise _Killed()
+            super().submit(buf)
+
+    monkeypatch.setattr(farm, "FFmpegWriter", Writer)
+
+    def victim():
+        try:
+            farm.run_worker(url, "segreto", str(tmp_path))
+        except _Killed:
+            pass
+
+    frames = _run(coordinator, server, {"vittima": victim,
+                                        "superstite": lambda: farm.run_worker(url, "segreto", str(tmp_path))},
+                  tmp_path)
+    assert killed
+    assert frames == timeline.n_frames
+
+
+def test_rejected_upload_goes_back_to_queue(tmp_path, monkeypatch):
+    # Lease lungo: senza /fail il chunk rifiutato aspetterebbe la scadenza
+    timeline, coordinator, server, url = _coordinator(tmp_path, lease=600)
+    request = farm._request
+    rejected = []
+
+    def flaky(target, token, method="GET", data=None):
+        if method == "PUT" and not rejected:
+            rejected.append(target)
+            return 500, None
+        return request(target, token, method, data)
+
+    monkeypatch.setattr(farm, "_request", flaky)
+    frames = _run(coordinator, server, {"worker": lambda: farm.run_worker(url, "segreto", str(tmp_path))},
+                  tmp_path)
+    assert rejected
+    assert frames == timeline.n_frames
+    assert max(coordinator._tries) == 2
+
+
+def test_wrong_token(tmp_path):
+    _, _, server, url = _coordinator(tmp_path, lease=1)
+    try:
+        with pytest.raises(RuntimeError, match="403"):
+            farm.run_worker(url, "sbagliato", str(tmp_path))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_upload_needs_an_issued_lease(tmp_path):
+    _, coordinator, server, url = _coordinator(tmp_path, lease=60)
+    try:
+        job = coordinator.job()
+        forged = tmp_path / "forged.mp4"
+        forged.write_bytes(b"x")
+        assert not coordinator.accept(job["chunk"], "inventato", str(forged))
+        assert not forged.exists()
+        status, _ = farm._request(f"{url}/chunks/999?lease={job['lease']}", "segreto", "PUT", b"x")
+        assert status == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("workers, listen, ok", [
+    (0, ("127.0.0.1", 0), False), (0, ("localhost", 8765), False), (-1, ("0.0.0.0", 8765), False),
+    (0, ("0.0.0.0", 8765), True), (2, ("127.0.0.1", 0), True)])
+def test_farm_problem(workers, listen, ok):
+    assert (farm.farm_problem(workers, listen) is None) == ok
+
+
+def test_local_workers_follow_no_cache(tmp_path, monkeypatch):
+    commands = []
+
+    class Popen:
+        def __init__(self, command, env=None):
+            commands.append(command)
+
+        def poll(self):
+            return 0
+
+        def wait(self, timeout=None):
+            return 0
+
+    monkeypatch.setattr(farm.subprocess, "Popen", Popen)
+    with pytest.raises(RuntimeError, match="worker locali sono terminati"):
+        farm.render_farm(SPEC, CANVAS, str(tmp_path / "out.mp4"), 1, SETTINGS, use_cache=False, verbose=False)
+    assert commands and all("--no-cache" in command for command in commands)
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import create_demo_video
+import create_demo_video_v2
+from demo_video.figures import Counter, format_number, journalist_metrics, load_metrics, metric
+
+
+def test_journalist_metrics():
+    people = [{"country": "IT", "outlet": "A", "category": "x"},
+              {"country": "IT", "outlet": "A"},
+              {"country": "US", "outlet": "B", "category": "x"}]
+    metrics = journalist_metrics(people)
+    assert metrics["count"] == 3
+    assert metrics["outlets"] == 2
+    assert metrics["by_country"] == {"IT": 2, "US": 1}
+    assert metrics["by_category"] == {"x": 2, "?": 1}
+
+
+def test_metric_missing():
+    with pytest.raises(KeyError, match="non trovato"):
+        metric({"count": 1}, "by_country.IT")
+
+
+def test_format_number():
+    assert format_number(9001) == "9.001"
+    assert format_number(21840.4) == "21.840"
+
+
+def test_v2_italian_subtitle_counts_only_italians():
+    """'Giornalisti Italiani' deve mostrare i soli giornalisti con country IT"""
+    with open(create_demo_video_v2.JOURNALISTS_FILE, encoding="utf-8") as f:
+        people = json.load(f)
+    italians = sum(p.get("country") == "IT" for p in people)
+    template = create_demo_video_v2.SLIDES[0]["subtitle"]
+    assert "Italiani" in template
+    counter = Counter(template, load_metrics(create_demo_video_v2.JOURNALISTS_FILE), 36, (255, 255, 255))
+    assert counter.values == [italians]
+
+
+def test_v1_description_counts_all_journalists():
+    with open(create_demo_video.JOURNALISTS_FILE, encoding="utf-8") as f:
+        people = json.load(f)
+    template = create_demo_video.SLIDES[0]["description"]
+    assert "Italian" not in template and "italian" not in template
+    counter = Counter(template, load_metrics(create_demo_video.JOURNALISTS_FILE), 28, (255, 255, 255))
+    assert counter.values == [len(people)]
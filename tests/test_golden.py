@@ -0,0 +1,10 @@
+import pytest
+
+from demo_video.golden import GOLDEN_DIR, SETS, check_set
+
+
+@pytest.mark.parametrize("name", sorted(SETS))
+def test_frames_match_golden(name, tmp_path):
+    messages = []
+    problems = check_set(name, GOLDEN_DIR, diff_dir=str(tmp_path), out=messages.append)
+    assert problems == 0, "\n".join(messages)
@@ -0,0 +1,25 @@
+import numpy as np
+
+from demo_video.intervals import IntervalIndex
+
+
+def test_matches_linear_scan():
+    rng = np.random.default_rng(0)
+    intervals = []
+    for n in range(40):
+        start = round(float(rng.uniform(0, 10)), 1)
+        intervals.append((start, start + round(float(rng.uniform(0, 4)), 1), n))
+    index = IntervalIndex(intervals)
+    for t in np.arange(-1, 15, 0.05):
+        expected = tuple(n for start, end, n in intervals if start <= t < end)
+        assert index.at(t) == expected, t
+
+
+def test_bounds_are_half_open_and_ordered():
+    index = IntervalIndex([(1, 3, "sfondo"), (0, 2, "titolo"), (2, 2, "vuoto"), (2, 4, "testo")])
+    assert index.at(0) == ("titolo",)
+    # Gli elementi attivi restano nell'ordine in cui sono stati dati (sovrapposizione dei layer)
+    assert index.at(1.5) == ("sfondo", "titolo")
+    assert index.at(2) == ("sfondo", "testo")
+    assert index.at(3) == ("testo",)
+    assert index.at(4) == () and index.at(-1) == ()
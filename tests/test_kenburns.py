@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from demo_video.bench import make_screenshot
+from demo_video.kenburns import ZoomEngine
+
+
+@pytest.fixture(scope="module")
+def screenshot(tmp_path_factory):
+    path = make_screenshot(str(tmp_path_factory.mktemp("kenburns") / "screen.jpg"), 0)
+    return Image.open(path).convert("RGB").resize((390, 844), Image.Resampling.LANCZOS)
+
+
+@pytest.mark.parametrize("scale", [1.25, 1.1, 0.5, 0.3])
+def test_zoom_close_to_lanczos(screenshot, scale):
+    engine = ZoomEngine(np.asarray(screenshot))
+    size = (int(screenshot.width * scale), int(screenshot.height * scale))
+    expected = np.asarray(screenshot.resize(size, Image.Resampling.LANCZOS)).astype(int)
+    frame = engine.render(size, (0.0, 0.0, 1.0, 1.0), (0, 0) + size).astype(int)
+    # Bilineare (su mipmap per le riduzioni) invece di LANCZOS: scarti piccoli solo sui bordi netti
+    assert np.abs(frame - expected).mean() < 1.5
+
+
+def test_window_matches_full_frame(screenshot):
+    engine = ZoomEngine(np.asarray(screenshot))
+    size = (468, 1012)
+    full = engine.render(size, (0.0, 0.0, 1.0, 1.0), (0, 0) + size).astype(int)
+    window = engine.render(size, (0.0, 0.0, 1.0, 1.0), (40, 100, 300, 700))
+    assert window.shape == (600, 260, 3)
+    assert np.abs(window - full[100:700, 40:300]).max() <= 1
+
+
+def test_pan_box_and_frame_cache(screenshot):
+    engine = ZoomEngine(np.asarray(screenshot))
+    # Metà superiore della sorgente alla sua dimensione: un ritaglio
+    frame = engine.render((390, 422), (0.0, 0.0, 1.0, 0.5), (0, 0, 390, 422))
+    assert np.abs(frame.astype(int) - np.asarray(screenshot)[:422]).mean() < 1
+    assert engine.render((390, 422), (0.0, 0.0, 1.0, 0.5), (0, 0, 390, 422)) is frame
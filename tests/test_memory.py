@@ -0,0 +1,74 @@
+import numpy as np
+
+from demo_video.canvas import Canvas
+from demo_video.memory import AssetCache
+from demo_video.spec import compile_timeline
+
+MB = 2**20
+
+
+def _array(mb):
+    return np.zeros(int(mb * MB), dtype=np.uint8)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = AssetCache(3)
+    for key in "abc":
+        cache.put(key, _array(1))
+    assert cache.get("a") is not None
+    cache.put("d", _array(1))
+    # "b" è il meno usato di recente: "a" è stato appena letto
+    assert cache.get("b") is None
+    assert set(cache.items) == {"a", "c", "d"} and cache.nbytes == 3 * MB
+
+
+def test_oversized_items_and_resize():
+    cache = AssetCache(2)
+    big = _array(3)
+    assert cache.put("grande", big) is big
+    assert cache.get("grande") is None and cache.nbytes == 0
+    cache.put("a", _array(1))
+    cache.put("b", _array(1))
+    cache.resize(1)
+    assert list(cache.items) == ["b"] and cache.nbytes == MB
+
+
+def _scene(name, color):
+    return {"name": name, "duration": 1,
+            "layers": [{"type": "solid", "color": color},
+                       {"type": "text", "text": name, "size": 80, "color": [255, 255, 255],
+                        "position": ["center", "center"]}]}
+
+
+class RecordingWriter:
+    def __init__(self, size):
+        self.size = size
+        self.frames = []
+
+    def next_buffer(self):
+        return np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+
+    def submit(self, frame):
+        self.frames.append(frame.copy())
+
+    def repeat(self):
+        self.frames.append(self.frames[-1])
+
+
+def test_streaming_render_matches_compiled(monkeypatch):
+    spec = {"fps": 10, "size": [1920, 1080],
+            "scenes": [_scene("uno", [18, 18, 18]), _scene("due", [26, 26, 46]), _scene("tre", [76, 175, 80])]}
+    canvas = Canvas((1920, 1080), 10, 0.1)
+    lazy = compile_timeline(spec, canvas, lazy=True)
+    built = []
+    for scene in lazy.scenes:
+        build = scene.build
+        monkeypatch.setattr(scene, "build", lambda times=None, build=build: built.append(1) or build(times),
+                            raising=False)
+    streamed, compiled = RecordingWriter(lazy.size), RecordingWriter(lazy.size)
+    lazy.write(streamed)
+    compile_timeline(spec, canvas).write(compiled)
+    # Ogni scena costruita una sola volta, quando il render la raggiunge
+    assert len(built) == 3
+    assert len(streamed.frames) == len(compiled.frames) == 30
+    assert all(np.array_equal(a, b) for a, b in zip(streamed.frames, compiled.frames))
@@ -0,0 +1,98 @@
+import argparse
+import os
+import re
+
+import imageio_ffmpeg
+import pytest
+from PIL import Image
+
+from demo_video.canvas import Canvas
+from demo_video.encoder import EncoderSettings
+from demo_video.outputs import HLS_SEGMENT_SECONDS, hls_cuts, parse_formats, render_outputs
+from demo_video.render import render_video
+from demo_video.spec import compile_timeline
+
+
+def _scene(name, duration):
+    return {"name": name, "duration": duration,
+            "effects": [{"type": "CrossFadeIn", "duration": 0.5}],
+            "layers": [{"type": "solid", "color": [18, 18, 18]},
+                       {"type": "text", "text": name, "size": 80, "color": [76, 175, 80],
+                        "position": ["center", "center"]}]}
+
+
+SPEC = {"fps": 10, "size": [1920, 1080], "scenes": [_scene("intro", 1), _scene("slide", 3), _scene("outro", 2)]}
+
+
+def _timelines():
+    return {"landscape": compile_timeline(SPEC, Canvas((1920, 1080), 10, 0.25)),
+            "vertical": compile_timeline(dict(SPEC, size=[1080, 1920]), Canvas((1080, 1920), 10, 0.25))}
+
+
+def test_single_pass_outputs(tmp_path, monkeypatch):
+    timelines = _timelines()
+    landscape = timelines["landscape"]
+    composed = []
+    compose = landscape.compose
+    monkeypatch.setattr(landscape, "compose", lambda *a, **k: composed.append(a) or compose(*a, **k))
+    output = str(tmp_path / "video.mp4")
+    paths = render_outputs(timelines, output, ["720p", "vertical", "gif", "webp", "poster"],
+                           EncoderSettings(preset="ultrafast"))
+    # Ogni frame orizzontale composto al più una volta per tutte le uscite
+    assert len(composed) <= landscape.n_frames
+    for path in (output, paths["720p"]):
+        assert imageio_ffmpeg.count_frames_and_secs(path)[0] == landscape.n_frames
+    reader = imageio_ffmpeg.read_frames(paths["vertical"])
+    assert next(reader)["size"] == timelines["vertical"].size
+    reader.close()
+    with Image.open(paths["gif"]) as gif:
+        assert gif.is_animated and gif.width == 480
+    with Image.open(paths["poster"]) as poster:
+        assert poster.size == landscape.size
+    assert (tmp_path / "video_preview.webp").stat().st_size > 0
+
+
+def test_parse_formats():
+    assert parse_formats("720p, gif,poster") == ["720p", "gif", "poster"]
+    with pytest.raises(argparse.ArgumentTypeError, match="mkv"):
+        parse_formats("720p,mkv")
+
+
+def test_hls_cuts():
+    timeline = compile_timeline(SPEC, Canvas((1920, 1080), 10, 0.1), lazy=True)
+    cuts = hls_cuts(timeline)
+    fps = timeline.fps
+    assert cuts == sorted(set(cuts))
+    # Ogni scena comincia con un segmento nuovo
+    assert {round(offset * fps) for offset in timeline.offsets[:-1]} <= set(cuts)
+    bounds = cuts + [timeline.n_frames]
+    assert all(0 < b - a <= HLS_SEGMENT_SECONDS * fps for a, b in zip(bounds, bounds[1:]))
+    # La slide di 3 s è divisa in due parti uguali
+    assert cuts == [0, 10, 25, 40]
+
+
+def test_hls_segments_follow_cuts(tmp_path):
+    landscape = compile_timeline(SPEC, Canvas((1920, 1080), 10, 0.5))
+    paths = render_outputs({"landscape": landscape}, str(tmp_path / "video.mp4"), ["hls"],
+                           EncoderSettings(preset="ultrafast"))
+    with open(paths["hls"]) as f:
+        variants = [line for line in f.read().splitlines() if line.endswith(".m3u8")]
+    # La tela di 540 righe ha solo la versione 480p della scala
+    assert variants == ["480p/index.m3u8"]
+    with open(os.path.join(os.path.dirname(paths["hls"]), variants[0])) as f:
+        durations = [float(d) for d in re.findall(r"#EXTINF:([0-9.]+),", f.read())]
+    bounds = hls_cuts(landscape) + [landscape.n_frames]
+    assert durations == [(b - a) / landscape.fps for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("layout", ["faststart", "fragmented"])
+def test_mp4_layout(tmp_path, layout):
+    timeline = compile_timeline(SPEC, Canvas((1920, 1080), 10, 0.1))
+    output = tmp_path / "video.mp4"
+    render_video(timeline, str(output), EncoderSettings(preset="ultrafast", mp4=layout))
+    data = output.read_bytes()
+    if layout == "faststart":
+        # Indice prima dei dati: la riproduzione parte senza scaricare tutto il file
+        assert data.index(b"moov") < data.index(b"mdat")
+    else:
+        assert b"moof" in data and data.index(b"moov") < data.index(b"moof")
@@ -0,0 +1,42 @@
+import imageio_ffmpeg
+
+from demo_video.canvas import Canvas
+from demo_video.encoder import EncoderSettings
+from demo_video.segments import plan_segments, render_segments
+from demo_video.spec import compile_timeline
+
+CANVAS = Canvas((1920, 1080), 10, 0.1)
+
+
+def _scene(name, duration, text):
+    return {"name": name, "duration": duration,
+            "effects": [{"type": "CrossFadeIn", "duration": 0.5}, {"type": "CrossFadeOut", "duration": 0.5}],
+            "layers": [{"type": "solid", "color": [18, 18, 18]},
+                       {"type": "text", "text": text, "size": 80, "color": [76, 175, 80],
+                        "position": ["center", "center"]}]}
+
+
+SPEC = {"fps": 10, "size": [1920, 1080],
+        "scenes": [_scene("intro", 3, "G-Press"), _scene("slide", 5, "Trova Email"), _scene("outro", 3, "Fine")]}
+
+
+def test_plan_segments_cover_timeline():
+    timeline = compile_timeline(SPEC, CANVAS, lazy=True)
+    segments = plan_segments(timeline)
+    assert segments[0].first == 0 and segments[-1].last == timeline.n_frames
+    assert all(a.last == b.first for a, b in zip(segments, segments[1:]))
+    # Corpo di ogni scena più un segmento per ogni dissolvenza fra scene
+    assert [s.name.split(" ", 1)[1] for s in segments] == ["intro", "0>1", "slide", "1>2", "outro"]
+    fades = [s for s in segments if ">" in s.name]
+    assert [(s.first, s.last) for s in fades] == [(25, 35), (75, 85)]
+
+
+def test_render_segments_in_parallel(tmp_path):
+    timeline = compile_timeline(SPEC, CANVAS)
+    output = tmp_path / "video.mp4"
+    render_segments(timeline, str(output), workers=2, settings=EncoderSettings(preset="ultrafast"),
+                    verbose=False)
+    frames, _ = imageio_ffmpeg.count_frames_and_secs(str(output))
+    assert frames == timeline.n_frames
+    # I segmenti intermedi stanno in una directory temporanea che viene rimossa
+    assert [p.name for p in tmp_path.iterdir()] == ["video.mp4"]
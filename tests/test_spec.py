@@ -0,0 +1,36 @@
+import numpy as np
+
+from demo_video.canvas import Canvas
+from demo_video.preview import render_frames
+from demo_video.spec import compile_timeline
+
+CANVAS = Canvas((1920, 1080), 10, 0.1)
+
+# Il titolo sparisce a 1 s, la scena (e la dissolvenza finale) dura fino a 3 s
+SPEC = {"fps": 10, "size": [1920, 1080], "scenes": [
+    {"name": "uno", "duration": 3,
+     "effects": [{"type": "CrossFadeOut", "duration": 1}],
+     "layers": [{"type": "solid", "color": [18, 18, 18], "duration": 2.5},
+                {"type": "text", "text": "G-Press", "size": 100, "color": [76, 175, 80],
+                 "position": ["center", "center"], "duration": 1},
+                {"type": "solid", "color": [76, 175, 80], "start": 2.5, "duration": 0.5}]}]}
+
+
+def test_partial_build_keeps_scene_duration():
+    scene = compile_timeline(SPEC, CANVAS, lazy=True).scenes[0]
+    assert scene.duration == 3
+    # A 2.2 s è visibile solo il primo sfondo, che finisce a 2.5 s
+    partial = scene.build([2.2])
+    assert len(partial.layers) == 1
+    assert partial.duration == 3
+    assert scene.build().duration == 3
+
+
+def test_partial_build_renders_like_full_scene():
+    lazy = compile_timeline(SPEC, CANVAS, lazy=True)
+    full = compile_timeline(SPEC, CANVAS)
+    for t in [0.5, 2.0, 2.2, 2.6, 2.9]:
+        # Un istante alla volta: la scena pianificata costruisce solo i layer visibili
+        (a, _, _), = render_frames(lazy, [t])
+        (b, _, _), = render_frames(full, [t])
+        assert np.array_equal(a, b), t
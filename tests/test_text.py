@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from demo_video.text import atlas_for, draw_text, get_font, text_bbox
+
+STRINGS = ["Trova Email", "Carica documenti aziendali", "AVATAR Tw", "Yo, Te! LT VA",
+           "Aperture e click", "Genera articoli perfetti", "Inviate • Consegnate • Aperte"]
+
+
+def _reference(text, font, origin=(50, 50)):
+    img = Image.new("L", (2000, 300), 0)
+    ImageDraw.Draw(img).text(origin, text, font=font, fill=255)
+    return np.array(img)
+
+
+@pytest.mark.parametrize("size", [20, 36, 42, 80])
+@pytest.mark.parametrize("bold", [True, False])
+def test_atlas_matches_imagedraw(size, bold):
+    font = get_font(size, bold)
+    draw = ImageDraw.Draw(Image.new("L", (1, 1)))
+    for text in STRINGS:
+        assert text_bbox(text, font) == draw.textbbox((0, 0), text, font=font), text
+        mask, (x0, y0) = atlas_for(font).mask(text)
+        ours = np.zeros((300, 2000), dtype=np.uint8)
+        ours[50 + y0:50 + y0 + mask.shape[0], 50 + x0:50 + x0 + mask.shape[1]] = mask
+        assert np.array_equal(ours, _reference(text, font)), text
+
+
+def test_draw_text_matches_imagedraw():
+    font = get_font(36)
+    color = (76, 175, 80)
+    img = Image.new("RGBA", (600, 120), (18, 18, 18, 255))
+    ImageDraw.Draw(img).text((30, 20), "Trova Email", font=font, fill=color + (255,))
+    canvas = np.full((120, 600, 4), (18, 18, 18, 255), dtype=np.uint8)
+    draw_text(canvas, (30, 20), "Trova Email", font, color)
+    assert np.abs(canvas.astype(int) - np.array(img)).max() <= 1
+
+
+def test_empty_text():
+    assert text_bbox("", get_font(20)) == (0, 0, 0, 0)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from demo_video.canvas import Canvas
+from demo_video.compositor import Compositor
+from demo_video.spec import compile_timeline
+
+CANVAS = Canvas((1920, 1080), 10, 0.1)
+SPEC = {"fps": 10, "size": [1920, 1080], "scenes": [
+    {"name": "slide", "duration": 2, "effects": [{"type": "CrossFadeIn", "duration": 0.5}],
+     "layers": [{"type": "solid", "color": [26, 26, 46]},
+                {"type": "text", "text": "G-Press", "size": 100, "color": [76, 175, 80],
+                 "position": ["center", "center"]}]}]}
+
+
+class RecordingWriter:
+    """Writer finto: tiene una copia di ogni frame inviato all'encoder"""
+
+    def __init__(self, size):
+        self.size = size
+        self.frames = []
+        self.submitted = 0
+
+    def next_buffer(self):
+        return np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+
+    def submit(self, frame):
+        self.submitted += 1
+        self.frames.append(frame.copy())
+
+    def repeat(self):
+        self.frames.append(self.frames[-1])
+
+
+def test_static_spans_skip_the_fade():
+    timeline = compile_timeline(SPEC, CANVAS)
+    assert timeline.scenes[0].static_spans() == [(0.5, 2)]
+    # Dopo la dissolvenza (5 frame) un frame composto e 14 ripetuti
+    assert timeline.held_ratio() == 14 / 20
+
+
+def test_stream_repeats_held_frames():
+    timeline = compile_timeline(SPEC, CANVAS)
+    writer = RecordingWriter(timeline.size)
+    timeline.write(writer)
+    assert len(writer.frames) == timeline.n_frames == 20
+    assert writer.submitted == 6
+    # I frame ripetuti sono quelli che il compositore avrebbe composto
+    scene = timeline.scenes[0]
+    for k, frame in enumerate(writer.frames):
+        assert np.array_equal(frame, Compositor(scene).render(k / timeline.fps)), k
+
+
+def test_frame_function_reuses_the_held_frame():
+    timeline = compile_timeline(SPEC, CANVAS)
+    held = timeline.frame_function(1.0)
+    assert timeline.frame_function(1.5) is held
+    assert timeline.frame_function(0.2) is not held
+
+
+def test_locate_scene_boundaries():
+    spec = dict(SPEC, scenes=[dict(SPEC["scenes"][0], name=name) for name in ("a", "b", "c")])
+    timeline = compile_timeline(spec, CANVAS, lazy=True)
+    assert timeline.offsets == [0, 2, 4, 6]
+    assert timeline.locate(0) == (0, 0)
+    assert timeline.locate(2) == (1, 0)
+    assert timeline.locate(3.5) == (1, 1.5)
+    # Oltre la fine resta nell'ultima scena
+    assert timeline.locate(6.0) == (2, 2.0)
@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from demo_video import compositor, timeline, trace
+from demo_video.canvas import Canvas
+from demo_video.spec import compile_timeline
+from demo_video.trace import Tracer
+
+SPEC = {"fps": 10, "size": [1920, 1080], "scenes": [
+    {"name": "slide", "duration": 1,
+     "layers": [{"type": "solid", "color": [18, 18, 18]},
+                {"type": "text", "text": "G-Press", "size": 100, "color": [76, 175, 80],
+                 "position": ["center", "center"], "effects": [{"type": "CrossFadeIn", "duration": 0.5}]}]}]}
+
+
+class NullWriter:
+    def __init__(self, size):
+        self.buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+
+    def next_buffer(self):
+        return self.buffer
+
+    def submit(self, frame):
+        pass
+
+    def repeat(self):
+        pass
+
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    tracer = Tracer()
+    tracer.enable(str(tmp_path / "render.json"))
+    for module in (trace, timeline, compositor):
+        monkeypatch.setattr(module, "TRACER", tracer)
+    return tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("frame"):
+        pass
+    tracer.frame(0.01)
+    assert not tracer.enabled and tracer.events == [] and tracer.frame_times == []
+
+
+def test_render_trace_and_summary(tracer):
+    timeline = compile_timeline(SPEC, Canvas((1920, 1080), 10, 0.1))
+    timeline.write(NullWriter(timeline.size))
+    tracer.save()
+
+    with open(tracer.path) as f:
+        events = json.load(f)["traceEvents"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    names = {(event["cat"], event["name"]) for event in events}
+    assert ("frame", "frame") in names
+    assert ("effect", "CrossFadeIn") in names
+    # Un frame per ogni frame consegnato, ripetuti compresi
+    with open(tracer.summary_path()) as f:
+        summary = json.load(f)
+    assert summary["frames"] == summary["frames_total"] == timeline.n_frames
+    assert summary["frame_ms"]["p50"] <= summary["frame_ms"]["p99"] <= summary["frame_ms"]["max"]
+    assert summary["slowest"]
@@ -0,0 +1,61 @@
+import numpy as np
+
+from demo_video.canvas import Canvas
+from demo_video.compositor import Compositor, Endpoints
+from demo_video.spec import compile_scene
+
+RNG = np.random.default_rng(0)
+
+
+def test_mix_matches_float_formula():
+    start = RNG.integers(0, 256, (16, 16, 3), dtype=np.uint8)
+    end = RNG.integers(0, 256, (16, 16, 3), dtype=np.uint8)
+    endpoints = Endpoints(None, start, end)
+    dst = np.empty_like(start)
+    for opacity in range(256):
+        endpoints.mix(dst, opacity)
+        expected = start * (1 - opacity / 255) + end * (opacity / 255)
+        assert np.abs(dst - expected).max() <= 1, opacity
+
+
+def test_mix_extremes_are_exact():
+    start = RNG.integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    end = RNG.integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    endpoints = Endpoints(None, start, end)
+    dst = np.empty_like(start)
+    endpoints.mix(dst, 0)
+    assert np.array_equal(dst, start)
+    endpoints.mix(dst, 255)
+    assert np.array_equal(dst, end)
+
+
+# Il titolo entra in dissolvenza su uno sfondo fermo; la scena esce verso il nero
+SCENE = {"name": "prova", "duration": 2, "effects": [{"type": "CrossFadeOut", "duration": 0.5}],
+         "layers": [{"type": "gradient", "colors": [[26, 26, 46], [76, 175, 80]]},
+                    {"type": "text", "text": "G-Press", "size": 100, "color": [255, 255, 255],
+                     "position": ["center", 200], "effects": [{"type": "CrossFadeIn", "duration": 1}]}]}
+
+
+def test_layer_fade_mixes_cached_endpoints():
+    scene = compile_scene(SCENE, Canvas((1920, 1080), 10, 0.25))
+    compositor = Compositor(scene)
+    compositor.render(0.05)
+    endpoints = []
+    for k in range(1, 10):
+        frame = compositor.render(k / 10).astype(int)
+        endpoints.append(compositor._endpoints[1])
+        assert np.abs(frame - Compositor(scene).render(k / 10)).max() <= 1, k
+    # Gli estremi si compongono una volta per dissolvenza, poi si miscelano soltanto
+    assert all(e is endpoints[0] for e in endpoints)
+    # Finita la dissolvenza (l'ultimo passo arriva all'opacità piena) gli estremi si liberano
+    compositor.render(1.2)
+    compositor.render(1.3)
+    assert compositor._endpoints == {}
+
+
+def test_scene_fade_to_black():
+    scene = compile_scene(SCENE, Canvas((1920, 1080), 10, 0.25))
+    opaque = Compositor(scene).render(1.4).astype(int)
+    frame = Compositor(scene).render(1.75)
+    expected = opaque * (1 - 0.25 / 0.5)
+    assert np.abs(frame - expected).max() <= 1